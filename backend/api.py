@@ -2,28 +2,29 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Literal
 import os
-import shutil
-import tempfile
 import base64
-from openai import OpenAI
 from pinecone import Pinecone
 
 # Import internal modules
 from .rag_chain import answer_question
-from backend.speech_to_text import transcribe_audio
+from backend.pipeline.rag_pipeline import answer_direct, needs_agent
+from .thesis_logic import get_thesis_data
+from backend.tools.stt_tool import transcribe_audio
+from backend.services.tts import synthesize_speech
 
 # Import Routers
 from .routers import nvidia_thesis_summary
 from .routers import nvidia_chart
 from .routers import excel_router
 from .routers import company_routes
+from .routers import metrics_routes
 
 app = FastAPI(title="Value Investing AI API")
 
@@ -32,6 +33,7 @@ app.include_router(nvidia_thesis_summary.router)
 app.include_router(nvidia_chart.router)
 app.include_router(excel_router.router)
 app.include_router(company_routes.router)
+app.include_router(metrics_routes.router)
 
 # Allow CORS
 app.add_middleware(
@@ -44,6 +46,9 @@ app.add_middleware(
 
 class TextQuery(BaseModel):
     query: str
+    session_id: Optional[str] = None
+    # "direct" answers with a single retrieval + LLM call, "agent" runs the ReAct agent
+    mode: Literal["agent", "direct"] = "agent"
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="frontend_static"), name="static") # Keep for backup/reference if needed
@@ -73,30 +78,26 @@ def read_excel():
     return FileResponse("frontend/excel.html")
 
 # --- Helper Functions ---
-client = OpenAI()
 
 def generate_audio(text: str) -> Optional[str]:
-    """Generates TTS audio and returns base64 string."""
-    try:
-        if len(text) > 4096:
-            text = text[:4096]
-            
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="alloy",
-            input=text
-        )
-        return base64.b64encode(response.content).decode("utf-8")
-    except Exception as e:
-        print(f"TTS Error: {e}")
+    """Generates TTS audio (served from the shared TTS cache when possible) and returns base64 string."""
+    audio = synthesize_speech(text)
+    if audio is None:
         return None
+    return base64.b64encode(audio).decode("utf-8")
+
+def answer_in_mode(question: str, session_id: Optional[str], mode: str) -> str:
+    """Same modes as the /ask-text router: commands (ingest, transcribe) always go to the agent."""
+    if mode == "direct" and not needs_agent(question):
+        return answer_direct(question, session_id=session_id)
+    return answer_question(question, session_id=session_id)
 
 # --- API Endpoints ---
 
 @app.post("/ask-text")
 def ask_text(query: TextQuery):
     try:
-        answer = answer_question(query.query)
+        answer = answer_in_mode(query.query, query.session_id, query.mode)
         audio_b64 = generate_audio(answer)
         return {"answer": answer, "audio_base64": audio_b64}
     except Exception as e:
@@ -104,25 +105,19 @@ def ask_text(query: TextQuery):
         return {"error": str(e)}
 
 @app.post("/ask-audio")
-def ask_audio(file: UploadFile = File(...)):
+def ask_audio(
+    file: UploadFile = File(...),
+    session_id: Optional[str] = Form(None),
+    mode: Literal["agent", "direct"] = Form("agent"),
+):
     try:
-        # Determine suffix based on filename or default to .webm
-        filename = file.filename or "recording.webm"
-        suffix = os.path.splitext(filename)[1]
-        if not suffix:
-            suffix = ".webm"
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
-        
-        text = transcribe_audio(tmp_path)
-        os.remove(tmp_path)
+        # Decoded in memory from the upload, no temp file
+        text = transcribe_audio(file.file)
         
         if not text:
             return {"error": "Could not transcribe audio"}
             
-        answer = answer_question(text)
+        answer = answer_in_mode(text, session_id, mode)
         audio_b64 = generate_audio(answer)
         return {"transcription": text, "answer": answer, "audio_base64": audio_b64}
         
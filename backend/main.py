@@ -6,9 +6,15 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
-from backend.routers import chat_routes, thesis_routes, ticker_routes, nvidia_thesis_summary, nvidia_chart, excel_router, company_routes
+from backend.routers import chat_routes, thesis_routes, ticker_routes, nvidia_thesis_summary, nvidia_chart, excel_router, company_routes, metrics_routes
+from backend.pipeline.rag_pipeline import NOT_FOUND_ANSWER, get_agent_components
+from backend.services.upstream_limits import run_blocking
+from backend.services.vector_store import get_index_stats
+from backend.services import tts
+from backend.services import stt_service
+from backend.services import context_packer
+import asyncio
 import os
-from pinecone import Pinecone
 
 app = FastAPI(title="Value Investing AI API")
 
@@ -36,6 +42,37 @@ app.include_router(nvidia_chart.router)
 app.include_router(ticker_routes.router)
 app.include_router(excel_router.router)
 app.include_router(company_routes.router)
+app.include_router(metrics_routes.router)
+
+@app.on_event("startup")
+def warm_up_agent():
+    # Build the agent once at startup so the first question doesn't pay for it
+    try:
+        get_agent_components()
+    except Exception as e:
+        print(f"Warning: Could not warm up agent: {e}")
+    # Same for the context packer's tokenizer (tiktoken downloads it on first use)
+    context_packer.warm_up()
+
+@app.on_event("startup")
+async def preseed_tts_cache():
+    # The refusal answer is returned constantly, have its audio cached before the first request
+    async def run():
+        try:
+            await tts.preseed([NOT_FOUND_ANSWER])
+        except Exception as e:
+            print(f"Warning: Could not pre-seed TTS cache: {e}")
+    asyncio.create_task(run())
+
+@app.on_event("startup")
+async def warm_up_stt():
+    # Load the STT models in the background so the first voice question doesn't pay for it
+    async def run():
+        try:
+            await run_blocking("whisper", stt_service.warm_up)
+        except Exception as e:
+            print(f"Warning: Could not load Whisper model: {e}")
+    asyncio.create_task(run())
 
 # --- Frontend Routes ---
 @app.get("/")
@@ -79,18 +116,9 @@ def read_thesis_js():
     return FileResponse("frontend/js/thesis.js")
 
 @app.get("/stats")
-def get_stats():
+async def get_stats():
     try:
-        PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-        INDEX_NAME = "youtube-rag-index"
-        pc = Pinecone(api_key=PINECONE_API_KEY)
-        index = pc.Index(INDEX_NAME)
-        stats = index.describe_index_stats()
-        
-        return {
-            "total_vectors": stats.total_vector_count,
-            "namespaces": stats.namespaces
-        }
+        return await run_blocking("pinecone", get_index_stats)
     except Exception as e:
         return {"error": str(e)}
 
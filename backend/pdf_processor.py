@@ -3,10 +3,12 @@ import shutil
 from fastapi import UploadFile
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_pinecone import PineconeVectorStore
+from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.schema import HumanMessage
+from backend.services.embeddings import get_embeddings
+from backend.services.ingest_manifest import sync_file
+from backend.services.vector_store import INDEX_NAME, get_vector_store
 
 # Ensure temp directory exists
 TEMP_DIR = "temp_uploads"
@@ -14,7 +16,7 @@ os.makedirs(TEMP_DIR, exist_ok=True)
 
 def process_pdf(file: UploadFile):
     """
-    Saves the uploaded PDF, ingests it into Pinecone, and returns a summary.
+    Saves the uploaded PDF, ingests it into the vector store, and returns a summary.
     """
     file_path = os.path.join(TEMP_DIR, file.filename)
     
@@ -31,20 +33,17 @@ def process_pdf(file: UploadFile):
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
         docs = text_splitter.split_documents(documents)
 
-        # 3. Embed and Upsert to Pinecone
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-        index_name = "youtube-index" # Using the same index
+        # 3. Embed and upsert through the ingest manifest (deterministic ids, BM25 index too),
+        # so uploading the same file again adds nothing
+        embeddings = get_embeddings()
+        vector_store = get_vector_store(embeddings, INDEX_NAME)
         
         # Add metadata to distinguish source
         for doc in docs:
             doc.metadata["source"] = "Uploaded Document"
             doc.metadata["title"] = file.filename
 
-        PineconeVectorStore.from_documents(
-            docs,
-            embeddings,
-            index_name=index_name
-        )
+        sync_file(INDEX_NAME, vector_store, f"upload/{file.filename}", file_path, lambda: docs, 1000, 100)
 
         # 4. Generate Summary
         llm = ChatOpenAI(model="gpt-4o", temperature=0)
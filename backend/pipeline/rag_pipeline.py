@@ -1,14 +1,25 @@
+import asyncio
 import os
+import re
 import sys
+import time
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
+from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
 from langchain.agents import AgentExecutor, create_react_agent, Tool
-from langchain.memory import ConversationBufferWindowMemory
 from langchain import hub
 from langsmith import traceable
+from backend.services.component_cache import ComponentCache
+from backend.services.embeddings import get_embeddings
+from backend.services.vector_store import get_vector_store
+from backend.services.retrieval_cache import CachedRetriever
+from backend.services.hybrid_search import hybrid_retriever
+from backend.services.rerank import DiversifiedRetriever, get_reranker
+from backend.services.context_packer import PackedRetriever, get_context_budget
+from backend.services.session_memory import store as session_memory
+from backend.services.upstream_limits import limit
+from backend.services.semantic_cache import cache as semantic_cache, SEMANTIC_CACHE_ENABLED
 
 # Import external modules for tools
 # Ensure root directory is in path to import ingest_videos
@@ -23,24 +34,71 @@ load_dotenv()
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = "youtube-rag-index"
-
-# Global Memory
-memory = ConversationBufferWindowMemory(
-    memory_key="chat_history",
-    k=5,
-    return_messages=True
+# Fixed answer of the strict QA prompt when the context doesn't contain the answer
+NOT_FOUND_ANSWER = "This information does not appear in the Invertir Desde Cero videos."
+
+# /ask-batch: max questions per request and how many are answered at the same time
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "50"))
+BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", "4"))
+
+# Inputs that need the agent's tools (video ingestion / audio transcription).
+# Everything else can be answered by the single-call direct path.
+AGENT_COMMAND_PATTERN = re.compile(
+    r"(youtube\.com/|youtu\.be/|\bingest|\binger|\btranscri|\.(mp3|wav|webm|m4a|ogg|flac)\b)",
+    re.IGNORECASE
 )
 
-@traceable(name="get_agent_executor")
-def get_agent_executor():
+def get_pipeline_config():
+    """
+    Returns the settings the agent is built from.
+    The agent is kept warm across requests and only rebuilt when one of these changes.
+    """
+    return {
+        "chat_model": os.getenv("RAG_CHAT_MODEL", "gpt-4o"),
+        "embedding_model": os.getenv("RAG_EMBEDDING_MODEL", "text-embedding-3-small"),
+        "index_name": os.getenv("RAG_INDEX_NAME", INDEX_NAME),
+        "vector_store_backend": os.getenv("VECTOR_STORE_BACKEND", "pinecone"),
+        "top_k": int(os.getenv("RAG_TOP_K", "5")),
+        "hybrid_search": os.getenv("HYBRID_SEARCH_ENABLED", "1") == "1",
+        "fetch_k": int(os.getenv("RERANK_FETCH_K", "20")),
+        "mmr_lambda": float(os.getenv("MMR_LAMBDA", "0.7")),
+        "reranker_model": os.getenv("RERANKER_MODEL", ""),
+        "context_budget": get_context_budget("chat"),
+    }
+
+@traceable(name="build_agent_components")
+def build_agent_components(config: dict):
+    """Builds the retriever, LLM, QA chain, tools and agent executor for the given config."""
     # 1. Setup Vector Store & Retriever
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vector_store = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
+    embeddings = get_embeddings(config["embedding_model"])
+    vector_store = get_vector_store(embeddings, config["index_name"], backend=config["vector_store_backend"])
     # Filter out PDFs to only use YouTube captions (assuming PDFs have type='pdf')
-    retriever = vector_store.as_retriever(search_kwargs={"k": 5, "filter": {"type": {"$ne": "pdf"}}})
+    # Dense + BM25 candidates are fused so exact terms ("EV/FCF", "ROIC") are not missed,
+    # then reduced to top_k with MMR so overlapping chunks don't take several slots,
+    # and packed into a fixed token budget so the prompt size doesn't grow with k.
+    # Repeated questions are served from the retrieval cache until the index changes
+    retriever = CachedRetriever(
+        retriever=PackedRetriever(
+            retriever=DiversifiedRetriever(
+                retriever=hybrid_retriever(
+                    vector_store,
+                    {"k": config["fetch_k"], "filter": {"type": {"$ne": "pdf"}}},
+                    config["index_name"],
+                    enabled=config["hybrid_search"]
+                ),
+                embeddings=embeddings,
+                k=config["top_k"],
+                lambda_mult=config["mmr_lambda"],
+                reranker=get_reranker(config["reranker_model"])
+            ),
+            max_tokens=config["context_budget"],
+            model=config["chat_model"]
+        ),
+        namespace=config["index_name"]
+    )
 
     # 2. LLM
-    llm = ChatOpenAI(model="gpt-4o", temperature=0)
+    llm = ChatOpenAI(model=config["chat_model"], temperature=0)
 
     # 3. Define Tool Functions
     
@@ -84,6 +142,21 @@ def get_agent_executor():
 
     QA_CHAIN_PROMPT = PromptTemplate.from_template(template)
 
+    # Direct mode rewrites a follow-up ("and its ROIC?") into a standalone question
+    # with the session history, so retrieval and the QA prompt see what it refers to
+    condense_template = """Given the conversation below and a follow-up input, rewrite the follow-up
+    as a standalone question in its original language, replacing pronouns and references with what
+    they refer to. If it is already standalone, return it unchanged. Return only the question.
+
+    Conversation:
+    {chat_history}
+
+    Follow-up input: {question}
+
+    Standalone question:"""
+
+    CONDENSE_PROMPT = PromptTemplate.from_template(condense_template)
+
     qa_chain = RetrievalQA.from_chain_type(
         llm=llm,
         chain_type="stuff",
@@ -112,11 +185,16 @@ def get_agent_executor():
         docs = retriever.get_relevant_documents(query)
         return "\n\n".join([f"Content: {d.page_content}\nSource: {d.metadata.get('source', 'Unknown')}" for d in docs])
 
+    async def aretriever_func(query: str):
+        docs = await retriever.ainvoke(query)
+        return "\n\n".join([f"Content: {d.page_content}\nSource: {d.metadata.get('source', 'Unknown')}" for d in docs])
+
     # 4. Create Tool Objects
     tools = [
         Tool(
             name="rag_answer_tool",
             func=qa_chain.run,
+            coroutine=qa_chain.arun,
             description="Use this to answer ANY question. You MUST use this tool for every question asked. Input should be the full question."
         ),
         Tool(
@@ -132,6 +210,7 @@ def get_agent_executor():
         Tool(
             name="retriever_tool",
             func=retriever_func,
+            coroutine=aretriever_func,
             description="Use this to retrieve raw documents/context from the vector store without generating an answer. Input is a search query."
         )
     ]
@@ -182,23 +261,281 @@ def get_agent_executor():
     # 6. Create Agent
     agent = create_react_agent(llm, tools, prompt)
 
-    # 7. Create Executor with Memory
+    # 7. Create Executor
+    # Conversation history is per session and passed in on every call (see answer_question)
     agent_executor = AgentExecutor(
         agent=agent,
         tools=tools,
-        memory=memory,
         verbose=True,
         handle_parsing_errors=True
     )
     
-    return agent_executor
+    return {
+        "embeddings": embeddings,
+        "vector_store": vector_store,
+        "retriever": retriever,
+        "llm": llm,
+        "qa_prompt": QA_CHAIN_PROMPT,
+        "condense_prompt": CONDENSE_PROMPT,
+        "qa_chain": qa_chain,
+        "tools": tools,
+        "agent_executor": agent_executor,
+    }
+
+# Components are built on first use and reused by every request afterwards
+_components = ComponentCache("rag_pipeline.agent", build_agent_components)
+
+def get_agent_components():
+    return _components.get(get_pipeline_config())
+
+def get_agent_executor():
+    return get_agent_components()["agent_executor"]
+
+def needs_agent(question: str) -> bool:
+    """True if the input looks like an ingestion or transcription command."""
+    return bool(AGENT_COMMAND_PATTERN.search(question))
+
+def format_docs(docs) -> str:
+    # Same layout the "stuff" chain uses to build {context}
+    return "\n\n".join(d.page_content for d in docs)
+
+def standalone_question(question: str, session_id: str = None) -> str:
+    """
+    The question to retrieve and answer with: unchanged on a session's first turn, otherwise
+    rewritten with the session history into a standalone question (one short LLM call).
+    """
+    history = session_memory.get_history(session_id)
+    if not history:
+        return question
+    components = get_agent_components()
+    prompt = components["condense_prompt"].format(chat_history=history, question=question)
+    return components["llm"].invoke(prompt).content.strip() or question
+
+async def astandalone_question(question: str, session_id: str = None) -> str:
+    """Async version of standalone_question."""
+    history = session_memory.get_history(session_id)
+    if not history:
+        return question
+    components = get_agent_components()
+    prompt = components["condense_prompt"].format(chat_history=history, question=question)
+    async with limit("openai"):
+        response = await components["llm"].ainvoke(prompt)
+    return response.content.strip() or question
+
+@traceable(name="answer_direct")
+def answer_direct(question: str, session_id: str = None):
+    """
+    Fast path: one retrieval + one LLM call with the strict QA prompt,
+    instead of the ReAct loop (tool selection -> RetrievalQA -> Final Answer).
+    Follow-ups are first made standalone with the session history.
+    """
+    components = get_agent_components()
+
+    query = standalone_question(question, session_id)
+    docs = components["retriever"].invoke(query)
+    prompt = components["qa_prompt"].format(context=format_docs(docs), question=query)
+    answer = components["llm"].invoke(prompt).content
+
+    session_memory.add_turn(session_id, question, answer)
+    return answer
+
+def get_sources(docs):
+    """Returns the unique sources (video/PDF) of the retrieved documents, in rank order."""
+    sources = []
+    seen = set()
+    for d in docs:
+        source = d.metadata.get("source", "Unknown")
+        if source in seen:
+            continue
+        seen.add(source)
+        sources.append({"source": source, "title": d.metadata.get("title")})
+    return sources
+
+async def aembed_question(question: str):
+    components = get_agent_components()
+    async with limit("openai"):
+        return await components["embeddings"].aembed_query(question)
+
+def is_cacheable(question: str, session_id: str = None) -> bool:
+    """
+    True if the answer depends only on the question, so it can be shared through the
+    semantic cache. Both modes read the session history (the agent directly, direct mode to
+    make follow-ups standalone), so a follow-up such as "and its ROIC?" is never cacheable:
+    only a session's first turn is.
+    """
+    if not SEMANTIC_CACHE_ENABLED or needs_agent(question):
+        return False
+    return not session_memory.get_messages(session_id)
+
+async def alookup_cached_answer(question: str, session_id: str = None):
+    """
+    Checks the semantic answer cache.
+    Returns (cached entry or None, question embedding or None); the embedding
+    is returned on a miss so the caller can store the answer without re-embedding.
+    Both are None when the answer isn't cacheable (see is_cacheable): callers only
+    store answers they got an embedding for.
+    """
+    if not is_cacheable(question, session_id):
+        return None, None
+
+    vector = None
+    entry = semantic_cache.lookup_text(question)
+    if entry is None:
+        vector = await aembed_question(question)
+        entry = semantic_cache.lookup(question, vector)
+
+    if entry is not None:
+        session_memory.add_turn(session_id, question, entry["answer"])
+    return entry, vector
+
+async def aretrieve(question: str):
+    """Retrieves the context documents for a question (async, bounded by the Pinecone limit)."""
+    components = get_agent_components()
+    async with limit("pinecone"):
+        return await components["retriever"].ainvoke(question)
+
+@traceable(name="aanswer_direct")
+async def aanswer_direct(question: str, session_id: str = None):
+    """Async version of answer_direct."""
+    components = get_agent_components()
+
+    query = await astandalone_question(question, session_id)
+    docs = await aretrieve(query)
+    prompt = components["qa_prompt"].format(context=format_docs(docs), question=query)
+    async with limit("openai"):
+        response = await components["llm"].ainvoke(prompt)
+    answer = response.content
+
+    session_memory.add_turn(session_id, question, answer)
+    return answer
+
+async def astream_answer(question: str, session_id: str = None, mode: str = "direct"):
+    """
+    Streams the direct RAG answer as (event, data) tuples:
+    status -> sources -> token... -> answer.
+    The agent can't be streamed token by token, so its output is sent as a single token.
+    """
+    if mode != "direct" or needs_agent(question):
+        yield "status", {"stage": "agent"}
+        answer = await aanswer_question(question, session_id, mode="agent")
+        yield "token", {"text": answer}
+        yield "answer", {"answer": answer, "sources": []}
+        return
+
+    components = get_agent_components()
+
+    yield "status", {"stage": "retrieving"}
+    query = await astandalone_question(question, session_id)
+    docs = await aretrieve(query)
+    sources = get_sources(docs)
+    yield "sources", {"sources": sources}
+
+    yield "status", {"stage": "generating"}
+    prompt = components["qa_prompt"].format(context=format_docs(docs), question=query)
+    parts = []
+    async with limit("openai"):
+        async for chunk in components["llm"].astream(prompt):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield "token", {"text": chunk.content}
+
+    answer = "".join(parts)
+    session_memory.add_turn(session_id, question, answer)
+    yield "answer", {"answer": answer, "sources": sources}
 
 @traceable(name="answer_question")
-def answer_question(question: str):
+def answer_question(question: str, session_id: str = None, mode: str = "agent"):
+    if mode == "direct" and not needs_agent(question):
+        return answer_direct(question, session_id)
+
     agent_executor = get_agent_executor()
     
-    # The ReAct agent expects 'input' key
-    response = agent_executor.invoke({"input": question})
+    # The ReAct agent expects 'input' key, history comes from the caller's session only
+    response = agent_executor.invoke({
+        "input": question,
+        "chat_history": session_memory.get_history(session_id)
+    })
     
     # The output key for AgentExecutor is usually 'output'
-    return response["output"]
+    answer = response["output"]
+    session_memory.add_turn(session_id, question, answer)
+    return answer
+
+@traceable(name="aanswer_question")
+async def aanswer_question(question: str, session_id: str = None, mode: str = "agent"):
+    """Async version of answer_question, used by the API routes."""
+    if mode == "direct" and not needs_agent(question):
+        return await aanswer_direct(question, session_id)
+
+    agent_executor = get_agent_executor()
+
+    # The agent makes several OpenAI calls, it holds one OpenAI slot for the whole run
+    async with limit("openai"):
+        response = await agent_executor.ainvoke({
+            "input": question,
+            "chat_history": session_memory.get_history(session_id)
+        })
+
+    answer = response["output"]
+    session_memory.add_turn(session_id, question, answer)
+    return answer
+
+async def aanswer_batch(questions, mode: str = "direct", max_parallel: int = BATCH_MAX_PARALLEL):
+    """
+    Answers a list of independent questions, yielding (index, result) as each one completes.
+
+    All questions are embedded in a single embeddings call (which also fills the embedding
+    cache the retrievers use), retrievals run concurrently, and answers are generated
+    `max_parallel` at a time with the same QA prompt / agent as aanswer_question.
+    Questions don't read or write any session history.
+    """
+    components = get_agent_components()
+    async with limit("openai"):
+        vectors = await components["embeddings"].aembed_documents(list(questions))
+
+    semaphore = asyncio.Semaphore(max_parallel)
+
+    async def answer_one(index: int, question: str, vector):
+        start = time.perf_counter()
+        cacheable = SEMANTIC_CACHE_ENABLED and not needs_agent(question)
+        try:
+            entry = semantic_cache.lookup(question, vector) if cacheable else None
+            if entry is not None:
+                return index, {
+                    "question": question, "answer": entry["answer"], "sources": entry["sources"],
+                    "cached": True, "seconds": round(time.perf_counter() - start, 3),
+                }
+
+            if mode == "direct" and not needs_agent(question):
+                # Retrieval isn't bounded by the answer slots, only by the Pinecone limit
+                docs = await aretrieve(question)
+                prompt = components["qa_prompt"].format(context=format_docs(docs), question=question)
+                async with semaphore:
+                    async with limit("openai"):
+                        response = await components["llm"].ainvoke(prompt)
+                answer, sources = response.content, get_sources(docs)
+            else:
+                async with semaphore:
+                    answer = await aanswer_question(question, session_id=None, mode="agent")
+                sources = []
+
+            compute_seconds = time.perf_counter() - start
+            if cacheable:
+                semantic_cache.store(question, vector, answer, sources=sources, compute_seconds=compute_seconds)
+            return index, {
+                "question": question, "answer": answer, "sources": sources,
+                "cached": False, "seconds": round(compute_seconds, 3),
+            }
+        except Exception as e:
+            # One failing question doesn't abort the rest of the batch
+            print(f"Error answering batch question {index}: {e}")
+            return index, {"question": question, "error": str(e)}
+
+    tasks = [asyncio.create_task(answer_one(i, q, v)) for i, (q, v) in enumerate(zip(questions, vectors))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The client went away: stop the questions that haven't finished
+        for task in tasks:
+            task.cancel()
@@ -1,10 +1,13 @@
 import os
 import json
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
+from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import RetrievalQA
 from dotenv import load_dotenv
+from backend.services.embeddings import get_embeddings
+from backend.services.vector_store import get_vector_store
+from backend.services.retrieval_cache import CachedRetriever, cached_similarity_search
+from backend.services.context_packer import PackedRetriever, get_context_budget, pack_documents
 
 load_dotenv()
 
@@ -65,15 +68,21 @@ def get_thesis_data(company_name: str):
     """
     
     # 1. Setup Vector Store with Strict Filter
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vector_store = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
+    embeddings = get_embeddings()
+    vector_store = get_vector_store(embeddings, INDEX_NAME)
     
     # Strict Retrieval for NVIDIA
     search_kwargs = {"k": 6}
     if company_name.upper() == "NVIDIA":
         search_kwargs["filter"] = {"source": "NVIDIA_Thesis_INVESTMENT.pdf"}
 
-    retriever = vector_store.as_retriever(search_kwargs=search_kwargs)
+    retriever = CachedRetriever(
+        retriever=PackedRetriever(
+            retriever=vector_store.as_retriever(search_kwargs=search_kwargs),
+            max_tokens=get_context_budget("thesis")
+        ),
+        namespace=INDEX_NAME
+    )
     
     llm = ChatOpenAI(model="gpt-4o", temperature=0)
 
@@ -163,11 +172,14 @@ def get_thesis_data(company_name: str):
         
         # Financial Data Extraction (uses TARGETED retrieval)
         # We search specifically for financial terms to ensure we get the right chunks
-        financial_docs = vector_store.similarity_search(
+        financial_docs = cached_similarity_search(
+            vector_store,
             "Ingresos Ventas Revenue Financials Valuation Precio", 
             k=5, 
-            filter={"source": "NVIDIA_Thesis_INVESTMENT.pdf"}
+            filter={"source": "NVIDIA_Thesis_INVESTMENT.pdf"},
+            namespace=INDEX_NAME
         )
+        financial_docs = pack_documents(financial_docs, get_context_budget("thesis_data"))
         
         # Run the data chain with the targeted docs
         raw_json = data_chain.run(input_documents=financial_docs, question=company_name)
@@ -1,46 +1,86 @@
 import os
 import sys
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
+from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
 from langchain.agents import AgentExecutor, create_react_agent, Tool
-from langchain.memory import ConversationBufferWindowMemory
 from langchain import hub
 from langsmith import traceable
+from backend.services.component_cache import ComponentCache
+from backend.services.embeddings import get_embeddings
+from backend.services.vector_store import get_vector_store
+from backend.services.retrieval_cache import CachedRetriever
+from backend.services.hybrid_search import hybrid_retriever
+from backend.services.rerank import DiversifiedRetriever, get_reranker
+from backend.services.context_packer import PackedRetriever, get_context_budget
+from backend.services.session_memory import store as session_memory
 
 # Import external modules for tools
 # Ensure root directory is in path to import ingest_videos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     import ingest_videos
-    from backend import speech_to_text
+    from backend.tools import stt_tool
 except ImportError:
-    print("Warning: Could not import ingest_videos or speech_to_text. Some tools may fail.")
+    print("Warning: Could not import ingest_videos or stt_tool. Some tools may fail.")
 
 load_dotenv()
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = "youtube-rag-index"
 
-# Global Memory
-memory = ConversationBufferWindowMemory(
-    memory_key="chat_history",
-    k=5,
-    return_messages=True
-)
-
-@traceable(name="get_agent_executor")
-def get_agent_executor():
+def get_pipeline_config():
+    """
+    Returns the settings the agent is built from.
+    The agent is kept warm across requests and only rebuilt when one of these changes.
+    """
+    return {
+        "chat_model": os.getenv("RAG_CHAT_MODEL", "gpt-4o"),
+        "embedding_model": os.getenv("RAG_EMBEDDING_MODEL", "text-embedding-3-small"),
+        "index_name": os.getenv("RAG_INDEX_NAME", INDEX_NAME),
+        "vector_store_backend": os.getenv("VECTOR_STORE_BACKEND", "pinecone"),
+        "top_k": int(os.getenv("RAG_TOP_K", "5")),
+        "hybrid_search": os.getenv("HYBRID_SEARCH_ENABLED", "1") == "1",
+        "fetch_k": int(os.getenv("RERANK_FETCH_K", "20")),
+        "mmr_lambda": float(os.getenv("MMR_LAMBDA", "0.7")),
+        "reranker_model": os.getenv("RERANKER_MODEL", ""),
+        "context_budget": get_context_budget("chat"),
+        "react_prompt": os.getenv("RAG_REACT_PROMPT", "hwchase17/react-chat"),
+    }
+
+@traceable(name="build_agent_executor")
+def build_agent_executor(config: dict):
     # 1. Setup Vector Store & Retriever
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vector_store = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
+    embeddings = get_embeddings(config["embedding_model"])
+    vector_store = get_vector_store(embeddings, config["index_name"], backend=config["vector_store_backend"])
     # Filter out PDFs to only use YouTube captions (assuming PDFs have type='pdf')
-    retriever = vector_store.as_retriever(search_kwargs={"k": 5, "filter": {"type": {"$ne": "pdf"}}})
+    # Dense + BM25 candidates are fused so exact terms ("EV/FCF", "ROIC") are not missed,
+    # then reduced to top_k with MMR so overlapping chunks don't take several slots,
+    # and packed into a fixed token budget so the prompt size doesn't grow with k.
+    # Repeated questions are served from the retrieval cache until the index changes
+    retriever = CachedRetriever(
+        retriever=PackedRetriever(
+            retriever=DiversifiedRetriever(
+                retriever=hybrid_retriever(
+                    vector_store,
+                    {"k": config["fetch_k"], "filter": {"type": {"$ne": "pdf"}}},
+                    config["index_name"],
+                    enabled=config["hybrid_search"]
+                ),
+                embeddings=embeddings,
+                k=config["top_k"],
+                lambda_mult=config["mmr_lambda"],
+                reranker=get_reranker(config["reranker_model"])
+            ),
+            max_tokens=config["context_budget"],
+            model=config["chat_model"]
+        ),
+        namespace=config["index_name"]
+    )
 
     # 2. LLM
-    llm = ChatOpenAI(model="gpt-4o", temperature=0)
+    llm = ChatOpenAI(model=config["chat_model"], temperature=0)
 
     # 3. Define Tool Functions
     
@@ -103,7 +143,7 @@ def get_agent_executor():
     # Tool 3: Speech to Text Tool
     def speech_to_text_func(file_path: str):
         try:
-            text = speech_to_text.transcribe_audio(file_path)
+            text = stt_tool.transcribe_audio(file_path)
             return text if text else "No transcription available."
         except Exception as e:
             return f"Error transcribing audio: {str(e)}"
@@ -137,29 +177,40 @@ def get_agent_executor():
         )
     ]
 
-    # 5. Pull ReAct Prompt
-    prompt = hub.pull("hwchase17/react-chat")
+    # 5. Pull ReAct Prompt (network call, done once per build)
+    prompt = hub.pull(config["react_prompt"])
 
     # 6. Create Agent
     agent = create_react_agent(llm, tools, prompt)
 
-    # 7. Create Executor with Memory
+    # 7. Create Executor
+    # Conversation history is per session and passed in on every call (see answer_question)
     agent_executor = AgentExecutor(
         agent=agent,
         tools=tools,
-        memory=memory,
         verbose=True,
         handle_parsing_errors=True
     )
     
     return agent_executor
 
+# Built on first use and reused by every request afterwards
+_agent_executor = ComponentCache("rag_chain.agent", build_agent_executor)
+
+def get_agent_executor():
+    return _agent_executor.get(get_pipeline_config())
+
 @traceable(name="answer_question")
-def answer_question(question: str):
+def answer_question(question: str, session_id: str = None):
     agent_executor = get_agent_executor()
     
-    # The ReAct agent expects 'input' key
-    response = agent_executor.invoke({"input": question})
+    # The ReAct agent expects 'input' key, history comes from the caller's session only
+    response = agent_executor.invoke({
+        "input": question,
+        "chat_history": session_memory.get_history(session_id)
+    })
     
     # The output key for AgentExecutor is usually 'output'
-    return response["output"]
+    answer = response["output"]
+    session_memory.add_turn(session_id, question, answer)
+    return answer
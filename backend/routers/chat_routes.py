@@ -1,69 +1,256 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-import shutil
-import tempfile
-import os
-import base64
-from typing import Optional
-from pydantic import BaseModel
-from openai import OpenAI
-from backend.pipeline.rag_pipeline import answer_question
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+import json
+import time
+import re
+from typing import List, Optional, Literal
+from pydantic import BaseModel, Field
+from backend.pipeline.rag_pipeline import (
+    BATCH_MAX_QUESTIONS, aanswer_batch, aanswer_question, astream_answer, alookup_cached_answer
+)
 from backend.tools.stt_tool import transcribe_audio
+from backend.services import audio_jobs
+from backend.services.live_stt import LiveTranscription
+from backend.services.semantic_cache import cache as semantic_cache
+from backend.services.upstream_limits import run_blocking
 
 router = APIRouter()
-client = OpenAI()
 
 class TextQuery(BaseModel):
     query: str
+    session_id: Optional[str] = None
+    # "direct" answers with a single retrieval + LLM call, "agent" runs the ReAct agent
+    mode: Literal["agent", "direct"] = "agent"
 
-def generate_audio(text: str) -> Optional[str]:
-    """Generates TTS audio and returns base64 string."""
-    try:
-        if len(text) > 4096:
-            text = text[:4096]
-            
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="alloy",
-            input=text
-        )
-        return base64.b64encode(response.content).decode("utf-8")
-    except Exception as e:
-        print(f"TTS Error: {e}")
-        return None
+class BatchQuery(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_QUESTIONS)
+    # Same modes as TextQuery; "direct" is what the chat UI uses
+    mode: Literal["agent", "direct"] = "direct"
+    # Synthesize audio for every answer (served from /audio/{audio_id})
+    tts: bool = False
+
+async def answer_with_cache(question: str, session_id: Optional[str], mode: str):
+    """
+    Answers a question, serving it from the semantic cache when a similar question was
+    answered before. TTS runs in the background: the answer is returned with an audio id
+    that /audio/{audio_id} serves once (or while) it is synthesized.
+    Returns (answer, audio id, cached flag).
+    """
+    start = time.perf_counter()
+    cached, vector = await alookup_cached_answer(question, session_id)
+    if cached is not None:
+        # The answer's TTS chunks are in the TTS disk cache, so this doesn't call the TTS API again
+        return cached["answer"], audio_jobs.submit(cached["answer"]), True
+
+    answer = await aanswer_question(question, session_id=session_id, mode=mode)
+    if vector is not None:
+        semantic_cache.store(question, vector, answer, compute_seconds=time.perf_counter() - start)
+    return answer, audio_jobs.submit(answer), False
+
+def audio_response(answer: str, audio_id: str, cached: bool) -> dict:
+    return {"answer": answer, "audio_id": audio_id, "audio_url": f"/audio/{audio_id}", "cached": cached}
+
+def sse_event(event: str, data: dict) -> str:
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 @router.post("/ask-text")
-def ask_text(query: TextQuery):
+async def ask_text(query: TextQuery):
     try:
-        answer = answer_question(query.query)
-        audio_b64 = generate_audio(answer)
-        return {"answer": answer, "audio_base64": audio_b64}
+        answer, audio_id, cached = await answer_with_cache(query.query, query.session_id, query.mode)
+        return audio_response(answer, audio_id, cached)
     except Exception as e:
         print(f"Error in ask_text: {str(e)}")
         return {"error": str(e)}
 
+@router.post("/ask-text/stream")
+async def ask_text_stream(query: TextQuery):
+    """
+    Streams the answer as Server-Sent Events:
+    `status` (pipeline stage), `sources`, `token` (answer text as it is generated)
+    and a final `done` event with the full answer, sources and an `audio_id`
+    that can be fetched from /audio/{audio_id} once TTS finishes.
+    """
+    async def event_stream():
+        try:
+            start = time.perf_counter()
+            cached, vector = await alookup_cached_answer(query.query, query.session_id)
+            if cached is not None:
+                yield sse_event("status", {"stage": "cached"})
+                yield sse_event("sources", {"sources": cached["sources"]})
+                yield sse_event("token", {"text": cached["answer"]})
+                audio_id = audio_jobs.submit(cached["answer"])
+                yield sse_event("done", {"answer": cached["answer"], "sources": cached["sources"], "audio_id": audio_id, "cached": True})
+                return
+
+            async for event, data in astream_answer(query.query, session_id=query.session_id, mode=query.mode):
+                if event == "answer":
+                    if vector is not None:
+                        semantic_cache.store(
+                            query.query, vector, data["answer"],
+                            sources=data["sources"], compute_seconds=time.perf_counter() - start
+                        )
+                    # TTS runs in the background so it doesn't delay the final event
+                    data["audio_id"] = audio_jobs.submit(data["answer"])
+                    yield sse_event("done", data)
+                else:
+                    yield sse_event(event, data)
+        except Exception as e:
+            print(f"Error in ask_text_stream: {str(e)}")
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/ask-batch")
+async def ask_batch(query: BatchQuery):
+    """
+    Answers a list of questions (e.g. a due-diligence checklist), streamed as Server-Sent Events:
+    one `result` event per question as soon as it is answered (with its `index` in the request),
+    then `done`. Questions share one embeddings call and are answered in parallel.
+    """
+    async def event_stream():
+        start = time.perf_counter()
+        try:
+            async for index, result in aanswer_batch(query.questions, mode=query.mode):
+                if query.tts and "answer" in result:
+                    result["audio_id"] = audio_jobs.submit(result["answer"])
+                yield sse_event("result", {"index": index, **result})
+            yield sse_event("done", {"count": len(query.questions), "seconds": round(time.perf_counter() - start, 3)})
+        except Exception as e:
+            print(f"Error in ask_batch: {str(e)}")
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+def parse_range(header: Optional[str], size: int):
+    """
+    Parses a single `Range: bytes=...` header into an inclusive (start, end) pair.
+    Returns None when there is no (usable) range and the whole clip should be sent,
+    or "unsatisfiable" when it lies outside the clip.
+    """
+    match = _RANGE.match((header or "").strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, size - int(last))
+        end = size - 1
+    if start >= size or start > end:
+        return "unsatisfiable"
+    return start, end
+
+@router.get("/audio/{audio_id}")
+async def get_audio(audio_id: str, request: Request):
+    """
+    Returns the synthesized answer audio (binary mp3) for an audio id. While synthesis
+    is still running the mp3 is streamed segment by segment, so playback starts after
+    the first sentence. Once it is complete, HTTP Range requests are supported so
+    players can seek and resume.
+    """
+    job = audio_jobs.get_job(audio_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": "private, max-age=3600"}
+    range_header = request.headers.get("range")
+    # Only a whole-clip request ("bytes=0-" is what players send first) can be streamed
+    # before synthesis finishes; any other range needs the complete clip
+    if not job.done and range_header and range_header.strip() != "bytes=0-":
+        await job.wait()
+    if not job.done:
+        return StreamingResponse(job.stream(), media_type="audio/mpeg", headers=headers)
+
+    audio = await job.wait()
+    if audio is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    byte_range = parse_range(range_header, len(audio))
+    if byte_range == "unsatisfiable":
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(audio)}"})
+    if byte_range is None:
+        return Response(content=audio, media_type="audio/mpeg", headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{len(audio)}"
+    return Response(content=audio[start:end + 1], status_code=206, media_type="audio/mpeg", headers=headers)
+
 @router.post("/ask-audio")
-def ask_audio(file: UploadFile = File(...)):
+async def ask_audio(
+    file: UploadFile = File(...),
+    session_id: Optional[str] = Form(None),
+    mode: Literal["agent", "direct"] = Form("agent"),
+    # Speaker language hint ("es", "en"), lets short clips skip language detection
+    language: Optional[str] = Form(None)
+):
     try:
-        # Determine suffix based on filename or default to .webm (common for web audio)
-        filename = file.filename or "recording.webm"
-        suffix = os.path.splitext(filename)[1]
-        if not suffix:
-            suffix = ".webm"
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
-        
-        text = transcribe_audio(tmp_path)
-        os.remove(tmp_path)
+        # The upload is decoded in memory (ffmpeg pipe -> 16 kHz float32), never written to disk.
+        # Whisper is CPU bound, run it off the event loop
+        contents = await file.read()
+        text = await run_blocking("whisper", transcribe_audio, contents, language)
         
         if not text:
             return {"error": "Could not transcribe audio"}
             
-        answer = answer_question(text)
-        audio_b64 = generate_audio(answer)
-        return {"transcription": text, "answer": answer, "audio_base64": audio_b64}
+        answer, audio_id, cached = await answer_with_cache(text, session_id, mode)
+        return {"transcription": text, **audio_response(answer, audio_id, cached)}
         
     except Exception as e:
         print(f"Error in ask_audio: {str(e)}")
         return {"error": str(e)}
+
+@router.websocket("/ws/ask-audio")
+async def ask_audio_live(
+    websocket: WebSocket,
+    session_id: Optional[str] = None,
+    mode: Literal["agent", "direct"] = "agent",
+    language: Optional[str] = None
+):
+    """
+    Live voice questions. The client streams 16 kHz mono PCM16 frames (binary messages)
+    while the user speaks and receives JSON messages: `partial` transcripts as speech is
+    recognized, `final` with the question as soon as the user stops talking (or sends
+    {"type": "stop"}), then `answer` (same fields as /ask-audio) or `error`.
+    """
+    await websocket.accept()
+    live = LiveTranscription(lambda text: websocket.send_json({"type": "partial", "text": text}), language)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                live.cancel()
+                return
+            if message.get("bytes"):
+                if live.feed(message["bytes"]):
+                    break
+            elif message.get("text") and json.loads(message["text"]).get("type") == "stop":
+                break
+
+        text = await live.finish()
+        if not text:
+            await websocket.send_json({"type": "error", "error": "Could not transcribe audio"})
+        else:
+            await websocket.send_json({"type": "final", "text": text})
+            answer, audio_id, cached = await answer_with_cache(text, session_id, mode)
+            await websocket.send_json({"type": "answer", "transcription": text, **audio_response(answer, audio_id, cached)})
+        await websocket.close()
+    except WebSocketDisconnect:
+        live.cancel()
+    except Exception as e:
+        print(f"Error in ask_audio_live: {str(e)}")
+        live.cancel()
+        try:
+            await websocket.send_json({"type": "error", "error": str(e)})
+            await websocket.close()
+        except Exception:
+            pass
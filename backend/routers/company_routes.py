@@ -4,11 +4,17 @@ import os
 import glob
 import fitz  # PyMuPDF
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_pinecone import PineconeVectorStore
+from langchain_core.documents import Document
+from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
 from dotenv import load_dotenv
 import yfinance as yf
+from backend.services.upstream_limits import limit, run_blocking
+from backend.services.embeddings import get_embeddings
+from backend.services.vector_store import get_vector_store
+from backend.services.context_packer import PackedRetriever, get_context_budget
+from backend.services.single_flight import SingleFlight
+from backend.services.ingest_manifest import sync_file
 
 load_dotenv()
 
@@ -18,7 +24,7 @@ router = APIRouter(prefix="/companies", tags=["Companies"])
 PDF_DIR = "data/pdfs"
 INDEX_NAME = "youtube-rag-index"
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+embeddings = get_embeddings()
 
 # Expanded Ticker Mapping
 TICKER_MAPPING = {
@@ -114,33 +120,55 @@ def list_companies():
     companies = [os.path.splitext(os.path.basename(f))[0] for f in files]
     return {"companies": sorted(companies)}
 
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+def split_pdf_text(pdf_path):
+    text = load_pdf_text(pdf_path)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return splitter.split_text(text)
+
+def ingest_company_pdf(vectorstore, pdf_path):
+    """
+    Puts the company PDF in the index the first time it is summarized (and again only if the
+    file changes); chunk ids are deterministic, so this never adds duplicates.
+    """
+    # Its own manifest source, so it doesn't replace the page-level chunks of scripts/ingest_data.py
+    source = f"company_summary/{os.path.basename(pdf_path)}"
+
+    def build_splits():
+        return [
+            Document(page_content=chunk, metadata={"source": source, "type": "pdf"})
+            for chunk in split_pdf_text(pdf_path)
+        ]
+
+    return sync_file(INDEX_NAME, vectorstore, source, pdf_path, build_splits, CHUNK_SIZE, CHUNK_OVERLAP)
+
+# Concurrent requests for the same company share one in-flight computation
+summary_flight = SingleFlight("company_summary")
+chart_flight = SingleFlight("company_chart")
+
 @router.get("/{company_name}/summary", response_model=ThesisResponse)
-def get_company_summary(company_name: str):
+async def get_company_summary(company_name: str):
     """Generates an executive summary for the given company using RAG."""
     pdf_path = get_pdf_path(company_name)
     if not pdf_path:
         raise HTTPException(status_code=404, detail=f"PDF for {company_name} not found.")
 
+    return await summary_flight.run(company_name.strip().lower(), build_company_summary, company_name, pdf_path)
+
+async def build_company_summary(company_name: str, pdf_path: str):
     try:
-        # 1. Load and Embed
-        text = load_pdf_text(pdf_path)
-        
-        # Ingest into Pinecone (Idempotent-ish for this session)
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        chunks = splitter.split_text(text)
-        PineconeVectorStore.from_texts(
-            texts=chunks, 
-            embedding=embeddings, 
-            index_name=INDEX_NAME
-        )
+        # 1. Ingest the PDF unless it already is (PyMuPDF and the upserts block, run them off the event loop)
+        vectorstore = get_vector_store(embeddings, INDEX_NAME)
+        await run_blocking("pinecone", ingest_company_pdf, vectorstore, pdf_path)
 
         # 2. Query
-        vectorstore = PineconeVectorStore.from_existing_index(
-            index_name=INDEX_NAME,
-            embedding=embeddings
-        )
         llm = ChatOpenAI(model="gpt-4o", temperature=0)
-        qa = RetrievalQA.from_chain_type(llm=llm, retriever=vectorstore.as_retriever())
+        qa = RetrievalQA.from_chain_type(
+            llm=llm,
+            retriever=PackedRetriever(retriever=vectorstore.as_retriever(), max_tokens=get_context_budget("company"))
+        )
 
         prompt = f"""
         Act as a senior investment analyst. Provide a detailed executive summary of {company_name} based ONLY on the provided context.
@@ -170,7 +198,9 @@ def get_company_summary(company_name: str):
 
         Do not use markdown code blocks. Return raw HTML string.
         """
-        summary = qa.run(prompt)
+        async with limit("openai"):
+            result = await qa.ainvoke({"query": prompt})
+        summary = result["result"]
         
         # Clean up if LLM wraps in markdown
         summary = summary.replace("```html", "").replace("```", "").strip()
@@ -186,8 +216,12 @@ def get_company_summary(company_name: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{company_name}/chart", response_model=ChartResponse)
-def get_company_chart(company_name: str):
+async def get_company_chart(company_name: str):
     """Generates chart data for the company using EV/FCF model."""
+    # yfinance is a blocking client, run it in a worker thread
+    return await chart_flight.run(company_name.strip().lower(), run_blocking, "yfinance", compute_company_chart, company_name)
+
+def compute_company_chart(company_name: str):
     ticker_symbol = get_ticker(company_name)
     
     # Default/Fallback Data
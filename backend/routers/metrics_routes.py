@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from backend.services import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics")
+def get_metrics():
+    """Returns the performance counters registered by the backend services."""
+    return metrics.snapshot()
@@ -2,8 +2,7 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 from langchain.chains import RetrievalQA
 from langchain_community.chat_models import ChatOpenAI
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
+from backend.services.embeddings import get_embeddings
 import os
 from dotenv import load_dotenv
 
@@ -13,7 +12,7 @@ router = APIRouter()
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = "youtube-rag-index" # Using the existing index where data is likely stored
-embeddings = OpenAIEmbeddings()
+embeddings = get_embeddings()
 
 class SummaryResponse(BaseModel):
     executive_summary: str
@@ -46,7 +45,7 @@ def load_pdf(path="NVIDIA_Thesis_INVESTMENT.pdf"):
     return text
 
 @router.get("/thesis/nvidia/summary", response_model=SummaryResponse)
-def get_nvidia_summary():
+async def get_nvidia_summary():
     
     html_content = """
     <div class='sum-wrapper'>
@@ -2,13 +2,18 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 import fitz  # PyMuPDF
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from pinecone import Pinecone, ServerlessSpec
-from langchain_pinecone import PineconeVectorStore
+from langchain_core.documents import Document
+from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
 import os
 from dotenv import load_dotenv
 import yfinance as yf
+from backend.services.upstream_limits import limit, run_blocking
+from backend.services.embeddings import get_embeddings
+from backend.services.vector_store import get_vector_store
+from backend.services.context_packer import PackedRetriever, get_context_budget
+from backend.services.single_flight import SingleFlight
+from backend.services.ingest_manifest import sync_file
 
 load_dotenv()
 
@@ -17,12 +22,10 @@ router = APIRouter()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = "youtube-rag-index"
 
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+embeddings = get_embeddings()
 
 # 1️⃣ Load PDF text
-def load_pdf(path="NVIDIA_Thesis_INVESTMENT.pdf"):
+def find_pdf(path="NVIDIA_Thesis_INVESTMENT.pdf"):
     # Adjust path to look in current dir or specific location if needed
     # Assuming the file is in the root or we can find it. 
     # For this environment, we know it's likely at d:\VALUE INVESTING CHATBOT - 2ND\NVIDIA_Thesis_INVESTMENT.pdf
@@ -43,45 +46,52 @@ def load_pdf(path="NVIDIA_Thesis_INVESTMENT.pdf"):
     
     if not os.path.exists(path):
         raise FileNotFoundError(f"PDF not found at {path}")
+    return path
 
-    doc = fitz.open(path)
+def load_pdf(path="NVIDIA_Thesis_INVESTMENT.pdf"):
+    doc = fitz.open(find_pdf(path))
     text = ""
     for page in doc:
         text += page.get_text()
     return text
 
 # 2️⃣ Chunk + embed + upload to Pinecone
-def prepare_pinecone(text):
-    # Index creation logic removed to avoid limit errors.
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 200
+
+def ingest_thesis_pdf(vectorstore, path):
+    """
+    Puts the thesis PDF in the index the first time the page is loaded (and again only if
+    the file changes); chunk ids are deterministic, so this never adds duplicates.
+    """
+    # Its own manifest source, so it doesn't replace the page-level chunks of scripts/ingest_data.py
+    source = f"thesis/{os.path.basename(path)}"
+
+    def build_splits():
+        splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        return [
+            Document(page_content=chunk, metadata={"source": source, "type": "pdf"})
+            for chunk in splitter.split_text(load_pdf(path))
+        ]
+
+    return sync_file(INDEX_NAME, vectorstore, source, path, build_splits, CHUNK_SIZE, CHUNK_OVERLAP)
+
+async def prepare_pinecone():
     # We assume 'youtube-rag-index' exists.
-    
-    # We can use the existing index
-    # Note: In a real app, we might check if we already ingested this file to avoid duplicates.
-    # For this "fix", we follow the user's logic but maybe avoid re-ingesting if it's already populated?
-    # The user's code runs this every time. I will stick to their logic but use PineconeVectorStore.
-    
-    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=200)
-    chunks = splitter.split_text(text)
-
-    # Using langchain_pinecone
-    PineconeVectorStore.from_texts(
-        texts=chunks, 
-        embedding=embeddings, 
-        index_name=INDEX_NAME
-    )
+    vectorstore = get_vector_store(embeddings, INDEX_NAME)
+    path = await run_blocking("files", find_pdf)
+    # PyMuPDF and the upserts block, run them off the event loop
+    await run_blocking("pinecone", ingest_thesis_pdf, vectorstore, path)
 
 # 3️⃣ Query RAG
-def query_nvidia():
-    vectorstore = PineconeVectorStore.from_existing_index(
-        index_name=INDEX_NAME,
-        embedding=embeddings
-    )
+async def query_nvidia():
+    vectorstore = get_vector_store(embeddings, INDEX_NAME)
 
     llm = ChatOpenAI(model="gpt-4o", temperature=0)
     
     qa = RetrievalQA.from_chain_type(
         llm=llm,
-        retriever=vectorstore.as_retriever()
+        retriever=PackedRetriever(retriever=vectorstore.as_retriever(), max_tokens=get_context_budget("thesis"))
     )
 
     prompt = """
@@ -94,8 +104,16 @@ def query_nvidia():
 
     Do not use outside information. Be concise but insightful, professional, and analytical.
     """
-    summary = qa.run(prompt)
-    
+    async with limit("openai"):
+        result = await qa.ainvoke({"query": prompt})
+    summary = result["result"]
+
+    # yfinance is a blocking client, run it in a worker thread
+    chart_data = await run_blocking("yfinance", get_nvidia_chart_data)
+
+    return summary, chart_data
+
+def get_nvidia_chart_data():
     # Calculate Intrinsic Value vs Real Value
     try:
         ticker = yf.Ticker("NVDA")
@@ -152,7 +170,7 @@ def query_nvidia():
             "price_values": [0, 0, 0, 0, 0]
         }
 
-    return summary, chart_data
+    return chart_data
 
 # FastAPI endpoint
 class ThesisResponse(BaseModel):
@@ -160,12 +178,17 @@ class ThesisResponse(BaseModel):
     chart_labels: list
     chart_values: list
 
+# Concurrent page loads share one PDF ingestion + GPT-4o + yfinance run
+thesis_flight = SingleFlight("nvidia_thesis")
+
 @router.get("/thesis/nvidia", response_model=ThesisResponse)
-def get_nvidia_thesis():
+async def get_nvidia_thesis():
+    return await thesis_flight.run("nvidia", build_nvidia_thesis)
+
+async def build_nvidia_thesis():
     try:
-        text = load_pdf()
-        prepare_pinecone(text)
-        summary, chart_data = query_nvidia()
+        await prepare_pinecone()
+        summary, chart_data = await query_nvidia()
 
         return ThesisResponse(
             summary=summary,
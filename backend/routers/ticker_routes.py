@@ -1,10 +1,15 @@
 from fastapi import APIRouter
 import yfinance as yf
+from backend.services.upstream_limits import run_blocking
 
 router = APIRouter()
 
 @router.get("/ticker")
-def get_ticker():
+async def get_ticker():
+    # yfinance is a blocking client, run it in a worker thread
+    return await run_blocking("yfinance", fetch_ticker_data)
+
+def fetch_ticker_data():
     try:
         symbols = ["AAPL", "GOOGL", "MSFT", "AMZN", "TSLA", "META", "NVDA", "BRK-B", "JPM", "V"]
         data = []
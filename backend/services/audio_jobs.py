@@ -0,0 +1,118 @@
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+
+from backend.services import metrics
+from backend.services.tts import astream_speech
+
+# How many finished/pending audio results are kept in memory
+AUDIO_JOBS_MAX = int(os.getenv("AUDIO_JOBS_MAX", "200"))
+
+
+class AudioJob:
+    """
+    Audio of one answer, filled segment by segment (one per sentence chunk) as TTS produces them.
+    Readers can stream the segments as they arrive or wait for the complete clip.
+    """
+
+    def __init__(self):
+        self.segments = []
+        self.done = False
+        self.failed = False
+        self.task = None
+        self._event = asyncio.Event()
+
+    def _notify(self):
+        # Wake everyone waiting on the current event, later waiters get a fresh one
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    def append(self, segment: bytes):
+        self.segments.append(segment)
+        self._notify()
+
+    def finish(self, failed: bool = False):
+        self.done = True
+        self.failed = failed
+        self._notify()
+
+    async def stream(self):
+        """Yields the segments in order, waiting for the ones not synthesized yet."""
+        index = 0
+        while True:
+            event = self._event
+            while index < len(self.segments):
+                yield self.segments[index]
+                index += 1
+            if self.done:
+                return
+            await event.wait()
+
+    async def wait(self):
+        """Waits for synthesis to finish; returns the complete audio, or None if it failed."""
+        while not self.done:
+            await self._event.wait()
+        if self.failed or not self.segments:
+            return None
+        return b"".join(self.segments)
+
+
+_jobs = OrderedDict()  # audio_id -> AudioJob
+
+def _add_job(job: AudioJob) -> str:
+    audio_id = uuid.uuid4().hex
+    _jobs[audio_id] = job
+    while len(_jobs) > AUDIO_JOBS_MAX:
+        _jobs.popitem(last=False)
+    return audio_id
+
+async def _synthesize(job: AudioJob, text: str, on_done):
+    try:
+        async for segment in astream_speech(text):
+            job.append(segment)
+    except Exception as e:
+        print(f"TTS Error: {e}")
+        job.finish(failed=True)
+        return
+    job.finish()
+    if on_done is not None and job.segments:
+        on_done(b"".join(job.segments))
+
+def submit(text: str, on_done=None) -> str:
+    """
+    Starts TTS synthesis in the background and returns an audio id (handle).
+    `on_done(audio_bytes)` is called when synthesis succeeds.
+    Must be called from the event loop (i.e. from an async route).
+    """
+    job = AudioJob()
+    job.task = asyncio.create_task(_synthesize(job, text, on_done))
+    return _add_job(job)
+
+def put(audio: bytes) -> str:
+    """Registers audio that is already available (e.g. from a cache) and returns its id."""
+    job = AudioJob()
+    job.append(audio)
+    job.finish()
+    return _add_job(job)
+
+def get_job(audio_id: str):
+    """Returns the AudioJob for an id, or None if it is unknown (or evicted)."""
+    return _jobs.get(audio_id)
+
+async def get_audio(audio_id: str, timeout: float = 60):
+    """
+    Waits for the audio of a job and returns its bytes.
+    Returns None if the id is unknown (or evicted) or synthesis failed.
+    """
+    job = _jobs.get(audio_id)
+    if job is None:
+        return None
+    # Only this wait is cancelled on timeout, the shared synthesis keeps running
+    return await asyncio.wait_for(job.wait(), timeout=timeout)
+
+def stats() -> dict:
+    pending = sum(1 for job in _jobs.values() if not job.done)
+    return {"jobs": len(_jobs), "pending": pending}
+
+metrics.register("audio_jobs", stats)
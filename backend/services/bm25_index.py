@@ -0,0 +1,291 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from backend.services.local_index import metadata_filter_mask
+
+BM25_INDEX_DIR = os.getenv(
+    "BM25_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "index", "bm25")
+)
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Same generation scheme as the local vector index: CURRENT names the live files
+CURRENT_FILE = "CURRENT"
+ARRAY_FILES = ("terms", "offsets", "postings", "tfs", "doc_lengths")
+DOCS_FILE = "docs.{generation}.jsonl"
+
+# Words plus compound financial terms such as "ev/fcf", "p/e" or "free-cash-flow"
+_TOKEN_RE = re.compile(r"\w+(?:[/.\-]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases, strips accents ("qué" -> "que") and splits into tokens.
+    Compound tokens are kept whole and also split into their parts, so both
+    "EV/FCF" and "FCF" match a chunk that says "EV/FCF".
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    tokens = []
+    for token in _TOKEN_RE.findall(text):
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[/.\-]", token) if part)
+    return tokens
+
+def term_hash(term: str) -> int:
+    """64-bit term id, so the vocabulary is a sorted uint64 array instead of a dict to parse at startup."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+def document_key(text: str) -> str:
+    """Identity of a chunk across the lexical and dense indexes (which assign different ids)."""
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index stored as flat numpy arrays (opened memory-mapped):
+
+    - terms:       sorted uint64 term hashes (the vocabulary)
+    - offsets:     int64, postings of terms[i] are postings[offsets[i]:offsets[i + 1]]
+    - postings:    int32 row numbers
+    - tfs:         uint16 term frequencies, parallel to postings
+    - doc_lengths: int32 token count per row
+
+    Texts and metadata live in a `.jsonl` sidecar. Loading is a handful of mmaps plus
+    reading the sidecar, and a query touches only the postings of its own terms.
+    Writes rebuild the arrays from the stored documents and publish a new generation.
+    """
+
+    def __init__(self, directory: str, k1: float = BM25_K1, b: float = BM25_B):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._loaded_mtime = None
+        self._arrays = None
+        self._ids = []
+        self._texts = []
+        self._metadatas = []
+        self._columns = {}
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    # --- Storage ---
+
+    def _path(self, name: str, generation: int) -> str:
+        return os.path.join(self.directory, f"{name}.{generation}.npy")
+
+    def _current_generation(self):
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE), "r", encoding="utf-8") as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _load(self):
+        try:
+            mtime = os.stat(os.path.join(self.directory, CURRENT_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+
+        with self._lock:
+            generation = self._current_generation()
+            if generation is None:
+                return
+            try:
+                arrays = {name: np.load(self._path(name, generation), mmap_mode="r") for name in ARRAY_FILES}
+                ids, texts, metadatas = [], [], []
+                with open(os.path.join(self.directory, DOCS_FILE.format(generation=generation)), "r", encoding="utf-8") as f:
+                    for line in f:
+                        row = json.loads(line)
+                        ids.append(row["id"])
+                        texts.append(row["text"])
+                        metadatas.append(row.get("metadata") or {})
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not load BM25 index generation {generation}: {e}")
+                return
+
+            lengths = np.asarray(arrays["doc_lengths"], dtype=np.float32)
+            arrays["avg_length"] = float(lengths.mean()) if lengths.size else 0.0
+            self._arrays = arrays
+            self._ids, self._texts, self._metadatas = ids, texts, metadatas
+            self._columns = {}
+            self._loaded_mtime = mtime
+
+    def _save(self, ids, texts, metadatas):
+        previous = self._current_generation()
+        generation = (previous or 0) + 1
+
+        # (term hash, row, tf) for every distinct term of every row, then grouped by term
+        hashes, rows, tfs, lengths = [], [], [], []
+        hash_cache = {}
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                h = hash_cache.get(term)
+                if h is None:
+                    h = hash_cache[term] = term_hash(term)
+                hashes.append(h)
+                rows.append(row)
+                tfs.append(min(tf, 65535))
+
+        hashes = np.array(hashes, dtype=np.uint64)
+        rows = np.array(rows, dtype=np.int32)
+        tfs = np.array(tfs, dtype=np.uint16)
+        order = np.lexsort((rows, hashes))
+        hashes, rows, tfs = hashes[order], rows[order], tfs[order]
+        terms, starts = np.unique(hashes, return_index=True)
+        offsets = np.append(starts, len(hashes)).astype(np.int64)
+
+        arrays = {
+            "terms": terms,
+            "offsets": offsets,
+            "postings": rows,
+            "tfs": tfs,
+            "doc_lengths": np.array(lengths, dtype=np.int32),
+        }
+        for name, array in arrays.items():
+            np.save(self._path(name, generation), array)
+        with open(os.path.join(self.directory, DOCS_FILE.format(generation=generation)), "w", encoding="utf-8") as f:
+            for row_id, text, metadata in zip(ids, texts, metadatas):
+                f.write(json.dumps({"id": row_id, "text": text, "metadata": metadata}, ensure_ascii=False) + "\n")
+
+        tmp_current = os.path.join(self.directory, CURRENT_FILE + ".tmp")
+        with open(tmp_current, "w", encoding="utf-8") as f:
+            f.write(str(generation))
+        os.replace(tmp_current, os.path.join(self.directory, CURRENT_FILE))
+
+        self._loaded_mtime = None
+        self._load()
+
+        if previous is not None:
+            paths = [self._path(name, previous) for name in ARRAY_FILES]
+            paths.append(os.path.join(self.directory, DOCS_FILE.format(generation=previous)))
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def __len__(self):
+        self._load()
+        return len(self._ids)
+
+    # --- Writes ---
+
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None) -> List[str]:
+        """Upserts documents. Without explicit ids, a chunk's id is derived from its source and text, so re-adding it is a no-op."""
+        if not documents:
+            return []
+        ids = list(ids) if ids else [document_key(f"{d.metadata.get('source', '')}\n{d.page_content}") for d in documents]
+        with self._lock:
+            self._load()
+            replaced = set(ids)
+            keep = [i for i, row_id in enumerate(self._ids) if row_id not in replaced]
+            self._save(
+                [self._ids[i] for i in keep] + ids,
+                [self._texts[i] for i in keep] + [d.page_content for d in documents],
+                [self._metadatas[i] for i in keep] + [dict(d.metadata) for d in documents],
+            )
+        return ids
+
+    def delete(self, ids: List[str]) -> bool:
+        if not ids:
+            return False
+        with self._lock:
+            self._load()
+            removed = set(ids)
+            keep = [i for i, row_id in enumerate(self._ids) if row_id not in removed]
+            if len(keep) == len(self._ids):
+                return False
+            self._save(
+                [self._ids[i] for i in keep],
+                [self._texts[i] for i in keep],
+                [self._metadatas[i] for i in keep],
+            )
+        return True
+
+    # --- Search ---
+
+    def _column(self, field: str) -> np.ndarray:
+        column = self._columns.get(field)
+        if column is None:
+            column = np.empty(len(self._metadatas), dtype=object)
+            column[:] = [m.get(field) for m in self._metadatas]
+            self._columns[field] = column
+        return column
+
+    def search(self, query: str, k: int = 4, filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        """Returns the top-k (document, BM25 score) pairs. Rows without any query term are never returned."""
+        self._load()
+        with self._lock:
+            arrays = self._arrays
+            if arrays is None or not self._ids or k <= 0:
+                return []
+
+            n = len(self._ids)
+            hashes = np.array(sorted({term_hash(t) for t in tokenize(query)}), dtype=np.uint64)
+            if hashes.size == 0:
+                return []
+            terms = arrays["terms"]
+            positions = np.searchsorted(terms, hashes)
+            in_range = positions < terms.shape[0]
+            positions, hashes = positions[in_range], hashes[in_range]
+            positions = positions[terms[positions] == hashes]
+            if positions.size == 0:
+                return []
+
+            lengths = np.asarray(arrays["doc_lengths"], dtype=np.float32)
+            norm = self.k1 * (1 - self.b + self.b * lengths / max(arrays["avg_length"], 1e-6))
+            scores = np.zeros(n, dtype=np.float32)
+            offsets = arrays["offsets"]
+            for p in positions:
+                start, end = int(offsets[p]), int(offsets[p + 1])
+                rows = arrays["postings"][start:end]
+                tf = arrays["tfs"][start:end].astype(np.float32)
+                df = end - start
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                # A term appears once per row in its postings, so plain fancy-index += is safe
+                scores[rows] += idf * tf * (self.k1 + 1) / (tf + norm[rows])
+
+            if filter:
+                scores[~metadata_filter_mask(filter, self._column, n)] = 0
+            candidates = np.flatnonzero(scores > 0)
+            if candidates.size == 0:
+                return []
+
+            k = min(k, candidates.size)
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (Document(page_content=self._texts[row], metadata=dict(self._metadatas[row])), float(scores[row]))
+                for row in top
+            ]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_bm25_index(index_name: str) -> BM25Index:
+    """Returns the process-wide BM25 index stored next to the vector index of `index_name`."""
+    with _indexes_lock:
+        index = _indexes.get(index_name)
+        if index is None:
+            index = BM25Index(os.path.join(BM25_INDEX_DIR, index_name))
+            _indexes[index_name] = index
+        return index
@@ -0,0 +1,59 @@
+import threading
+import time
+
+from backend.services import metrics
+
+
+class ComponentCache:
+    """
+    Builds an expensive object (LLM clients, vector stores, agents...) once and
+    keeps it warm for the lifetime of the process.
+    The object is rebuilt only when the configuration passed to `get` changes.
+    """
+
+    def __init__(self, name: str, builder):
+        self.name = name
+        self._builder = builder
+        self._lock = threading.Lock()
+        # (config, component), swapped as one tuple so the lock-free read never pairs
+        # a new config with the old component
+        self._entry = None
+        self.builds = 0
+        self.last_build_seconds = None
+        self.total_build_seconds = 0.0
+        metrics.register(name, self.stats)
+
+    def get(self, config):
+        # Fast path: no lock needed once the component is built
+        entry = self._entry
+        if entry is not None and entry[0] == config:
+            return entry[1]
+
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry[0] != config:
+                start = time.perf_counter()
+                value = self._builder(config)
+                elapsed = time.perf_counter() - start
+
+                entry = (config, value)
+                self._entry = entry
+                self.builds += 1
+                self.last_build_seconds = elapsed
+                self.total_build_seconds += elapsed
+                print(f"[{self.name}] Built in {elapsed:.2f}s (build #{self.builds})")
+            return entry[1]
+
+    def invalidate(self):
+        """Drops the cached component so the next `get` rebuilds it."""
+        with self._lock:
+            self._entry = None
+
+    def stats(self) -> dict:
+        entry = self._entry
+        return {
+            "builds": self.builds,
+            "last_build_seconds": self.last_build_seconds,
+            "total_build_seconds": round(self.total_build_seconds, 4),
+            "config": entry[0] if entry is not None else None,
+        }
@@ -0,0 +1,197 @@
+import os
+import threading
+from typing import List
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from backend.services import metrics
+
+# Token budget for the {context} of each "stuff" prompt (can be overridden from .env,
+# e.g. CONTEXT_BUDGET_CHAT=1500). Documents are packed in rank order until the budget is full.
+DEFAULT_BUDGETS = {
+    "chat": 2500,
+    "thesis": 3000,
+    "thesis_data": 2000,
+    "company": 3000,
+}
+# A document that doesn't fit is cut to the remaining budget, unless less than this is left
+MIN_PARTIAL_TOKENS = int(os.getenv("CONTEXT_MIN_PARTIAL_TOKENS", "80"))
+# Chunks are split with 100-200 characters of overlap; borders up to this length are deduplicated
+MAX_OVERLAP_CHARS = int(os.getenv("CONTEXT_MAX_OVERLAP_CHARS", "400"))
+MIN_OVERLAP_CHARS = 20
+
+def get_context_budget(endpoint: str) -> int:
+    default = DEFAULT_BUDGETS.get(endpoint, 2500)
+    return int(os.getenv(f"CONTEXT_BUDGET_{endpoint.upper()}", str(default)))
+
+
+class CharEstimateEncoding:
+    """
+    Stand-in for a tiktoken encoding when the real one can't be loaded (tiktoken downloads
+    its BPE files on first use, which fails offline): one "token" per 4 characters, the usual
+    average for English and Spanish text with OpenAI tokenizers.
+    """
+
+    chars_per_token = 4
+
+    def encode(self, text: str) -> List[str]:
+        step = self.chars_per_token
+        return [text[i:i + step] for i in range(0, len(text), step)]
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+def _get_encoding(model: str):
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                import tiktoken
+                try:
+                    _encodings[model] = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _encodings[model] = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                # Packing must never fail a query: budgets are approximate from here on
+                print(f"Warning: Could not load the {model} tokenizer, estimating tokens from characters: {e}")
+                _encodings[model] = CharEstimateEncoding()
+        return _encodings[model]
+
+def warm_up(model: str = "gpt-4o"):
+    """Loads the tokenizer (and downloads its BPE file if needed) before the first request."""
+    _get_encoding(model)
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    return len(_get_encoding(model).encode(text))
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4o") -> str:
+    encoding = _get_encoding(model)
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right` (0 if shorter than MIN_OVERLAP_CHARS)."""
+    if len(left) < MIN_OVERLAP_CHARS or len(right) < MIN_OVERLAP_CHARS:
+        return 0
+    head = right[:MIN_OVERLAP_CHARS]
+    window_start = max(0, len(left) - MAX_OVERLAP_CHARS)
+    pos = left.find(head, window_start)
+    while pos != -1:
+        if right.startswith(left[pos:]):
+            return len(left) - pos
+        pos = left.find(head, pos + 1)
+    return 0
+
+def trim_overlaps(text: str, packed: List[str]) -> str:
+    """
+    Removes from `text` the border it shares with an already packed chunk of the same source
+    (the splitter's chunk_overlap), whichever side of the other chunk it comes from.
+    """
+    for other in packed:
+        cut = _overlap(other, text)
+        if cut:
+            text = text[cut:]
+        cut = _overlap(text, other)
+        if cut:
+            text = text[:-cut]
+    return text.strip()
+
+
+class PackerStats:
+    def __init__(self):
+        self.calls = 0
+        self.docs_in = 0
+        self.docs_out = 0
+        self.tokens_out = 0
+        self.tokens_saved = 0
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "docs_in": self.docs_in,
+            "docs_out": self.docs_out,
+            "avg_context_tokens": round(self.tokens_out / self.calls, 1) if self.calls else 0.0,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+packer_stats = PackerStats()
+metrics.register("context_packer", packer_stats.stats)
+
+
+def pack_documents(docs: List[Document], max_tokens: int, model: str = "gpt-4o") -> List[Document]:
+    """
+    Fits ranked documents into a token budget, in rank order:
+    overlapping chunk borders are trimmed, the first document that doesn't fit is cut
+    to the remaining budget, and everything ranked below it is dropped.
+    Returns copies; the input documents are not modified.
+    """
+    packed = []
+    texts_by_source = {}
+    used = 0
+    total = 0
+    full = False
+    separator = count_tokens("\n\n", model)
+    for doc in docs:
+        total += count_tokens(doc.page_content, model)
+        if full:
+            continue
+        source = doc.metadata.get("source")
+        text = trim_overlaps(doc.page_content, texts_by_source.get(source, []))
+        if not text:
+            continue
+
+        tokens = count_tokens(text, model) + (separator if packed else 0)
+        if used + tokens > max_tokens:
+            full = True
+            remaining = max_tokens - used - (separator if packed else 0)
+            if remaining < MIN_PARTIAL_TOKENS:
+                continue
+            text = truncate_tokens(text, remaining, model)
+            tokens = remaining + (separator if packed else 0)
+
+        packed.append(Document(page_content=text, metadata=dict(doc.metadata)))
+        texts_by_source.setdefault(source, []).append(text)
+        used += tokens
+
+    packer_stats.calls += 1
+    packer_stats.docs_in += len(docs)
+    packer_stats.docs_out += len(packed)
+    packer_stats.tokens_out += used
+    packer_stats.tokens_saved += max(0, total - used)
+    return packed
+
+
+class PackedRetriever(BaseRetriever):
+    """Wraps a retriever so its documents always fit the `{context}` token budget of a stuff prompt."""
+
+    retriever: BaseRetriever
+    max_tokens: int
+    model: str = "gpt-4o"
+
+    @property
+    def search_type(self) -> str:
+        return getattr(self.retriever, "search_type", "similarity")
+
+    @property
+    def search_kwargs(self) -> dict:
+        # Read by the retrieval cache to build its key
+        return {**getattr(self.retriever, "search_kwargs", {}), "max_tokens": self.max_tokens}
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return pack_documents(self.retriever.invoke(query), self.max_tokens, self.model)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return pack_documents(await self.retriever.ainvoke(query), self.max_tokens, self.model)
@@ -0,0 +1,154 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from backend.services import metrics
+from backend.services.disk_cache import DiskCache
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "20000"))
+EMBEDDING_DISK_CACHE = os.getenv("EMBEDDING_DISK_CACHE", "1") == "1"
+EMBEDDING_DISK_CACHE_PATH = os.getenv(
+    "EMBEDDING_DISK_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 "data", "cache", "embeddings.sqlite")
+)
+EMBEDDING_DISK_CACHE_MAX_MB = int(os.getenv("EMBEDDING_DISK_CACHE_MAX_MB", "512"))
+
+def normalize_text(text: str) -> str:
+    # Whitespace differences don't change the meaning of a query
+    return " ".join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps OpenAIEmbeddings with an in-memory LRU and an optional on-disk cache,
+    keyed by (model, normalized text). Queries and documents share the same cache,
+    so any text is embedded remotely only once.
+    """
+
+    def __init__(self, model: str = DEFAULT_EMBEDDING_MODEL, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+                 disk_cache: DiskCache = None):
+        self.model = model
+        self.max_entries = max_entries
+        self.disk_cache = disk_cache
+        self.client = OpenAIEmbeddings(model=model)
+        self._lru = OrderedDict()  # key -> np.float32 vector
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector):
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def _lookup(self, texts):
+        """Returns (keys, {index: vector} for cached texts, [indexes to embed])."""
+        keys = [self._key(t) for t in texts]
+        found = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    found[i] = vector
+            self.hits += len(found)
+
+        missing = [i for i in range(len(texts)) if i not in found]
+        if missing and self.disk_cache is not None:
+            stored = self.disk_cache.get_many({keys[i] for i in missing})
+            for i in missing:
+                blob = stored.get(keys[i])
+                if blob is not None:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[i] = vector
+                    self._remember(keys[i], vector)
+                    self.disk_hits += 1
+            missing = [i for i in missing if i not in found]
+
+        self.misses += len(missing)
+        return keys, found, missing
+
+    def _store(self, keys, found, missing, vectors):
+        to_disk = {}
+        for i, vector in zip(missing, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            found[i] = vector
+            self._remember(keys[i], vector)
+            to_disk[keys[i]] = vector.tobytes()
+        if to_disk and self.disk_cache is not None:
+            self.disk_cache.set_many(to_disk)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts)
+        if missing:
+            # Only the texts that are not cached are sent, in a single batched call
+            vectors = self.client.embed_documents([texts[i] for i in missing])
+            self._store(keys, found, missing, vectors)
+        return [found[i].tolist() for i in range(len(texts))]
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._lookup([text])
+        if missing:
+            self._store(keys, found, missing, [self.client.embed_query(text)])
+        return found[0].tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts)
+        if missing:
+            vectors = await self.client.aembed_documents([texts[i] for i in missing])
+            self._store(keys, found, missing, vectors)
+        return [found[i].tolist() for i in range(len(texts))]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._lookup([text])
+        if missing:
+            self._store(keys, found, missing, [await self.client.aembed_query(text)])
+        return found[0].tolist()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._lru),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+_instances = {}
+_instances_lock = threading.Lock()
+_disk_cache = None
+
+def get_embeddings(model: str = DEFAULT_EMBEDDING_MODEL) -> CachedEmbeddings:
+    """Returns the process-wide cached embeddings for a model (created on first use)."""
+    global _disk_cache
+    with _instances_lock:
+        embeddings = _instances.get(model)
+        if embeddings is None:
+            if EMBEDDING_DISK_CACHE and _disk_cache is None:
+                try:
+                    _disk_cache = DiskCache(EMBEDDING_DISK_CACHE_PATH, EMBEDDING_DISK_CACHE_MAX_MB * 1024 * 1024)
+                    metrics.register("embedding_disk_cache", _disk_cache.stats)
+                except Exception as e:
+                    print(f"Warning: Could not open embedding disk cache: {e}")
+            embeddings = CachedEmbeddings(model=model, disk_cache=_disk_cache)
+            _instances[model] = embeddings
+            metrics.register(f"embeddings.{model}", embeddings.stats)
+        return embeddings
@@ -0,0 +1,97 @@
+import asyncio
+import os
+from typing import Any, List
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from backend.services.bm25_index import document_key, get_bm25_index
+from backend.services.vector_store import search_with_vectors
+
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "1") == "1"
+# Candidates taken from each side before fusion
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))
+# Reciprocal rank fusion constant (60 is the value from the original RRF paper)
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Document]], k: int, rrf_k: int = HYBRID_RRF_K) -> List[Document]:
+    """
+    Merges ranked lists: a document scores sum(1 / (rrf_k + rank)) over the lists it appears in.
+    Ranks are used instead of raw scores because BM25 and cosine scores are not comparable.
+    """
+    scores = {}
+    docs = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = document_key(doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ranked[:k]]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense (vector store) + lexical (BM25) retrieval fused with reciprocal rank fusion.
+    Exact terms such as "EV/FCF" or "ROIC" are found by BM25 even when the embedding ranks them low.
+    Falls back to dense-only results while the BM25 index is empty.
+    """
+
+    vector_store: Any
+    lexical_index: Any
+    search_kwargs: dict
+    search_type: str = "hybrid"
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = HYBRID_RRF_K
+
+    def _params(self):
+        k = self.search_kwargs.get("k", 4)
+        return k, max(self.fetch_k, k), self.search_kwargs.get("filter")
+
+    def _lexical(self, query: str, fetch_k: int, filter):
+        return [doc for doc, _ in self.lexical_index.search(query, k=fetch_k, filter=filter)]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        k, fetch_k, filter = self._params()
+        dense = self.vector_store.similarity_search(query, k=fetch_k, filter=filter)
+        return reciprocal_rank_fusion([dense, self._lexical(query, fetch_k, filter)], k, self.rrf_k)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        k, fetch_k, filter = self._params()
+        dense = await self.vector_store.asimilarity_search(query, k=fetch_k, filter=filter)
+        # BM25 over the memory-mapped postings takes a few milliseconds, no need for a thread
+        return reciprocal_rank_fusion([dense, self._lexical(query, fetch_k, filter)], k, self.rrf_k)
+
+    def search_with_vectors(self, query: str, query_vector):
+        """
+        Same fused candidates as a search, plus the stored vector of each dense hit (None for
+        lexical-only hits), for MMR. Returns None if the vector store can't return its vectors.
+        """
+        k, fetch_k, filter = self._params()
+        dense = search_with_vectors(self.vector_store, query_vector, k=fetch_k, filter=filter)
+        if dense is None:
+            return None
+        docs = reciprocal_rank_fusion([[doc for doc, _ in dense], self._lexical(query, fetch_k, filter)], k, self.rrf_k)
+        vectors = {document_key(doc.page_content): vector for doc, vector in dense}
+        return docs, [vectors.get(document_key(doc.page_content)) for doc in docs]
+
+    async def asearch_with_vectors(self, query: str, query_vector):
+        # The Pinecone client is blocking
+        return await asyncio.to_thread(self.search_with_vectors, query, query_vector)
+
+
+def hybrid_retriever(vector_store, search_kwargs: dict, index_name: str, enabled: bool = HYBRID_SEARCH_ENABLED) -> BaseRetriever:
+    """Hybrid retriever for an index, or the plain dense retriever when hybrid search is disabled."""
+    if not enabled:
+        return vector_store.as_retriever(search_kwargs=search_kwargs)
+    return HybridRetriever(
+        vector_store=vector_store,
+        lexical_index=get_bm25_index(index_name),
+        search_kwargs=search_kwargs,
+    )
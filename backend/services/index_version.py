@@ -0,0 +1,57 @@
+import json
+import os
+import threading
+import time
+
+# Shared between the API server and the ingestion scripts (separate processes),
+# so the version lives in a small file next to the data.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INDEX_VERSION_PATH = os.getenv(
+    "INDEX_VERSION_PATH",
+    os.path.join(BASE_DIR, "data", "index", "index_version.json")
+)
+
+_lock = threading.Lock()
+_cached_mtime = None
+_cached_version = 0
+
+def get_version() -> int:
+    """
+    Returns the current index version. It is bumped every time ingestion
+    writes new vectors, so caches built on retrieval results can tell they are stale.
+    """
+    global _cached_mtime, _cached_version
+    try:
+        mtime = os.stat(INDEX_VERSION_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+    if mtime != _cached_mtime:
+        with _lock:
+            try:
+                with open(INDEX_VERSION_PATH, "r", encoding="utf-8") as f:
+                    _cached_version = json.load(f).get("version", 0)
+                _cached_mtime = mtime
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read index version: {e}")
+    return _cached_version
+
+def bump(reason: str = "") -> int:
+    """Increments the index version after an ingestion wrote to the vector store."""
+    with _lock:
+        current = 0
+        try:
+            with open(INDEX_VERSION_PATH, "r", encoding="utf-8") as f:
+                current = json.load(f).get("version", 0)
+        except (OSError, ValueError):
+            pass
+
+        version = current + 1
+        os.makedirs(os.path.dirname(INDEX_VERSION_PATH), exist_ok=True)
+        tmp_path = INDEX_VERSION_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "updated_at": time.time(), "reason": reason}, f)
+        os.replace(tmp_path, INDEX_VERSION_PATH)
+
+    print(f"Index version bumped to {version} ({reason})")
+    return version
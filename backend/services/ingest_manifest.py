@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, List
+
+from langchain_core.documents import Document
+
+from backend.services import index_version
+from backend.services.bm25_index import document_key, get_bm25_index
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INGEST_MANIFEST_DIR = os.getenv("INGEST_MANIFEST_DIR", os.path.join(BASE_DIR, "data", "index", "manifest"))
+
+# Serializes the manifest updates made by the API process
+_sync_lock = threading.Lock()
+
+
+def chunk_id(doc: Document) -> str:
+    """
+    Deterministic vector id of a chunk, derived from its source and text: re-ingesting the
+    same chunk overwrites it instead of adding a copy. Same key as the BM25 index uses.
+    """
+    return document_key(f"{doc.metadata.get('source', '')}\n{doc.page_content}")
+
+def content_hash(content, *settings) -> str:
+    """
+    Hash of a source's content (file bytes or text) plus the settings that shape its chunks
+    (e.g. chunk size/overlap), so changing the splitter re-ingests the source too.
+    """
+    digest = hashlib.sha256(content if isinstance(content, bytes) else content.encode("utf-8"))
+    for setting in settings:
+        digest.update(f"\0{setting}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """
+    Local record of what each source put in an index: {source: {"hash", "chunks"}}.
+
+    The ingestion scripts use it to skip sources whose content hash didn't change and,
+    for changed ones, to upsert only the new chunks and delete the stale ones, so running
+    them again never duplicates vectors. Written after the vector store accepted the
+    changes, so an interrupted run is simply redone (upserts by id are idempotent).
+    """
+
+    def __init__(self, index_name: str, directory: str = INGEST_MANIFEST_DIR):
+        self.index_name = index_name
+        self.path = os.path.join(directory, f"{index_name}.json")
+        self.sources = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.sources = json.load(f).get("sources", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read ingest manifest {self.path}, starting a new one: {e}")
+
+    def is_unchanged(self, source: str, digest: str) -> bool:
+        entry = self.sources.get(source)
+        return entry is not None and entry.get("hash") == digest
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"index": self.index_name, "sources": self.sources}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def sync_source(self, vector_store, source: str, splits: List[Document], digest: str,
+                    rebuild: bool = False) -> dict:
+        """
+        Makes the index hold exactly `splits` for `source`: upserts the chunks it doesn't
+        have yet and deletes the ones the source no longer produces (vector store and BM25).
+        Returns counts of added / deleted / kept chunks, or skipped=True if `digest` is unchanged.
+
+        With `rebuild`, every vector of the source (and of the sources its chunks name, e.g. a
+        video id) is deleted by metadata first and all chunks are re-added: this migrates
+        vectors stored under random ids before the manifest existed.
+        """
+        if rebuild:
+            from backend.services.vector_store import delete_by_source
+
+            for name in sorted({source} | {doc.metadata.get("source") for doc in splits} - {None}):
+                delete_by_source(vector_store, name)
+            self.sources.pop(source, None)
+        elif self.is_unchanged(source, digest):
+            return {"skipped": True, "added": 0, "deleted": 0, "kept": len(self.sources[source]["chunks"])}
+
+        ids, docs, seen = [], [], set()
+        for doc in splits:
+            doc_id = chunk_id(doc)
+            # Identical chunks of one source (repeated headers...) are stored once
+            if doc_id not in seen:
+                seen.add(doc_id)
+                ids.append(doc_id)
+                docs.append(doc)
+
+        previous = self.sources.get(source, {}).get("chunks", [])
+        known = set(previous)
+        new_ids = [doc_id for doc_id in ids if doc_id not in known]
+        new_docs = [doc for doc_id, doc in zip(ids, docs) if doc_id not in known]
+        stale = [doc_id for doc_id in previous if doc_id not in seen]
+
+        lexical_index = get_bm25_index(self.index_name)
+        if new_docs:
+            vector_store.add_documents(documents=new_docs, ids=new_ids)
+            lexical_index.add_documents(new_docs, ids=new_ids)
+        if stale:
+            vector_store.delete(ids=stale)
+            lexical_index.delete(stale)
+
+        self.sources[source] = {"hash": digest, "chunks": ids}
+        self.save()
+        if new_docs or stale:
+            index_version.bump(f"{source}: +{len(new_docs)} -{len(stale)} chunks")
+        return {"skipped": False, "added": len(new_docs), "deleted": len(stale), "kept": len(ids) - len(new_docs)}
+
+
+def sync_file(index_name: str, vector_store, source: str, path: str,
+              build_splits: Callable[[], List[Document]], *settings) -> dict:
+    """
+    Ingests a file from a request handler (e.g. the PDF behind a company summary) through
+    the manifest: the file bytes are hashed and `build_splits()` only runs if they changed
+    since the last sync, so repeated page loads don't re-embed it, add copies or bump the
+    index version. The manifest is re-read under a process-wide lock so concurrent requests
+    (or a script run meanwhile) don't overwrite each other's entries.
+    """
+    with open(path, "rb") as f:
+        digest = content_hash(f.read(), *settings)
+    return sync_content(index_name, vector_store, source, digest, build_splits)
+
+def sync_content(index_name: str, vector_store, source: str, digest: str,
+                 build_splits: Callable[[], List[Document]]) -> dict:
+    """
+    sync_file for content that is already hashed (e.g. a video transcript ingested by the
+    agent's YouTube tool): same skip-if-unchanged check, under the same lock.
+    """
+    with _sync_lock:
+        manifest = IngestManifest(index_name)
+        splits = [] if manifest.is_unchanged(source, digest) else build_splits()
+        return manifest.sync_source(vector_store, source, splits, digest)
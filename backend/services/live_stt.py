@@ -0,0 +1,228 @@
+import asyncio
+import os
+from collections import deque
+
+import numpy as np
+
+from backend.services import metrics
+from backend.services.stt_service import BATCH_MAX_SAMPLES, SAMPLE_RATE, get_stt_service, language_hint
+
+# Live transcription of microphone audio (16 kHz mono PCM16 frames sent over a WebSocket).
+# A pause of VAD_PAUSE_MS closes a speech segment, which is transcribed right away;
+# VAD_END_MS of silence after speech means the user finished the question.
+VAD_FRAME_MS = 30
+VAD_PAUSE_MS = int(os.getenv("VAD_PAUSE_MS", "500"))
+VAD_END_MS = int(os.getenv("VAD_END_MS", "1200"))
+# Segments with less speech than this are noise (clicks, breathing) and are not transcribed
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "250"))
+# A frame is speech when it is this much louder than the running noise floor (and above VAD_MIN_DB)
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))
+VAD_MIN_DB = float(os.getenv("VAD_MIN_DB", "-45"))
+# Audio kept from before the speech onset so the first syllable isn't cut
+VAD_PREROLL_MS = 300
+# While the user keeps talking, the open segment is re-transcribed this often for partial results
+LIVE_PARTIAL_MS = int(os.getenv("LIVE_PARTIAL_MS", "1000"))
+
+FRAME_SAMPLES = SAMPLE_RATE * VAD_FRAME_MS // 1000
+
+
+def pcm16_to_float32(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+
+
+class EnergyVad:
+    """Frame-level voice activity detection on loudness against an adaptive noise floor."""
+
+    def __init__(self, margin_db: float = VAD_MARGIN_DB, min_db: float = VAD_MIN_DB):
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.noise_floor_db = -60.0
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.mean(frame * frame))) if len(frame) else 0.0
+        level_db = 20 * np.log10(max(rms, 1e-10))
+        speech = level_db > max(self.min_db, self.noise_floor_db + self.margin_db)
+        if not speech:
+            # Track the background level slowly so a noisy room doesn't count as speech
+            self.noise_floor_db = 0.95 * self.noise_floor_db + 0.05 * level_db
+        return speech
+
+
+class SpeechSegmenter:
+    """
+    Splits a stream of samples into speech segments.
+    `feed` returns the events produced by the new samples: ("segment", audio) when a pause
+    closes a segment and ("end", None) once, when the user has stopped talking.
+    """
+
+    def __init__(self, vad: EnergyVad = None):
+        self.vad = vad or EnergyVad()
+        self._pending = np.zeros(0, np.float32)
+        self._preroll = deque(maxlen=VAD_PREROLL_MS // VAD_FRAME_MS)
+        self._segment = None  # frames of the open segment, None between segments
+        self._speech_frames = 0
+        self._silence_frames = 0
+        self.heard_speech = False
+        self.ended = False
+
+    def feed(self, samples: np.ndarray):
+        events = []
+        samples = np.concatenate([self._pending, samples])
+        usable = len(samples) - len(samples) % FRAME_SAMPLES
+        self._pending = samples[usable:]
+        for start in range(0, usable, FRAME_SAMPLES):
+            events.extend(self._feed_frame(samples[start:start + FRAME_SAMPLES]))
+        return events
+
+    def _feed_frame(self, frame: np.ndarray):
+        speech = self.vad.is_speech(frame)
+        self._silence_frames = 0 if speech else self._silence_frames + 1
+
+        if self._segment is None:
+            if speech:
+                self._segment = list(self._preroll) + [frame]
+                self._speech_frames = 1
+                self._preroll.clear()
+                return []
+            self._preroll.append(frame)
+            if self.heard_speech and not self.ended and self._silence_frames * VAD_FRAME_MS >= VAD_END_MS:
+                self.ended = True
+                return [("end", None)]
+            return []
+
+        self._segment.append(frame)
+        if speech:
+            self._speech_frames += 1
+        if (self._silence_frames * VAD_FRAME_MS >= VAD_PAUSE_MS
+                or len(self._segment) * FRAME_SAMPLES >= BATCH_MAX_SAMPLES):
+            audio = self.flush()
+            return [("segment", audio)] if audio is not None else []
+        return []
+
+    def current(self):
+        """Audio of the segment still being spoken, or None."""
+        if self._segment is None:
+            return None
+        return np.concatenate(self._segment)
+
+    def flush(self):
+        """Closes the open segment; returns its audio, or None if it had too little speech."""
+        audio = self.current()
+        enough = self._speech_frames * VAD_FRAME_MS >= VAD_MIN_SPEECH_MS
+        self._segment = None
+        self._speech_frames = 0
+        if audio is None or not enough:
+            return None
+        self.heard_speech = True
+        return audio
+
+
+class LiveStats:
+    def __init__(self):
+        self.sessions = 0
+        self.segments = 0
+        self.partials = 0
+
+    def stats(self) -> dict:
+        return {"sessions": self.sessions, "segments": self.segments, "partials": self.partials}
+
+
+live_stats = LiveStats()
+metrics.register("live_stt", live_stats.stats)
+
+
+async def _transcribe(audio: np.ndarray, language: str = None) -> str:
+    # Goes through the shared STT queue, so live segments batch with uploaded clips.
+    # Live microphone audio never repeats exactly, so it isn't worth caching
+    return await asyncio.wrap_future(get_stt_service().submit(audio, cache=False, language=language))
+
+
+class LiveTranscription:
+    """
+    Incremental transcript of one live recording.
+
+    Closed segments are transcribed as soon as the pause that ends them is detected;
+    the segment still being spoken is re-transcribed every LIVE_PARTIAL_MS. `on_partial(text)`
+    is awaited with the transcript so far whenever it changes.
+    """
+
+    def __init__(self, on_partial, language: str = None):
+        self.on_partial = on_partial
+        self.language = language_hint(language)
+        self.segmenter = SpeechSegmenter()
+        self._segments = []  # transcription tasks of closed segments, in order
+        self._partial_task = None
+        self._partial_samples = 0
+        self._finished = False
+        live_stats.sessions += 1
+
+    def feed(self, pcm: bytes) -> bool:
+        """Adds PCM16 audio; returns True once the user has stopped talking."""
+        for event, audio in self.segmenter.feed(pcm16_to_float32(pcm)):
+            if event == "segment":
+                self._add_segment(audio)
+            elif event == "end":
+                return True
+
+        current = self.segmenter.current()
+        if current is None:
+            self._partial_samples = 0
+        elif (len(current) - self._partial_samples >= SAMPLE_RATE * LIVE_PARTIAL_MS // 1000
+                and (self._partial_task is None or self._partial_task.done())):
+            self._partial_samples = len(current)
+            self._partial_task = asyncio.create_task(self._partial(current))
+        return False
+
+    def _add_segment(self, audio: np.ndarray):
+        live_stats.segments += 1
+        task = asyncio.create_task(_transcribe(audio, self.language))
+        task.add_done_callback(lambda _: asyncio.create_task(self._emit()))
+        self._segments.append(task)
+
+    def _committed(self):
+        """Text of the closed segments transcribed so far (only the in-order prefix)."""
+        texts = []
+        for task in self._segments:
+            if not task.done():
+                break
+            if not task.cancelled() and task.exception() is None and task.result():
+                texts.append(task.result())
+        return texts
+
+    async def _emit(self, tail: str = ""):
+        if self._finished:
+            return
+        text = " ".join(self._committed() + ([tail] if tail else []))
+        if text:
+            live_stats.partials += 1
+            try:
+                await self.on_partial(text)
+            except Exception as e:
+                print(f"Warning: Could not send partial transcript: {e}")
+
+    async def _partial(self, audio: np.ndarray):
+        segments = len(self._segments)
+        try:
+            text = await _transcribe(audio, self.language)
+        except Exception as e:
+            print(f"Warning: Live partial transcription failed: {e}")
+            return
+        # Stale if the segment was closed meanwhile: its final text is emitted instead
+        if len(self._segments) == segments:
+            await self._emit(text)
+
+    async def finish(self) -> str:
+        """Transcribes what is left and returns the final transcript."""
+        audio = self.segmenter.flush()
+        if audio is not None:
+            self._add_segment(audio)
+        if self._partial_task is not None:
+            self._partial_task.cancel()
+        await asyncio.gather(*self._segments, return_exceptions=True)
+        self._finished = True
+        return " ".join(self._committed()).strip()
+
+    def cancel(self):
+        self._finished = True
+        for task in self._segments + ([self._partial_task] if self._partial_task else []):
+            task.cancel()
@@ -0,0 +1,337 @@
+import json
+import os
+import threading
+import uuid
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+# A write produces a new generation of files; CURRENT names the live one.
+# Readers never see a half-written index, and files that are still memory-mapped
+# elsewhere are never overwritten in place (which Windows doesn't allow).
+CURRENT_FILE = "CURRENT"
+VECTORS_FILE = "vectors.{generation}.npy"
+METADATA_FILE = "metadata.{generation}.jsonl"
+
+
+def _column_mask(column: np.ndarray, condition) -> np.ndarray:
+    """Evaluates one Pinecone-style field condition against a column of metadata values."""
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+
+    mask = np.ones(len(column), dtype=bool)
+    for op, value in condition.items():
+        if op == "$eq":
+            mask &= column == value
+        elif op == "$ne":
+            mask &= column != value
+        elif op == "$in":
+            mask &= np.isin(column, list(value))
+        elif op == "$nin":
+            mask &= ~np.isin(column, list(value))
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            numeric = np.array([v if isinstance(v, (int, float)) else np.nan for v in column], dtype=float)
+            with np.errstate(invalid="ignore"):
+                if op == "$gt":
+                    mask &= numeric > value
+                elif op == "$gte":
+                    mask &= numeric >= value
+                elif op == "$lt":
+                    mask &= numeric < value
+                else:
+                    mask &= numeric <= value
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+    return mask
+
+
+def metadata_filter_mask(filter: dict, column: Callable[[str], np.ndarray], size: int) -> np.ndarray:
+    """
+    Evaluates a Pinecone-style metadata filter over `size` rows.
+    `column(field)` returns the values of a metadata field for every row (object array).
+    """
+    mask = np.ones(size, dtype=bool)
+    for field, condition in filter.items():
+        if field == "$and":
+            for sub in condition:
+                mask &= metadata_filter_mask(sub, column, size)
+        elif field == "$or":
+            any_mask = np.zeros(size, dtype=bool)
+            for sub in condition:
+                any_mask |= metadata_filter_mask(sub, column, size)
+            mask &= any_mask
+        else:
+            mask &= _column_mask(column(field), condition)
+    return mask
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process exact vector index.
+
+    Vectors are L2-normalized and stored as a float32 matrix in a `.npy` file,
+    opened memory-mapped, with texts, ids and metadata in a `.jsonl` sidecar
+    (one line per row). Search is a single matrix-vector product (cosine similarity)
+    plus a vectorized metadata mask supporting the Pinecone filter subset used in this
+    project: equality, $eq, $ne, $in, $nin, $gt/$gte/$lt/$lte, $and and $or.
+
+    Writes produce a new generation of files; other processes (e.g. the API server
+    while an ingestion script runs) pick it up on their next search.
+    """
+
+    def __init__(self, directory: str, embedding: Embeddings):
+        self.directory = directory
+        self.embedding = embedding
+        self._lock = threading.RLock()
+        self._loaded_mtime = None
+        self._generation = None
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._ids = []
+        self._texts = []
+        self._metadatas = []
+        self._columns = {}
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding
+
+    # --- Storage ---
+
+    def _current_generation(self):
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE), "r", encoding="utf-8") as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _load(self):
+        current_path = os.path.join(self.directory, CURRENT_FILE)
+        try:
+            mtime = os.stat(current_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+
+        with self._lock:
+            generation = self._current_generation()
+            if generation is None:
+                return
+            try:
+                vectors = np.load(os.path.join(self.directory, VECTORS_FILE.format(generation=generation)), mmap_mode="r")
+                ids, texts, metadatas = [], [], []
+                with open(os.path.join(self.directory, METADATA_FILE.format(generation=generation)), "r", encoding="utf-8") as f:
+                    for line in f:
+                        row = json.loads(line)
+                        ids.append(row["id"])
+                        texts.append(row["text"])
+                        metadatas.append(row.get("metadata") or {})
+            except (OSError, ValueError) as e:
+                # A writer may have just replaced this generation, keep serving the loaded one
+                print(f"Warning: Could not load local index generation {generation}: {e}")
+                return
+
+            self._vectors = vectors
+            self._ids, self._texts, self._metadatas = ids, texts, metadatas
+            self._columns = {}
+            self._generation = generation
+            self._loaded_mtime = mtime
+
+    def _save(self, vectors: np.ndarray, ids, texts, metadatas):
+        previous = self._current_generation()
+        generation = (previous or 0) + 1
+
+        with open(os.path.join(self.directory, METADATA_FILE.format(generation=generation)), "w", encoding="utf-8") as f:
+            for row_id, text, metadata in zip(ids, texts, metadatas):
+                f.write(json.dumps({"id": row_id, "text": text, "metadata": metadata}, ensure_ascii=False) + "\n")
+        np.save(
+            os.path.join(self.directory, VECTORS_FILE.format(generation=generation)),
+            np.ascontiguousarray(vectors, dtype=np.float32)
+        )
+
+        tmp_current = os.path.join(self.directory, CURRENT_FILE + ".tmp")
+        with open(tmp_current, "w", encoding="utf-8") as f:
+            f.write(str(generation))
+        os.replace(tmp_current, os.path.join(self.directory, CURRENT_FILE))
+
+        self._loaded_mtime = None
+        self._load()
+
+        # Old generations can only be removed once nobody maps them; ignore failures
+        if previous is not None:
+            for name in (VECTORS_FILE, METADATA_FILE):
+                try:
+                    os.remove(os.path.join(self.directory, name.format(generation=previous)))
+                except OSError:
+                    pass
+
+    def __len__(self):
+        self._load()
+        return len(self._ids)
+
+    # --- Filtering ---
+
+    def _column(self, field: str) -> np.ndarray:
+        column = self._columns.get(field)
+        if column is None:
+            column = np.empty(len(self._metadatas), dtype=object)
+            column[:] = [m.get(field) for m in self._metadatas]
+            self._columns[field] = column
+        return column
+
+    def _filter_mask(self, filter: dict) -> np.ndarray:
+        return metadata_filter_mask(filter, self._column, len(self._ids))
+
+    # --- Writes ---
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+
+        new_vectors = np.asarray(self.embedding.embed_documents(texts), dtype=np.float32)
+        new_vectors /= np.maximum(np.linalg.norm(new_vectors, axis=1, keepdims=True), 1e-12)
+
+        with self._lock:
+            self._load()
+            # Upsert: rows with an existing id are replaced
+            replaced = set(ids)
+            keep = [i for i, row_id in enumerate(self._ids) if row_id not in replaced]
+            old_vectors = np.asarray(self._vectors[keep]) if keep else np.zeros((0, new_vectors.shape[1]), dtype=np.float32)
+            vectors = np.vstack([old_vectors, new_vectors])
+            all_ids = [self._ids[i] for i in keep] + ids
+            all_texts = [self._texts[i] for i in keep] + texts
+            all_metadatas = [self._metadatas[i] for i in keep] + [dict(m) for m in metadatas]
+            self._save(vectors, all_ids, all_texts, all_metadatas)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[dict] = None, **kwargs: Any) -> Optional[bool]:
+        """Deletes the rows with the given ids, or (like Pinecone) the rows matching a metadata filter."""
+        if not ids and not filter:
+            return False
+        with self._lock:
+            self._load()
+            if ids:
+                removed = set(ids)
+                keep = [i for i, row_id in enumerate(self._ids) if row_id not in removed]
+            else:
+                keep = np.flatnonzero(~self._filter_mask(filter)).tolist()
+            if len(keep) == len(self._ids):
+                return False
+            dim = self._vectors.shape[1] if self._vectors.ndim == 2 else 0
+            vectors = np.asarray(self._vectors[keep]) if keep else np.zeros((0, dim), dtype=np.float32)
+            self._save(
+                vectors,
+                [self._ids[i] for i in keep],
+                [self._texts[i] for i in keep],
+                [self._metadatas[i] for i in keep],
+            )
+        return True
+
+    # --- Search ---
+
+    def search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None):
+        """Returns [(index, score)] of the top-k rows by cosine similarity."""
+        self._load()
+        with self._lock:
+            if not self._ids or k <= 0:
+                return []
+            query = np.asarray(embedding, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1.0)
+
+            if filter:
+                candidates = np.flatnonzero(self._filter_mask(filter))
+                if candidates.size == 0:
+                    return []
+                scores = self._vectors[candidates] @ query
+            else:
+                candidates = None
+                scores = self._vectors @ query
+
+            k = min(k, scores.shape[0])
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            rows = candidates[top] if candidates is not None else top
+            return [(int(r), float(scores[t])) for r, t in zip(rows, top)]
+
+    def _to_document(self, row: int) -> Document:
+        return Document(page_content=self._texts[row], metadata=dict(self._metadatas[row]))
+
+    def get_vectors(self, rows: List[int]) -> np.ndarray:
+        """Returns the stored (unit) vectors of the given rows."""
+        return np.asarray(self._vectors[rows])
+
+    def search_with_vectors(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None
+    ) -> List[Tuple[Document, np.ndarray]]:
+        """Top-k documents together with their stored unit vectors (one consistent generation)."""
+        with self._lock:
+            rows = [row for row, _ in self.search_by_vector(embedding, k=k, filter=filter)]
+            vectors = self.get_vectors(rows)
+            return [(self._to_document(row), vectors[i]) for i, row in enumerate(rows)]
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        hits = self.search_by_vector(embedding, k=k, filter=filter)
+        return [(self._to_document(row), score) for row, score in hits]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    async def asimilarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        # Only the embedding is remote, the search itself takes well under a millisecond
+        embedding = await self.embedding.aembed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+
+    async def asimilarity_search(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities already
+        return lambda score: score
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        directory: str = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        if directory is None:
+            raise ValueError("LocalVectorStore.from_texts requires a `directory`.")
+        store = cls(directory=directory, embedding=embedding)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,19 @@
+# Simple in-process registry of performance counters.
+# Each service registers a callable that returns a dict of its current stats;
+# the /metrics endpoint collects them into one snapshot.
+
+_providers = {}
+
+def register(name: str, provider):
+    """Registers a stats provider (a zero-argument callable returning a dict)."""
+    _providers[name] = provider
+
+def snapshot() -> dict:
+    """Returns the current stats of every registered provider."""
+    data = {}
+    for name, provider in list(_providers.items()):
+        try:
+            data[name] = provider()
+        except Exception as e:
+            data[name] = {"error": str(e)}
+    return data
@@ -0,0 +1,216 @@
+import asyncio
+import os
+import threading
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from backend.services import metrics
+from backend.services.vector_store import search_with_vectors
+
+# Candidates fetched before diversification, and the relevance/diversity trade-off (1.0 = relevance only)
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "20"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+# Optional CPU cross-encoder (sentence-transformers), e.g. "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+# for Spanish + English. Empty disables re-ranking.
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "")
+
+
+def mmr_select(query_vector, doc_vectors, k: int, lambda_mult: float = MMR_LAMBDA, relevance=None) -> List[int]:
+    """
+    Maximal marginal relevance over unit vectors, vectorized with numpy.
+    Each step picks argmax(lambda * relevance - (1 - lambda) * max similarity to the already selected rows);
+    the max-similarity column is updated with one matrix-vector product per step.
+    `relevance` defaults to the cosine similarity with the query.
+    """
+    doc_vectors = np.asarray(doc_vectors, dtype=np.float32)
+    n = doc_vectors.shape[0]
+    if n == 0 or k <= 0:
+        return []
+    doc_vectors = doc_vectors / np.maximum(np.linalg.norm(doc_vectors, axis=1, keepdims=True), 1e-12)
+    if relevance is None:
+        query = np.asarray(query_vector, dtype=np.float32)
+        relevance = doc_vectors @ (query / (np.linalg.norm(query) or 1.0))
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    selected = []
+    max_similarity = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    for _ in range(min(k, n)):
+        redundancy = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, doc_vectors @ doc_vectors[best])
+    return selected
+
+
+class CrossEncoderReranker:
+    """Scores (query, passage) pairs with a local sentence-transformers cross-encoder on CPU."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name, device="cpu")
+        self._lock = threading.Lock()
+
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        with self._lock:
+            return np.asarray(self.model.predict([(query, t) for t in texts]), dtype=np.float32)
+
+
+_rerankers = {}
+_rerankers_lock = threading.Lock()
+
+def get_reranker(model_name: str = RERANKER_MODEL) -> Optional[CrossEncoderReranker]:
+    """Returns the shared re-ranker, or None when disabled or when sentence-transformers is not installed."""
+    if not model_name:
+        return None
+    with _rerankers_lock:
+        if model_name not in _rerankers:
+            try:
+                _rerankers[model_name] = CrossEncoderReranker(model_name)
+            except ImportError:
+                print("Warning: RERANKER_MODEL is set but sentence-transformers is not installed, re-ranking disabled.")
+                _rerankers[model_name] = None
+            except Exception as e:
+                print(f"Warning: Could not load re-ranker {model_name}: {e}")
+                _rerankers[model_name] = None
+        return _rerankers[model_name]
+
+
+class RerankStats:
+    def __init__(self):
+        self.calls = 0
+        self.candidates = 0
+        self.returned = 0
+        self.stored_vectors = 0  # candidate vectors taken from the index
+        self.embedded_vectors = 0  # candidate vectors that had to be embedded
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "avg_candidates": round(self.candidates / self.calls, 2) if self.calls else 0.0,
+            "avg_returned": round(self.returned / self.calls, 2) if self.calls else 0.0,
+            "stored_vectors": self.stored_vectors,
+            "embedded_vectors": self.embedded_vectors,
+            "reranker": RERANKER_MODEL or None,
+        }
+
+
+rerank_stats = RerankStats()
+metrics.register("rerank", rerank_stats.stats)
+
+
+def _stored_candidates(retriever, query: str, query_vector):
+    """
+    (docs, vectors) from a base retriever that can return the stored vectors of its results
+    (the hybrid retriever, or a plain similarity retriever over a supported store); a vector is
+    None where the index didn't provide one. Returns None for other retrievers.
+    """
+    if hasattr(retriever, "search_with_vectors"):
+        return retriever.search_with_vectors(query, query_vector)
+    vector_store = getattr(retriever, "vectorstore", None)
+    if vector_store is not None and getattr(retriever, "search_type", None) == "similarity":
+        search_kwargs = retriever.search_kwargs
+        hits = search_with_vectors(vector_store, query_vector, k=search_kwargs.get("k", 4), filter=search_kwargs.get("filter"))
+        if hits is not None:
+            return [doc for doc, _ in hits], [vector for _, vector in hits]
+    return None
+
+
+class DiversifiedRetriever(BaseRetriever):
+    """
+    Post-retrieval stage: takes the candidates of the wrapped (over-fetching) retriever,
+    optionally re-scores them with a CPU cross-encoder, then keeps `k` documents with MMR
+    so overlapping chunks of the same video don't fill several prompt slots.
+
+    Candidate vectors are the ones the index already stores (returned with the search);
+    only candidates without one (BM25-only hits, unsupported stores) are embedded.
+    """
+
+    retriever: BaseRetriever
+    embeddings: Any
+    k: int = 4
+    lambda_mult: float = MMR_LAMBDA
+    reranker: Any = None
+
+    @property
+    def search_type(self) -> str:
+        return "mmr"
+
+    @property
+    def search_kwargs(self) -> dict:
+        # Read by the retrieval cache to build its key
+        return {
+            "k": self.k,
+            "lambda_mult": self.lambda_mult,
+            "reranker": getattr(self.reranker, "model_name", None),
+            "base": getattr(self.retriever, "search_kwargs", {}),
+            "base_type": getattr(self.retriever, "search_type", None),
+        }
+
+    def _select(self, query: str, docs: List[Document], query_vector, doc_vectors) -> List[Document]:
+        relevance = None
+        if self.reranker is not None:
+            scores = self.reranker.score(query, [d.page_content for d in docs])
+            # Squash logits into (0, 1) so they weigh like cosine similarities in MMR
+            relevance = 1 / (1 + np.exp(-scores))
+        selected = mmr_select(query_vector, doc_vectors, self.k, self.lambda_mult, relevance)
+        rerank_stats.calls += 1
+        rerank_stats.candidates += len(docs)
+        rerank_stats.returned += len(selected)
+        return [docs[i] for i in selected]
+
+    @staticmethod
+    def _missing(docs: List[Document], vectors) -> List[int]:
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        rerank_stats.stored_vectors += len(docs) - len(missing)
+        rerank_stats.embedded_vectors += len(missing)
+        return missing
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        # The base retriever embeds the query too, the second call is a cache hit
+        query_vector = self.embeddings.embed_query(query)
+        found = _stored_candidates(self.retriever, query, query_vector)
+        docs, vectors = found if found is not None else (self.retriever.invoke(query), None)
+        if len(docs) <= 1:
+            return docs
+        vectors = list(vectors) if vectors is not None else [None] * len(docs)
+        missing = self._missing(docs, vectors)
+        if missing:
+            embedded = self.embeddings.embed_documents([docs[i].page_content for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        return self._select(query, docs, query_vector, vectors)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        query_vector = await self.embeddings.aembed_query(query)
+        if hasattr(self.retriever, "asearch_with_vectors"):
+            found = await self.retriever.asearch_with_vectors(query, query_vector)
+        else:
+            # Pinecone's client is blocking
+            found = await asyncio.to_thread(_stored_candidates, self.retriever, query, query_vector)
+        docs, vectors = found if found is not None else (await self.retriever.ainvoke(query), None)
+        if len(docs) <= 1:
+            return docs
+        vectors = list(vectors) if vectors is not None else [None] * len(docs)
+        missing = self._missing(docs, vectors)
+        if missing:
+            embedded = await self.embeddings.aembed_documents([docs[i].page_content for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        if self.reranker is None:
+            return self._select(query, docs, query_vector, vectors)
+        # The cross-encoder is CPU-bound, keep it off the event loop
+        return await asyncio.to_thread(self._select, query, docs, query_vector, vectors)
@@ -0,0 +1,165 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import List
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from backend.services import index_version, metrics
+from backend.services.embeddings import normalize_text
+
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "1") == "1"
+# Bound on the total characters of cached document text (~4 bytes/char worst case)
+RETRIEVAL_CACHE_MAX_CHARS = int(os.getenv("RETRIEVAL_CACHE_MAX_CHARS", str(20_000_000)))
+
+
+class RetrievalCache:
+    """
+    LRU cache of retrieval results keyed on (namespace, normalized query, filter, k, index version).
+    Memory is bounded by the total size of the cached page contents.
+    Results from an older index version are never returned (the key changes when
+    ingestion bumps the version) and are dropped as soon as a new version is seen.
+    """
+
+    def __init__(self, max_chars: int = RETRIEVAL_CACHE_MAX_CHARS):
+        self.max_chars = max_chars
+        self._entries = OrderedDict()  # key -> (docs, size)
+        self._size = 0
+        self._version = index_version.get_version()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(namespace: str, query: str, search_kwargs: dict, version: int) -> str:
+        raw = json.dumps({
+            "ns": namespace,
+            "q": normalize_text(query),
+            "kwargs": search_kwargs,
+            "v": version,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._size = 0
+            self._version = version
+            self.invalidations += 1
+
+    def get(self, key: str, version: int):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers may mutate documents (e.g. metadata), hand out copies
+        return [copy.deepcopy(d) for d in entry[0]]
+
+    def set(self, key: str, version: int, docs: List[Document]):
+        size = sum(len(d.page_content) for d in docs)
+        if size > self.max_chars:
+            return
+        docs = [copy.deepcopy(d) for d in docs]
+        with self._lock:
+            self._check_version(version)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (docs, size)
+            self._size += size
+            while self._size > self.max_chars and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": RETRIEVAL_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "chars": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "index_version": self._version,
+        }
+
+
+cache = RetrievalCache()
+metrics.register("retrieval_cache", cache.stats)
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    Wraps a vector store retriever and serves repeated (query, filter, k) lookups
+    from the shared retrieval cache instead of querying the vector DB again.
+    """
+
+    retriever: BaseRetriever
+    namespace: str = "default"
+
+    def _cache_key(self, query: str):
+        version = index_version.get_version()
+        search_kwargs = getattr(self.retriever, "search_kwargs", {})
+        search_type = getattr(self.retriever, "search_type", "similarity")
+        kwargs = {"search_type": search_type, **search_kwargs}
+        return RetrievalCache.make_key(self.namespace, query, kwargs, version), version
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if not RETRIEVAL_CACHE_ENABLED:
+            return self.retriever.invoke(query)
+
+        key, version = self._cache_key(query)
+        docs = cache.get(key, version)
+        if docs is None:
+            docs = self.retriever.invoke(query)
+            cache.set(key, version, docs)
+        return docs
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if not RETRIEVAL_CACHE_ENABLED:
+            return await self.retriever.ainvoke(query)
+
+        key, version = self._cache_key(query)
+        docs = cache.get(key, version)
+        if docs is None:
+            docs = await self.retriever.ainvoke(query)
+            cache.set(key, version, docs)
+        return docs
+
+
+def cached_retriever(vector_store, search_kwargs: dict, namespace: str = None) -> CachedRetriever:
+    """Builds `vector_store.as_retriever(search_kwargs=...)` wrapped in the retrieval cache."""
+    if namespace is None:
+        namespace = type(vector_store).__name__
+    return CachedRetriever(
+        retriever=vector_store.as_retriever(search_kwargs=search_kwargs),
+        namespace=namespace
+    )
+
+def cached_similarity_search(vector_store, query: str, k: int = 4, filter: dict = None, namespace: str = None):
+    """`vector_store.similarity_search` through the retrieval cache."""
+    search_kwargs = {"k": k}
+    if filter is not None:
+        search_kwargs["filter"] = filter
+    return cached_retriever(vector_store, search_kwargs, namespace).invoke(query)
@@ -0,0 +1,154 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.services import index_version, metrics
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+
+def normalize_question(question: str) -> str:
+    """Lowercases, strips accents/punctuation and collapses whitespace ("¿Qué es el FCF?" -> "que es el fcf")."""
+    text = unicodedata.normalize("NFKD", question.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s/%.-]", " ", text)
+    return " ".join(text.split()).strip(" .")
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on question embeddings.
+
+    A question hits the cache when its normalized text was seen before, or when
+    the cosine similarity of its embedding with a cached question is above `threshold`.
+    Entries expire after `ttl_seconds`, the least recently used entries are evicted
+    above `max_entries`, and everything is dropped when the index version changes
+    (i.e. after new videos or PDFs were ingested).
+
+    Entries hold no audio: the answer's TTS chunks are persisted by the TTS disk cache
+    (bounded by TTS_CACHE_MAX_MB), so re-synthesizing a cached answer reads them back
+    from disk instead of keeping megabytes of MP3 per entry in memory.
+    """
+
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # normalized question -> entry dict
+        self._matrix = None            # stacked unit vectors of the entries (rebuilt lazily)
+        self._keys = []
+        self._version = index_version.get_version()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self.invalidations = 0
+
+    def _check_version(self):
+        version = index_version.get_version()
+        if version != self._version:
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+            self.invalidations += 1
+
+    def _drop_expired(self, now):
+        expired = [k for k, e in self._entries.items() if now - e["created_at"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _hit(self, key, entry):
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.seconds_saved += entry["compute_seconds"]
+        return entry
+
+    def lookup_text(self, question: str):
+        """Exact lookup on the normalized question, avoids the embedding call entirely."""
+        key = normalize_question(question)
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry["created_at"] > self.ttl_seconds:
+                return None
+            return self._hit(key, entry)
+
+    def lookup(self, question: str, vector):
+        """Returns the cached entry most similar to the question embedding, or None."""
+        key = normalize_question(question)
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        with self._lock:
+            self._check_version()
+            self._drop_expired(time.time())
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                return self._hit(key, entry)
+
+            if self._entries:
+                if self._matrix is None:
+                    self._keys = list(self._entries.keys())
+                    self._matrix = np.stack([self._entries[k]["vector"] for k in self._keys])
+                scores = self._matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    best_key = self._keys[best]
+                    return self._hit(best_key, self._entries[best_key])
+
+            self.misses += 1
+            return None
+
+    def store(self, question: str, vector, answer: str, sources=None, compute_seconds: float = 0.0):
+        """Caches an answer for a question."""
+        key = normalize_question(question)
+        unit = np.asarray(vector, dtype=np.float32)
+        unit = unit / (np.linalg.norm(unit) or 1.0)
+
+        with self._lock:
+            self._check_version()
+            self._entries[key] = {
+                "vector": unit,
+                "answer": answer,
+                "sources": sources or [],
+                "compute_seconds": compute_seconds,
+                "created_at": time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": SEMANTIC_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "seconds_saved": round(self.seconds_saved, 3),
+            "invalidations": self.invalidations,
+            "index_version": self._version,
+        }
+
+
+cache = SemanticCache()
+metrics.register("semantic_cache", cache.stats)
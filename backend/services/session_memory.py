@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from backend.services import metrics
+
+# Session limits (can be overridden from .env)
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "5"))
+SESSION_MAX_MESSAGE_CHARS = int(os.getenv("SESSION_MAX_MESSAGE_CHARS", "2000"))
+
+HUMAN = "H"
+AI = "A"
+
+
+class SessionMemoryStore:
+    """
+    Conversation history scoped by session id.
+
+    - Each session keeps at most `max_turns` question/answer pairs (older ones are dropped).
+    - Messages are stored as compact (role, text) tuples instead of LangChain message objects.
+    - Sessions are evicted when idle for longer than `ttl_seconds` or, once
+      `max_sessions` is reached, in least-recently-used order.
+    """
+
+    def __init__(self, max_sessions=SESSION_MAX_SESSIONS, ttl_seconds=SESSION_TTL_SECONDS,
+                 max_turns=SESSION_MAX_TURNS, max_message_chars=SESSION_MAX_MESSAGE_CHARS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.max_message_chars = max_message_chars
+        self._sessions = OrderedDict()  # session_id -> (last_access, deque of (role, text))
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _expire(self, now):
+        # Sessions are kept in access order, so expired ones are at the front
+        while self._sessions:
+            session_id, (last_access, _) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    def get_messages(self, session_id: str):
+        """Returns the stored (role, text) tuples for a session, oldest first."""
+        if not session_id:
+            return []
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            self._sessions[session_id] = (now, entry[1])
+            self._sessions.move_to_end(session_id)
+            return list(entry[1])
+
+    def get_history(self, session_id: str) -> str:
+        """Returns the session history formatted for the `chat_history` prompt variable."""
+        lines = []
+        for role, text in self.get_messages(session_id):
+            prefix = "Human" if role == HUMAN else "AI"
+            lines.append(f"{prefix}: {text}")
+        return "\n".join(lines)
+
+    def add_turn(self, session_id: str, question: str, answer: str):
+        """Stores a question/answer pair for a session."""
+        if not session_id:
+            return
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                messages = deque(maxlen=self.max_turns * 2)
+            else:
+                messages = entry[1]
+            messages.append((HUMAN, question[:self.max_message_chars]))
+            messages.append((AI, answer[:self.max_message_chars]))
+            self._sessions[session_id] = (now, messages)
+            self._sessions.move_to_end(session_id)
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "messages": sum(len(m) for _, m in self._sessions.values()),
+                "evictions": self.evictions,
+                "max_sessions": self.max_sessions,
+                "max_turns": self.max_turns,
+            }
+
+
+# Shared store used by the chat pipelines
+store = SessionMemoryStore()
+metrics.register("session_memory", store.stats)
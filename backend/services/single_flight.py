@@ -0,0 +1,84 @@
+import asyncio
+import threading
+
+from backend.services import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical calls into one execution.
+
+    While a call for a key is in flight, other callers with the same key wait for it
+    and get the same result (or exception) instead of starting their own. Nothing is
+    kept once the call finishes: the next request computes fresh data.
+
+    `run` is for coroutines (API routes), `do` for blocking functions called from threads.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks = {}  # key -> asyncio.Task
+        self._calls = {}  # key -> _Call
+        self._lock = threading.Lock()
+
+        self.executions = 0
+        self.coalesced = 0
+        metrics.register(f"single_flight.{name}", self.stats)
+
+    async def run(self, key, func, *args, **kwargs):
+        """Awaits `func(*args, **kwargs)`, sharing the in-flight call for `key` if there is one."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._tasks.pop(key, None) if self._tasks.get(key) is done else None)
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        # A caller that disconnects must not cancel the computation the others are waiting on
+        return await asyncio.shield(task)
+
+    def do(self, key, func, *args, **kwargs):
+        """Blocking version of `run`: calls `func` or waits for the thread already computing `key`."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def stats(self) -> dict:
+        calls = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._tasks) + len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / calls, 4) if calls else 0.0,
+        }
@@ -0,0 +1,174 @@
+import os
+
+SAMPLE_RATE = 16000
+# Clips that fit in Whisper's 30 s window can share one batched decode;
+# longer ones go through model.transcribe (sliding window) on their own
+BATCH_MAX_SAMPLES = 30 * SAMPLE_RATE
+
+# Speech-to-text backend: "whisper" (openai-whisper, PyTorch fp32 on CPU) or
+# "faster-whisper" (CTranslate2 with quantized weights, requires `faster-whisper`)
+STT_ENGINE = os.getenv("STT_ENGINE", "whisper")
+# CTranslate2 compute type for faster-whisper; int8 is the fastest on CPUs without a GPU
+STT_COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", "int8")
+
+
+class WhisperEngine:
+    """openai-whisper. Short clips are decoded together in one batched forward pass."""
+
+    name = "whisper"
+
+    def __init__(self, model_size: str, threads: int = None):
+        self.model_size = model_size
+        self.threads = threads
+        self.model = None
+
+    def load(self):
+        import torch
+        import whisper
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        self.model = whisper.load_model(self.model_size)
+        return self.model
+
+    def _fp16(self) -> bool:
+        return self.model.device.type == "cuda"
+
+    def _mels(self, audios):
+        import torch
+        import whisper
+        n_mels = getattr(self.model.dims, "n_mels", 80)
+        return torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels) for audio in audios
+        ]).to(self.model.device)
+
+    def detect_languages(self, audios, languages):
+        """Most likely of `languages` for each clip, from one batched pass over its first 30 s."""
+        _, probs = self.model.detect_language(self._mels(audios))
+        return [max(languages, key=lambda code: p.get(code, 0.0)) for p in probs]
+
+    def _decode_batch(self, audios, language=None):
+        import whisper
+        mels = self._mels(audios)
+        # Without a language hint it is detected per clip, as model.transcribe does
+        options = whisper.DecodingOptions(language=language, fp16=self._fp16())
+        results = whisper.decode(self.model, mels, options)
+        return [result.text for result in results]
+
+    def transcribe_clips(self, audios, language=None, languages=None):
+        """
+        Transcribes 16 kHz float32 clips: the short ones in a single batched decode, long ones
+        (or all of them, if the batch fails) one by one. `language` ("es", "en"...) skips language
+        detection; without it, `languages` restricts the detection to those codes.
+        Returns (results, clips decoded in the batch); a clip that fails gets its exception as result.
+        """
+        if language is None and languages:
+            return transcribe_probed(self, audios, languages)
+        results = [None] * len(audios)
+        short = [i for i, audio in enumerate(audios) if len(audio) <= BATCH_MAX_SAMPLES]
+        batched = 0
+        if len(short) > 1:
+            try:
+                for i, text in zip(short, self._decode_batch([audios[i] for i in short], language)):
+                    results[i] = text
+                batched = len(short)
+            except Exception as e:
+                print(f"Warning: Batched transcription failed, decoding clips one by one: {e}")
+        for i, audio in enumerate(audios):
+            if results[i] is None:
+                try:
+                    results[i] = self.model.transcribe(audio, language=language, fp16=self._fp16())["text"]
+                except Exception as e:
+                    results[i] = e
+        return results, batched
+
+
+class FasterWhisperEngine:
+    """
+    faster-whisper: the same Whisper checkpoints converted to CTranslate2 and quantized
+    (STT_COMPUTE_TYPE, int8 by default), several times faster than PyTorch fp32 on CPU and
+    with a fraction of the memory. Clips are decoded one by one.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size: str, threads: int = None, compute_type: str = STT_COMPUTE_TYPE):
+        self.model_size = model_size
+        self.threads = threads
+        self.compute_type = compute_type
+        self.model = None
+
+    def load(self):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(
+            self.model_size, device="cpu", compute_type=self.compute_type, cpu_threads=self.threads or 0
+        )
+        return self.model
+
+    def detect_languages(self, audios, languages):
+        """Most likely of `languages` for each clip (from its first 30 s)."""
+        detected = []
+        for audio in audios:
+            _, _, probs = self.model.detect_language(audio)
+            probs = dict(probs)
+            detected.append(max(languages, key=lambda code: probs.get(code, 0.0)))
+        return detected
+
+    def transcribe_clips(self, audios, language=None, languages=None):
+        """Same contract as WhisperEngine.transcribe_clips."""
+        if language is None and languages:
+            return transcribe_probed(self, audios, languages)
+        results = []
+        for audio in audios:
+            try:
+                # Greedy decoding, like openai-whisper's transcribe defaults
+                segments, _ = self.model.transcribe(audio, language=language, beam_size=1)
+                results.append("".join(segment.text for segment in segments))
+            except Exception as e:
+                results.append(e)
+        return results, 0
+
+
+def transcribe_probed(engine, audios, languages):
+    """
+    Detects each clip's language among `languages` (e.g. es/en, so a short clip is never
+    decoded as Portuguese or Galician) and transcribes the clips grouped by language.
+    If the probe fails the clips fall back to the engine's unrestricted detection.
+    """
+    try:
+        detected = engine.detect_languages(audios, languages)
+    except Exception as e:
+        print(f"Warning: Language detection failed, letting the model detect it: {e}")
+        detected = [None] * len(audios)
+
+    results, batched = [None] * len(audios), 0
+    groups = {}
+    for i, code in enumerate(detected):
+        groups.setdefault(code, []).append(i)
+    for code, indices in groups.items():
+        texts, group_batched = engine.transcribe_clips([audios[i] for i in indices], code)
+        batched += group_batched
+        for i, text in zip(indices, texts):
+            results[i] = text
+    return results, batched
+
+
+ENGINES = {
+    WhisperEngine.name: WhisperEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine,
+}
+
+def resolve_engine_name(name: str = STT_ENGINE) -> str:
+    """Returns the engine that will actually run: faster-whisper falls back to whisper if not installed."""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown STT engine '{name}', expected one of {sorted(ENGINES)}")
+    if name == FasterWhisperEngine.name:
+        try:
+            import faster_whisper  # noqa: F401
+        except ImportError:
+            print("Warning: STT_ENGINE is faster-whisper but it is not installed, using whisper.")
+            return WhisperEngine.name
+    return name
+
+def get_engine(name: str, model_size: str, threads: int = None):
+    """Creates (without loading) an engine of the given backend and model size."""
+    return ENGINES[resolve_engine_name(name)](model_size, threads)
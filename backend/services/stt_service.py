@@ -0,0 +1,456 @@
+import hashlib
+import multiprocessing
+import os
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from backend.services import metrics
+from backend.services.disk_cache import DiskCache
+from backend.services.stt_engines import BATCH_MAX_SAMPLES, SAMPLE_RATE, STT_ENGINE, get_engine, resolve_engine_name
+
+# Whisper model used for questions asked by voice ("tiny", "base", "small", ...)
+STT_MODEL_SIZE = os.getenv("STT_MODEL_SIZE", "base")
+# Short clips waiting in the queue are decoded together, up to this many per batch
+STT_BATCH_SIZE = int(os.getenv("STT_BATCH_SIZE", "8"))
+# How long the worker waits for more clips to join a batch once it has one
+STT_BATCH_WAIT_MS = int(os.getenv("STT_BATCH_WAIT_MS", "20"))
+# Worker processes, each with its own warm model, so decoding runs outside the API
+# process (no GIL contention) and throughput scales with cores. 0 = a thread in the API process
+STT_WORKERS = int(os.getenv("STT_WORKERS", "1"))
+
+# Duration-aware routing: short questions ("¿qué es el ROIC?") go to a small, fast model with
+# a language hint (no language detection pass); longer dictations go to STT_MODEL_SIZE
+STT_ROUTING_ENABLED = os.getenv("STT_ROUTING_ENABLED", "1") == "1"
+STT_SHORT_CLIP_SECONDS = float(os.getenv("STT_SHORT_CLIP_SECONDS", "8"))
+STT_SHORT_MODEL_SIZE = os.getenv("STT_SHORT_MODEL_SIZE", "tiny")
+# Language hints that are trusted; short clips without one are probed among these only
+STT_LANGUAGES = [code.strip() for code in os.getenv("STT_LANGUAGES", "es,en").split(",") if code.strip()]
+
+# Transcripts are cached on disk by content (client retries, repeated demo clips,
+# the agent transcribing the same file twice skip Whisper entirely)
+STT_CACHE_ENABLED = os.getenv("STT_CACHE_ENABLED", "1") == "1"
+STT_CACHE_PATH = os.getenv(
+    "STT_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 "data", "cache", "stt.sqlite")
+)
+STT_CACHE_MAX_MB = int(os.getenv("STT_CACHE_MAX_MB", "16"))
+
+transcript_cache = None
+if STT_CACHE_ENABLED:
+    try:
+        transcript_cache = DiskCache(STT_CACHE_PATH, STT_CACHE_MAX_MB * 1024 * 1024)
+        metrics.register("stt_cache", transcript_cache.stats)
+    except Exception as e:
+        print(f"Warning: Could not open STT cache: {e}")
+
+
+def _ffmpeg_decode(source: str, data: bytes = None, sr: int = SAMPLE_RATE) -> np.ndarray:
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-threads", "0"]
+    if data is None:
+        cmd.append("-nostdin")
+    cmd += ["-i", source, "-f", "f32le", "-ac", "1", "-acodec", "pcm_f32le", "-ar", str(sr), "pipe:1"]
+    try:
+        out = subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='ignore')}") from e
+    return np.frombuffer(out, np.float32)
+
+def decode_audio_bytes(data: bytes, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decodes an encoded clip held in memory (webm, ogg, mp3, wav...) to a mono float32 array
+    by piping it through ffmpeg, without writing it to disk.
+    """
+    return _ffmpeg_decode("pipe:0", data, sr)
+
+def load_audio(audio) -> np.ndarray:
+    """
+    Returns the clip as a 16 kHz mono float32 array. Accepts an array, the encoded bytes
+    (or a file-like object with them), which are decoded in memory, or a file path.
+    """
+    if isinstance(audio, np.ndarray):
+        return audio.astype(np.float32, copy=False)
+    if hasattr(audio, "read"):
+        audio = audio.read()
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return decode_audio_bytes(bytes(audio))
+    return _ffmpeg_decode(audio)
+
+def transcript_cache_key(audio: np.ndarray, model_size: str, engine: str = STT_ENGINE, language: str = None,
+                         languages=None) -> str:
+    """
+    Content address of a transcript: the decoded 16 kHz PCM (so the same recording hits
+    whether it arrives as bytes, a file path or an array) plus the engine, model and
+    language hint (or set of probed languages) that transcribed it.
+    """
+    digest = hashlib.sha256(np.ascontiguousarray(audio, np.float32).tobytes()).hexdigest()
+    language = language or ("|".join(languages) if languages else "auto")
+    return f"{engine}:{model_size}:{language}:{digest}"
+
+
+# --- Worker processes ---
+_worker_engine = None
+
+def _worker_init(engine: str, model_size: str, threads: int):
+    global _worker_engine
+    # Threads are split between the workers instead of every process using all the cores
+    _worker_engine = get_engine(engine, model_size, threads)
+    _worker_engine.load()
+
+def _worker_ready():
+    return os.getpid()
+
+def _worker_decode(audios, language=None, languages=None):
+    return _worker_engine.transcribe_clips(audios, language, languages)
+
+
+class _Request:
+    def __init__(self, audio: np.ndarray, cache_key: str = None, language: str = None, languages=None):
+        self.audio = audio
+        self.cache_key = cache_key
+        self.language = language
+        self.languages = tuple(languages) if languages and not language else None
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class SttService:
+    """
+    Owns the STT model(s) of one engine and size and runs every transcription through a queue.
+
+    A dispatcher thread takes clips from the queue as soon as a worker is free and hands
+    them over as a batch: short clips that are waiting together are decoded in one forward
+    pass instead of one by one. Workers are STT_WORKERS processes with their own warm model
+    (or, with 0, the model in this process), so callers never share a model concurrently.
+    """
+
+    def __init__(self, model_size: str = STT_MODEL_SIZE, workers: int = STT_WORKERS, engine: str = STT_ENGINE):
+        self.model_size = model_size
+        self.workers = workers
+        self.engine = resolve_engine_name(engine)
+        self._engine = None
+        self._pool = None
+        self._load_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._held = None  # request taken from the queue that starts the next batch
+        self._slots = threading.Semaphore(max(1, workers))
+
+        self.load_seconds = None
+        self.busy = 0
+        self.clips = 0
+        self.batches = 0
+        self.batched_clips = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=500)  # seconds from submit to result, per clip
+
+    def get_model(self):
+        """The model loaded in this process (used when STT_WORKERS=0)."""
+        with self._load_lock:
+            if self._engine is None:
+                print(f"Loading {self.engine} model: {self.model_size}...")
+                start = time.perf_counter()
+                engine = get_engine(self.engine, self.model_size)
+                engine.load()
+                self._engine = engine
+                self.load_seconds = time.perf_counter() - start
+            return self._engine.model
+
+    def _start_pool(self):
+        print(f"Starting {self.workers} STT worker process(es): {self.engine} {self.model_size}...")
+        start = time.perf_counter()
+        # The cores are shared by the worker processes of every model the router can pick
+        # (e.g. base and tiny), not just this service's
+        sizes = set(routed_model_sizes()) | {self.model_size}
+        threads = max(1, (os.cpu_count() or 1) // (self.workers * len(sizes)))
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            # Forking a process that already runs torch/uvicorn threads is unsafe
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+            initargs=(self.engine, self.model_size, threads),
+        )
+        # Spawns the processes and waits for their models to load
+        for future in [self._pool.submit(_worker_ready) for _ in range(self.workers)]:
+            future.result()
+        self.load_seconds = time.perf_counter() - start
+
+    def start(self):
+        """Loads the model(s) and starts the dispatcher thread (no-op if already running)."""
+        if self.workers > 0:
+            with self._load_lock:
+                if self._pool is None:
+                    self._start_pool()
+        else:
+            self.get_model()
+        with self._load_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=f"stt-{self.model_size}", daemon=True)
+                self._worker.start()
+
+    def submit(self, audio, cache: bool = True, language: str = None, languages=None) -> Future:
+        """
+        Queues a clip (see load_audio for the accepted inputs); the future resolves to its text.
+        `language` skips language detection; without it, `languages` restricts the detection
+        to those codes. With `cache`, a clip transcribed before is answered from the transcript cache.
+        """
+        audio = load_audio(audio)
+        cache_key = None
+        if cache and transcript_cache is not None:
+            cache_key = transcript_cache_key(audio, self.model_size, self.engine, language, languages)
+            text = self.cached_transcript(audio, language, languages, cache_key)
+            if text is not None:
+                future = Future()
+                future.set_result(text)
+                return future
+        request = _Request(audio, cache_key, language, languages)
+        if self._worker is None:
+            self.start()
+        self._queue.put(request)
+        return request.future
+
+    def cached_transcript(self, audio: np.ndarray, language: str = None, languages=None, cache_key: str = None):
+        """Returns the cached transcript of a decoded clip, or None if it wasn't transcribed before."""
+        if transcript_cache is None:
+            return None
+        if cache_key is None:
+            cache_key = transcript_cache_key(audio, self.model_size, self.engine, language, languages)
+        text = transcript_cache.get(cache_key)
+        return text.decode("utf-8") if text is not None else None
+
+    def transcribe(self, audio, language: str = None, languages=None) -> str:
+        """Blocking: transcribes a clip through the queue and returns the text."""
+        return self.submit(audio, language=language, languages=languages).result()
+
+    def _next_batch(self):
+        """
+        Waits for a request, then collects the short clips with the same language hint
+        (or probed languages) arriving within STT_BATCH_WAIT_MS.
+        """
+        first, self._held = self._held or self._queue.get(), None
+        batch = [first]
+        if len(first.audio) > BATCH_MAX_SAMPLES:
+            return batch
+        deadline = time.perf_counter() + STT_BATCH_WAIT_MS / 1000
+        while len(batch) < STT_BATCH_SIZE:
+            try:
+                request = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                break
+            if (request.language, request.languages) != (first.language, first.languages):
+                self._held = request
+                break
+            batch.append(request)
+            if len(request.audio) > BATCH_MAX_SAMPLES:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Wait for a free worker first: clips keep queueing (and form bigger batches) meanwhile
+            self._slots.acquire()
+            batch = None
+            try:
+                batch = self._next_batch()
+                self.busy += 1
+                self._dispatch(batch)
+            except Exception as e:
+                # The dispatcher must survive a bad batch, otherwise every pending and later
+                # submit() would wait forever: fail this batch and keep serving the queue
+                print(f"Warning: STT dispatcher error, failing {len(batch or [])} clip(s): {e}")
+                if batch is None:
+                    self._slots.release()
+                else:
+                    self._finish(batch, [e] * len(batch), 0)
+
+    def _dispatch(self, batch):
+        audios = [request.audio for request in batch]
+        language, languages = batch[0].language, batch[0].languages
+        if self.workers == 0:
+            self._finish(batch, *self._engine.transcribe_clips(audios, language, languages))
+            return
+        with self._load_lock:
+            if self._pool is None:
+                self._start_pool()
+            pool = self._pool
+        future = pool.submit(_worker_decode, audios, language, languages)
+        future.add_done_callback(lambda done, batch=batch, pool=pool: self._on_worker_done(batch, done, pool))
+
+    def _on_worker_done(self, batch, future, pool):
+        try:
+            results, batched = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                with self._load_lock:
+                    if self._pool is pool:
+                        # A worker died (e.g. out of memory); a new pool is started for the next batch
+                        print(f"Warning: STT worker pool broke, restarting it: {e}")
+                        self._pool = None
+                        pool.shutdown(wait=False)
+            results, batched = [e] * len(batch), 0
+        self._finish(batch, results, batched)
+
+    def _finish(self, batch, results, batched: int):
+        """Resolves the batch's futures and frees its worker slot; never raises."""
+        try:
+            if batched > 1:
+                self.batches += 1
+                self.batched_clips += batched
+            for request, result in zip(batch, results):
+                # The caller may have given up meanwhile (a cancelled live segment)
+                if request.future.done():
+                    continue
+                try:
+                    if isinstance(result, Exception):
+                        self.errors += 1
+                        request.future.set_exception(result)
+                    else:
+                        self._resolve(request, result)
+                except Exception as e:
+                    print(f"Warning: Could not deliver a transcription result: {e}")
+        finally:
+            self.busy -= 1
+            self._slots.release()
+
+    def _resolve(self, request: _Request, text: str):
+        self.clips += 1
+        self._latencies.append(time.perf_counter() - request.submitted)
+        text = text.strip()
+        if request.cache_key is not None:
+            try:
+                transcript_cache.set(request.cache_key, text.encode("utf-8"))
+            except Exception as e:
+                print(f"Warning: Could not cache transcript: {e}")
+        request.future.set_result(text)
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        return {
+            "engine": self.engine,
+            "model": self.model_size,
+            "workers": self.workers,
+            "busy_workers": self.busy,
+            "loaded": self._engine is not None or self._pool is not None,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "queue_depth": self._queue.qsize(),
+            "clips": self.clips,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_clips / self.batches, 2) if self.batches else 0.0,
+            "errors": self.errors,
+            "avg_latency_ms": round(1000 * sum(latencies) / len(latencies), 1) if latencies else 0.0,
+            "p95_latency_ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 1) if latencies else 0.0,
+        }
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+def get_stt_service(model_size: str = STT_MODEL_SIZE, engine: str = STT_ENGINE) -> SttService:
+    """Returns the process-wide STT service of an engine and model size."""
+    engine = resolve_engine_name(engine)
+    with _services_lock:
+        service = _services.get((engine, model_size))
+        if service is None:
+            service = SttService(model_size, engine=engine)
+            _services[(engine, model_size)] = service
+            metrics.register(f"stt.{engine}.{model_size}", service.stats)
+        return service
+
+
+def language_hint(language: str = None):
+    """Normalizes a client language ("es-ES", "en") to a supported hint, or None."""
+    hint = (language or "").strip().lower()[:2]
+    return hint if hint in STT_LANGUAGES else None
+
+def route_clip(duration: float, language: str = None):
+    """
+    Picks (model size, language hint, languages to probe) for a clip. Short clips get the small
+    model with the client's hint (e.g. the browser locale) if it is one of STT_LANGUAGES; without
+    one, the small model probes the clip's language among STT_LANGUAGES only (its unrestricted
+    detection is unreliable on a few seconds of audio). Long clips get the main model and only
+    a supported client hint.
+    """
+    hint = language_hint(language)
+    if STT_ROUTING_ENABLED and duration <= STT_SHORT_CLIP_SECONDS:
+        return STT_SHORT_MODEL_SIZE, hint, None if hint else (tuple(STT_LANGUAGES) or None)
+    return STT_MODEL_SIZE, hint, None
+
+
+class RouterStats:
+    def __init__(self):
+        self.routes = {}  # model size -> [clips, audio seconds, transcription seconds]
+        self.cache_hits = {}  # model size -> clips answered from the transcript cache
+
+    def record(self, model_size: str, duration: float, seconds: float):
+        route = self.routes.setdefault(model_size, [0, 0.0, 0.0])
+        route[0] += 1
+        route[1] += duration
+        route[2] += seconds
+
+    def record_cache_hit(self, model_size: str):
+        # Kept apart from the routes: a cache hit says nothing about the model's latency
+        self.cache_hits[model_size] = self.cache_hits.get(model_size, 0) + 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": STT_ROUTING_ENABLED,
+            "short_clip_seconds": STT_SHORT_CLIP_SECONDS,
+            "routes": {
+                model_size: {
+                    "clips": clips,
+                    "avg_audio_seconds": round(audio / clips, 2),
+                    "avg_latency_ms": round(1000 * seconds / clips, 1),
+                    "real_time_factor": round(seconds / audio, 3) if audio else 0.0,
+                }
+                for model_size, (clips, audio, seconds) in self.routes.items()
+            },
+            "cache_hits": dict(self.cache_hits),
+        }
+
+
+router_stats = RouterStats()
+metrics.register("stt_router", router_stats.stats)
+
+
+def transcribe_routed(audio, language: str = None) -> str:
+    """
+    Transcribes a clip (see load_audio) with the model picked by route_clip for its duration.
+    Each decision is logged with its latency so the thresholds can be tuned.
+    """
+    audio = load_audio(audio)
+    duration = len(audio) / SAMPLE_RATE
+    model_size, hint, probe = route_clip(duration, language)
+    language_label = hint or ("probe " + "/".join(probe) if probe else "auto")
+    service = get_stt_service(model_size)
+    text = service.cached_transcript(audio, hint, probe)
+    if text is not None:
+        router_stats.record_cache_hit(model_size)
+        print(f"STT route: {duration:.1f}s clip -> {model_size} ({language_label}) from the transcript cache")
+        return text
+    start = time.perf_counter()
+    text = service.transcribe(audio, language=hint, languages=probe)
+    seconds = time.perf_counter() - start
+    router_stats.record(model_size, duration, seconds)
+    print(f"STT route: {duration:.1f}s clip -> {model_size} ({language_label}) in {seconds:.2f}s")
+    return text
+
+
+def routed_model_sizes():
+    """The model sizes transcribe_routed can pick."""
+    sizes = [STT_MODEL_SIZE]
+    if STT_ROUTING_ENABLED and STT_SHORT_MODEL_SIZE not in sizes:
+        sizes.append(STT_SHORT_MODEL_SIZE)
+    return sizes
+
+
+def warm_up():
+    """Loads every model the router can pick, so no request pays for a model load."""
+    for model_size in routed_model_sizes():
+        get_stt_service(model_size).start()
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from openai import OpenAI, AsyncOpenAI
+
+from backend.services import metrics
+from backend.services.disk_cache import DiskCache
+from backend.services.upstream_limits import limit, run_blocking
+
+TTS_MODEL = "tts-1"
+TTS_VOICE = "alloy"
+TTS_FORMAT = "mp3"
+# OpenAI's limit per request; longer answers are split into several requests
+TTS_MAX_CHARS = 4096
+# Sentences are grouped into chunks of up to this size, synthesized TTS_MAX_PARALLEL at a time
+TTS_CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "600"))
+TTS_MAX_PARALLEL = int(os.getenv("TTS_MAX_PARALLEL", "4"))
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1") == "1"
+TTS_CACHE_PATH = os.getenv(
+    "TTS_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 "data", "cache", "tts.sqlite")
+)
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "256"))
+
+client = OpenAI()
+async_client = AsyncOpenAI()
+
+audio_cache = None
+if TTS_CACHE_ENABLED:
+    try:
+        audio_cache = DiskCache(TTS_CACHE_PATH, TTS_CACHE_MAX_MB * 1024 * 1024)
+        metrics.register("tts_cache", audio_cache.stats)
+    except Exception as e:
+        print(f"Warning: Could not open TTS cache: {e}")
+
+def tts_cache_key(text: str, model: str = TTS_MODEL, voice: str = TTS_VOICE, fmt: str = TTS_FORMAT) -> str:
+    """
+    Content address of a synthesized clip. Whitespace and surrounding quotes don't change
+    the spoken audio, so they don't change the key either.
+    """
+    spoken = " ".join(text.split()).strip("\"'“”")
+    digest = hashlib.sha256(spoken.encode("utf-8")).hexdigest()
+    return f"{model}:{voice}:{fmt}:{digest}"
+
+def split_sentences(text: str, max_chars: int = TTS_CHUNK_CHARS) -> List[str]:
+    """
+    Splits text into TTS chunks on sentence boundaries.
+    The first sentence is a chunk of its own so playback can start as early as possible;
+    the following ones are grouped up to `max_chars`. A sentence longer than
+    `max_chars` (or the TTS_MAX_CHARS API limit) is split on word boundaries.
+    """
+    max_chars = min(max_chars, TTS_MAX_CHARS)
+    pieces = []
+    for sentence in _SENTENCE_BREAK.split(text):
+        sentence = sentence.strip()
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+
+    chunks = []
+    for piece in pieces:
+        if len(chunks) > 1 and len(chunks[-1]) + 1 + len(piece) <= max_chars:
+            chunks[-1] += " " + piece
+        else:
+            chunks.append(piece)
+    return chunks
+
+def _synthesize_chunk(text: str) -> Optional[bytes]:
+    try:
+        key = tts_cache_key(text)
+        if audio_cache is not None:
+            audio = audio_cache.get(key)
+            if audio is not None:
+                return audio
+
+        response = client.audio.speech.create(
+            model=TTS_MODEL,
+            voice=TTS_VOICE,
+            input=text,
+            response_format=TTS_FORMAT
+        )
+        if audio_cache is not None:
+            audio_cache.set(key, response.content)
+        return response.content
+    except Exception as e:
+        print(f"TTS Error: {e}")
+        return None
+
+def synthesize_speech(text: str) -> Optional[bytes]:
+    """
+    Generates TTS audio (mp3) for the given text and returns the raw bytes.
+    Sentence chunks are synthesized in parallel and concatenated (MP3 frames can be joined as-is).
+    """
+    chunks = split_sentences(text)
+    if not chunks:
+        return None
+    with ThreadPoolExecutor(max_workers=TTS_MAX_PARALLEL) as pool:
+        segments = list(pool.map(_synthesize_chunk, chunks))
+    if any(segment is None for segment in segments):
+        return None
+    return b"".join(segments)
+
+async def _asynthesize_chunk(text: str) -> Optional[bytes]:
+    try:
+        key = tts_cache_key(text)
+        if audio_cache is not None:
+            audio = await run_blocking("files", audio_cache.get, key)
+            if audio is not None:
+                return audio
+
+        async with limit("openai"):
+            response = await async_client.audio.speech.create(
+                model=TTS_MODEL,
+                voice=TTS_VOICE,
+                input=text,
+                response_format=TTS_FORMAT
+            )
+        if audio_cache is not None:
+            await run_blocking("files", audio_cache.set, key, response.content)
+        return response.content
+    except Exception as e:
+        print(f"TTS Error: {e}")
+        return None
+
+async def astream_speech(text: str, max_parallel: int = TTS_MAX_PARALLEL):
+    """
+    Yields the mp3 segments of the text in order. All sentence chunks are synthesized
+    concurrently (at most `max_parallel` at a time), so the first segment is ready after
+    the first sentence and the rest usually are by the time it has played.
+    Raises RuntimeError if a chunk fails.
+    """
+    semaphore = asyncio.Semaphore(max_parallel)
+
+    async def synthesize(chunk: str):
+        async with semaphore:
+            return await _asynthesize_chunk(chunk)
+
+    tasks = [asyncio.create_task(synthesize(chunk)) for chunk in split_sentences(text)]
+    try:
+        for i, task in enumerate(tasks):
+            segment = await task
+            if segment is None:
+                raise RuntimeError(f"TTS failed for chunk {i + 1}/{len(tasks)}")
+            yield segment
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def asynthesize_speech(text: str) -> Optional[bytes]:
+    """Async version of synthesize_speech (bounded by the OpenAI upstream limit)."""
+    try:
+        segments = [segment async for segment in astream_speech(text)]
+        return b"".join(segments) or None
+    except Exception as e:
+        print(f"TTS Error: {e}")
+        return None
+
+async def preseed(phrases):
+    """Synthesizes fixed answers (e.g. the "not in the videos" refusal) ahead of time, if not cached yet."""
+    if audio_cache is None:
+        return
+    for phrase in phrases:
+        if await run_blocking("files", audio_cache.get, tts_cache_key(phrase)) is None:
+            await _asynthesize_chunk(phrase)
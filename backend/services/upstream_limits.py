@@ -0,0 +1,70 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from backend.services import metrics
+
+# Max concurrent in-flight calls per upstream service (can be overridden from .env,
+# e.g. UPSTREAM_LIMIT_OPENAI=32). Requests above the limit wait for a free slot
+# instead of piling up on the upstream and hitting its rate limits.
+DEFAULT_LIMITS = {
+    "openai": 64,
+    "pinecone": 64,
+    "yfinance": 8,
+    # Whisper calls only wait on the STT service queue, which batches them; allow a full batch
+    "whisper": 8,
+    "files": 16,
+}
+
+_semaphores = {}
+_in_flight = {}
+_waiting = {}
+
+def get_limit(upstream: str) -> int:
+    default = DEFAULT_LIMITS.get(upstream, 16)
+    return int(os.getenv(f"UPSTREAM_LIMIT_{upstream.upper()}", str(default)))
+
+def _get_semaphore(upstream: str) -> asyncio.Semaphore:
+    semaphore = _semaphores.get(upstream)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(get_limit(upstream))
+        _semaphores[upstream] = semaphore
+        _in_flight[upstream] = 0
+        _waiting[upstream] = 0
+    return semaphore
+
+@asynccontextmanager
+async def limit(upstream: str):
+    """Async context manager holding one of the upstream's concurrency slots."""
+    semaphore = _get_semaphore(upstream)
+    _waiting[upstream] += 1
+    try:
+        await semaphore.acquire()
+    finally:
+        _waiting[upstream] -= 1
+    _in_flight[upstream] += 1
+    try:
+        yield
+    finally:
+        _in_flight[upstream] -= 1
+        semaphore.release()
+
+async def run_blocking(upstream: str, func, *args, **kwargs):
+    """
+    Runs a blocking call (yfinance, pandas, Whisper, PyMuPDF...) in a worker thread
+    while holding a slot of the given upstream, so the event loop stays free.
+    """
+    async with limit(upstream):
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+def stats() -> dict:
+    return {
+        upstream: {
+            "limit": get_limit(upstream),
+            "in_flight": _in_flight.get(upstream, 0),
+            "waiting": _waiting.get(upstream, 0),
+        }
+        for upstream in _semaphores
+    }
+
+metrics.register("upstream_limits", stats)
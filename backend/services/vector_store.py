@@ -0,0 +1,123 @@
+import os
+import threading
+
+import numpy as np
+
+from backend.services.embeddings import get_embeddings
+
+INDEX_NAME = os.getenv("RAG_INDEX_NAME", "youtube-rag-index")
+LOCAL_INDEX_DIR = os.getenv(
+    "LOCAL_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "index", "local")
+)
+
+_local_stores = {}
+_lock = threading.Lock()
+
+def get_backend(backend: str = None) -> str:
+    """
+    "pinecone" (default, remote) or "local" (in-process memory-mapped index, works offline).
+    Read at call time so scripts that call load_dotenv() after importing this module still see it.
+    """
+    return (backend or os.getenv("VECTOR_STORE_BACKEND", "pinecone")).lower()
+
+def get_vector_store(embedding=None, index_name: str = INDEX_NAME, backend: str = None):
+    """
+    Returns the vector store for an index, using the backend selected by VECTOR_STORE_BACKEND.
+    Local stores are shared per index so the memory-mapped matrix is loaded only once per process.
+    """
+    backend = get_backend(backend)
+    embedding = embedding or get_embeddings()
+
+    if backend == "pinecone":
+        from langchain_pinecone import PineconeVectorStore
+        return PineconeVectorStore(index_name=index_name, embedding=embedding)
+
+    if backend == "local":
+        from backend.services.local_index import LocalVectorStore
+        with _lock:
+            store = _local_stores.get(index_name)
+            if store is None or store.embedding is not embedding:
+                store = LocalVectorStore(os.path.join(LOCAL_INDEX_DIR, index_name), embedding)
+                _local_stores[index_name] = store
+            return store
+
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {backend}")
+
+def get_index_stats(index_name: str = INDEX_NAME, backend: str = None) -> dict:
+    """Returns {"total_vectors": ..., "namespaces": ...} for the configured backend."""
+    if get_backend(backend) == "local":
+        store = get_vector_store(index_name=index_name, backend="local")
+        return {"total_vectors": len(store), "namespaces": {}}
+
+    from pinecone import Pinecone
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    stats = pc.Index(index_name).describe_index_stats()
+    return {"total_vectors": stats.total_vector_count, "namespaces": stats.namespaces}
+
+def search_with_vectors(vector_store, embedding, k: int = 4, filter: dict = None):
+    """
+    Top-k [(document, stored vector)] for a query vector, so MMR can use the vectors the index
+    already holds instead of re-embedding every candidate. Pinecone returns them in the same
+    query (include_values=True); the local index reads them from its matrix.
+    Returns None for vector stores that can't return their vectors.
+    """
+    from backend.services.local_index import LocalVectorStore
+
+    if isinstance(vector_store, LocalVectorStore):
+        return vector_store.search_with_vectors(embedding, k=k, filter=filter)
+
+    index = getattr(vector_store, "_index", None)
+    text_key = getattr(vector_store, "_text_key", None)
+    if index is None or text_key is None:
+        return None
+
+    from langchain_core.documents import Document
+    response = index.query(
+        vector=[float(x) for x in embedding],
+        top_k=k,
+        filter=filter,
+        include_values=True,
+        include_metadata=True,
+        namespace=getattr(vector_store, "_namespace", None),
+    )
+    results = []
+    for match in response["matches"]:
+        # Same parsing as PineconeVectorStore: the chunk text is stored in the metadata
+        metadata = dict(match["metadata"] or {})
+        text = metadata.pop(text_key, None)
+        if text is None:
+            continue
+        results.append((Document(page_content=text, metadata=metadata), np.asarray(match["values"], dtype=np.float32)))
+    return results
+
+def delete_by_source(vector_store, source: str):
+    """
+    Deletes every vector whose "source" metadata is `source`, whatever its id. Used to migrate
+    chunks stored before ids were derived from their content (random UUIDs the ingest manifest
+    doesn't know about, so it can never replace or delete them).
+    """
+    from backend.services.local_index import LocalVectorStore
+
+    if isinstance(vector_store, LocalVectorStore):
+        vector_store.delete(filter={"source": source})
+        return
+
+    index = getattr(vector_store, "_index", None)
+    if index is None:
+        raise ValueError(f"Deleting by source is not supported for {type(vector_store).__name__}")
+    namespace = getattr(vector_store, "_namespace", None)
+    source_filter = {"source": {"$eq": source}}
+    try:
+        index.delete(filter=source_filter, namespace=namespace)
+        return
+    except Exception as e:
+        # Some serverless indexes don't delete by metadata: look the ids up with a filtered query
+        print(f"Warning: Delete by metadata failed for {source}, deleting by id instead: {e}")
+    dimension = index.describe_index_stats()["dimension"]
+    response = index.query(
+        vector=[1.0] * dimension, top_k=10000, filter=source_filter, include_values=False, namespace=namespace
+    )
+    ids = [match["id"] for match in response["matches"]]
+    for start in range(0, len(ids), 1000):
+        index.delete(ids=ids[start:start + 1000], namespace=namespace)
@@ -1,14 +1,20 @@
 import os
 import json
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
+from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import RetrievalQA
 from dotenv import load_dotenv
+from backend.services.embeddings import get_embeddings
+from backend.services.vector_store import get_vector_store
+from backend.services.retrieval_cache import CachedRetriever
+from backend.services.rerank import RERANK_FETCH_K, DiversifiedRetriever, get_reranker
+from backend.services.context_packer import PackedRetriever, get_context_budget
+from backend.services.single_flight import SingleFlight
 
 load_dotenv()
 
 INDEX_NAME = "youtube-rag-index"
+THESIS_TOP_K = int(os.getenv("THESIS_TOP_K", "6"))
 
 def get_nvidia_chart():
     return {
@@ -18,22 +24,41 @@ def get_nvidia_chart():
         "current_price": [190, 190, 190, 190, 190]   # Your benchmark dotted line
     }
 
+# Concurrent requests for the same company (from the API worker threads) share one run
+_thesis_flight = SingleFlight("thesis_data")
+
 def get_thesis_data(company_name: str):
     """
     Retrieves PDF data for a company, summarizes the thesis, 
     and extracts financial data for graphing.
     """
+    return _thesis_flight.do(company_name.strip().lower(), build_thesis_data, company_name)
+
+def build_thesis_data(company_name: str):
     
     # 1. Setup Vector Store with PDF Filter
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vector_store = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
+    embeddings = get_embeddings()
+    vector_store = get_vector_store(embeddings, INDEX_NAME)
     
     # Filter for PDFs only - Restored as per user request to see PDF info
-    retriever = vector_store.as_retriever(
-        search_kwargs={
-            "k": 10,
-            "filter": {"type": "pdf"} 
-        }
+    # Over-fetch, then keep a smaller diverse set (MMR) instead of 10 overlapping chunks,
+    # packed into the thesis token budget
+    retriever = CachedRetriever(
+        retriever=PackedRetriever(
+            retriever=DiversifiedRetriever(
+                retriever=vector_store.as_retriever(
+                    search_kwargs={
+                        "k": RERANK_FETCH_K,
+                        "filter": {"type": "pdf"}
+                    }
+                ),
+                embeddings=embeddings,
+                k=THESIS_TOP_K,
+                reranker=get_reranker()
+            ),
+            max_tokens=get_context_budget("thesis")
+        ),
+        namespace=INDEX_NAME
     )
     
     llm = ChatOpenAI(model="gpt-4o", temperature=0)
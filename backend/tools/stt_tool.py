@@ -1,47 +1,29 @@
-import whisper
 import os
-import tempfile
 
-# Load model once to avoid reloading overhead (global variable)
-# Using "base" model for speed/accuracy trade-off. Can be "tiny", "small", "medium", "large".
-MODEL_SIZE = "base"
-_model = None
+from backend.services.stt_service import transcribe_routed
 
-def get_model():
-    global _model
-    if _model is None:
-        print(f"Loading Whisper model: {MODEL_SIZE}...")
-        _model = whisper.load_model(MODEL_SIZE)
-    return _model
+# The models are owned by the STT service (loaded once at startup in its worker processes,
+# accessed through a queue). Sizes are set with STT_MODEL_SIZE / STT_SHORT_MODEL_SIZE.
 
-def transcribe_audio(audio_file) -> str:
+def transcribe_audio(audio_file, language: str = None) -> str:
     """
-    Transcribes an audio file object (like from Streamlit or file path).
-    Returns the transcribed text.
+    Transcribes an audio file object (like from Streamlit or an upload), raw audio bytes
+    or a file path. `language` is an optional hint ("es", "en"). Returns the transcribed text.
+    Short clips are routed to a smaller model (see stt_service.route_clip).
     """
     try:
-        model = get_model()
-        
-        # Handle Streamlit UploadedFile or bytes
+        # Uploads are decoded in memory (piped through ffmpeg), nothing is written to disk
         if hasattr(audio_file, "read"):
-            # Save to a temp file because Whisper expects a path or numpy array
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-                tmp.write(audio_file.read())
-                tmp_path = tmp.name
+            audio = audio_file.read()
+        elif isinstance(audio_file, (bytes, bytearray)):
+            audio = bytes(audio_file)
         elif isinstance(audio_file, str) and os.path.exists(audio_file):
-            tmp_path = audio_file
+            print(f"Transcribing audio: {audio_file}")
+            audio = audio_file
         else:
-            raise ValueError("Invalid audio input. Must be a file path or file-like object.")
-
-        # Transcribe
-        print(f"Transcribing audio: {tmp_path}")
-        result = model.transcribe(tmp_path)
-        text = result["text"]
-
-        # Cleanup temp file if we created it
-        if hasattr(audio_file, "read"):
-            os.remove(tmp_path)
+            raise ValueError("Invalid audio input. Must be a file path, bytes or a file-like object.")
 
+        text = transcribe_routed(audio, language)
         return text.strip()
     except Exception as e:
         print(f"Error during transcription: {e}")
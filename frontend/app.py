@@ -1,13 +1,14 @@
 import streamlit as st
 import sys
 import os
+import uuid
 
 # Add parent directory to path to import backend
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from backend.rag_chain import answer_question
 
-from backend.speech_to_text import transcribe_audio
+from backend.tools.stt_tool import transcribe_audio
 
 st.set_page_config(page_title="Value Investing AI", layout="wide")
 
@@ -17,6 +18,8 @@ st.write("Ask questions about the value investing videos via Text or Audio.")
 # Initialize chat history
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
 
 # Display chat messages from history on app rerun
 for message in st.session_state.messages:
@@ -47,7 +50,7 @@ if prompt:
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
             try:
-                response = answer_question(prompt)
+                response = answer_question(prompt, session_id=st.session_state.session_id)
                 st.markdown(response)
                 # Add assistant response to chat history
                 st.session_state.messages.append({"role": "assistant", "content": response})
@@ -9,29 +9,98 @@ const sourceLink = document.getElementById('sourceLink');
 const loader = document.getElementById('loader');
 let currentAudio = null;
 
+// --- Session ---
+// Each browser tab gets its own conversation history on the server
+function getSessionId() {
+    let sessionId = sessionStorage.getItem('auraSessionId');
+    if (!sessionId) {
+        sessionId = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : Date.now().toString(36) + Math.random().toString(36).slice(2);
+        sessionStorage.setItem('auraSessionId', sessionId);
+    }
+    return sessionId;
+}
+const sessionId = getSessionId();
+
+// Plain questions use the single-call RAG path (follow-ups are made standalone with the session
+// history on the server); the server falls back to the agent for commands
+const ANSWER_MODE = "direct";
+// Spoken language hint for transcription (the server only trusts the ones it supports)
+const SPEECH_LANGUAGE = (navigator.language || "").slice(0, 2);
+
 async function askText() {
     const query = queryInput.value.trim();
     if (!query) return;
 
     showLoading(true);
+    let streamedText = "";
 
     try {
-        const response = await fetch(`${API_URL}/ask-text`, {
+        const response = await fetch(`${API_URL}/ask-text/stream`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ query })
+            body: JSON.stringify({ query, session_id: sessionId, mode: ANSWER_MODE })
+        });
+        if (!response.ok || !response.body) {
+            throw new Error(`Request failed (${response.status})`);
+        }
+
+        await readEventStream(response, (event, data) => {
+            if (event === 'token') {
+                // Show the answer as soon as the first token arrives
+                if (!streamedText) {
+                    showLoading(false);
+                    resultCard.classList.add('visible');
+                }
+                streamedText += data.text;
+                answerText.innerText = streamedText;
+            } else if (event === 'done') {
+                displayResult({
+                    answer: data.answer,
+                    audio_url: data.audio_id ? `${API_URL}/audio/${data.audio_id}` : null
+                });
+            } else if (event === 'error') {
+                displayResult({ answer: "Error: " + data.error });
+            }
         });
-        const data = await response.json();
-        displayResult(data);
     } catch (error) {
         displayResult({ answer: "Error: " + error.message });
     } finally {
         showLoading(false);
     }
 }
+
+// Parses a Server-Sent Events response body and calls onEvent(event, data) for each event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = "message";
+            let data = "";
+            rawEvent.split("\n").forEach(line => {
+                if (line.startsWith("event:")) event = line.slice(6).trim();
+                else if (line.startsWith("data:")) data += line.slice(5).trim();
+            });
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
 function displayResult(data) {
     const text = data.answer || "";
-    const audioBase64 = data.audio_base64;
+    const audioUrl = data.audio_url;
 
     // Regex for markdown links
     const linkRegex = /\[(.*?)\]\((.*?)\)/;
@@ -56,12 +125,12 @@ function displayResult(data) {
     resultCard.classList.add('visible');
 
     // Auto Play Audio
-    if (audioBase64) {
+    if (audioUrl) {
         if (currentAudio) {
             currentAudio.pause();
             currentAudio = null;
         }
-        currentAudio = new Audio("data:audio/mp3;base64," + audioBase64);
+        currentAudio = new Audio(audioUrl);
         currentAudio.play().catch(e => console.error("Auto-play failed:", e));
     }
 }
@@ -86,10 +155,22 @@ if (askBtn) {
 const micBtn = document.getElementById('micBtn');
 let mediaRecorder;
 let audioChunks = [];
+let liveRecording = null;
+
+// Live transcription streams 16 kHz PCM over a WebSocket while the user speaks;
+// browsers without Web Audio fall back to recording a clip and uploading it
+const LIVE_SAMPLE_RATE = 16000;
+const AudioContextClass = window.AudioContext || window.webkitAudioContext;
 
 if (micBtn) {
     micBtn.addEventListener('click', async () => {
-        if (!mediaRecorder || mediaRecorder.state === "inactive") {
+        if (AudioContextClass && window.WebSocket) {
+            if (!liveRecording) {
+                startLiveRecording();
+            } else {
+                liveRecording.stop();
+            }
+        } else if (!mediaRecorder || mediaRecorder.state === "inactive") {
             startRecording();
         } else {
             stopRecording();
@@ -97,6 +178,94 @@ if (micBtn) {
     });
 }
 
+// Averages the microphone samples down to 16 kHz and converts them to 16-bit PCM
+function toPcm16(samples, inputRate) {
+    const ratio = inputRate / LIVE_SAMPLE_RATE;
+    const pcm = new Int16Array(Math.floor(samples.length / ratio));
+    for (let i = 0; i < pcm.length; i++) {
+        const start = Math.floor(i * ratio);
+        const end = Math.min(samples.length, Math.floor((i + 1) * ratio));
+        let sum = 0;
+        for (let j = start; j < end; j++) sum += samples[j];
+        const value = Math.max(-1, Math.min(1, sum / Math.max(1, end - start)));
+        pcm[i] = value < 0 ? value * 0x8000 : value * 0x7fff;
+    }
+    return pcm;
+}
+
+async function startLiveRecording() {
+    let stream;
+    try {
+        stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+    } catch (err) {
+        console.error("Error accessing microphone:", err);
+        alert("Could not access microphone. Please allow permissions.");
+        return;
+    }
+
+    const params = new URLSearchParams({ session_id: sessionId, mode: ANSWER_MODE, language: SPEECH_LANGUAGE });
+    const socket = new WebSocket(`${API_URL.replace(/^http/, "ws")}/ws/ask-audio?${params}`);
+    socket.binaryType = "arraybuffer";
+    const context = new AudioContextClass();
+    const source = context.createMediaStreamSource(stream);
+    const processor = context.createScriptProcessor(4096, 1, 1);
+
+    const stopCapture = () => {
+        processor.disconnect();
+        source.disconnect();
+        stream.getTracks().forEach(track => track.stop());
+        context.close();
+        micBtn.classList.remove('recording');
+        liveRecording = null;
+    };
+
+    processor.onaudioprocess = event => {
+        if (socket.readyState === WebSocket.OPEN) {
+            socket.send(toPcm16(event.inputBuffer.getChannelData(0), context.sampleRate).buffer);
+        }
+    };
+
+    socket.onmessage = event => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'partial') {
+            queryInput.value = data.text;
+        } else if (data.type === 'final') {
+            // The server detected the end of the question and is answering it
+            queryInput.value = data.text;
+            if (liveRecording) stopCapture();
+            showLoading(true);
+        } else if (data.type === 'answer') {
+            showLoading(false);
+            displayResult({
+                ...data,
+                audio_url: data.audio_id ? `${API_URL}/audio/${data.audio_id}` : null
+            });
+        } else if (data.type === 'error') {
+            showLoading(false);
+            displayResult({ answer: "Error: " + data.error });
+        }
+    };
+    socket.onerror = () => {
+        if (liveRecording) stopCapture();
+        showLoading(false);
+        displayResult({ answer: "Error: live transcription connection failed" });
+    };
+
+    source.connect(processor);
+    processor.connect(context.destination);
+    micBtn.classList.add('recording');
+    liveRecording = {
+        // Clicking the mic again ends the question without waiting for the silence timeout
+        stop: () => {
+            if (socket.readyState === WebSocket.OPEN) {
+                socket.send(JSON.stringify({ type: "stop" }));
+            }
+            stopCapture();
+            showLoading(true);
+        }
+    };
+}
+
 async function startRecording() {
     try {
         const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
@@ -137,6 +306,9 @@ async function sendAudio(blob) {
     const formData = new FormData();
     // Send as .webm
     formData.append("file", blob, "recording.webm");
+    formData.append("session_id", sessionId);
+    formData.append("mode", ANSWER_MODE);
+    formData.append("language", SPEECH_LANGUAGE);
 
     try {
         const response = await fetch(`${API_URL}/ask-audio`, {
@@ -150,7 +322,10 @@ async function sendAudio(blob) {
             queryInput.value = data.transcription;
         }
 
-        displayResult(data);
+        displayResult({
+            ...data,
+            audio_url: data.audio_id ? `${API_URL}/audio/${data.audio_id}` : null
+        });
     } catch (error) {
         displayResult({ answer: "Error: " + error.message });
     } finally {
@@ -0,0 +1,105 @@
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+# Make the backend package importable when run as `python scripts/benchmark_stt.py`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.services.stt_engines import ENGINES, SAMPLE_RATE, get_engine, resolve_engine_name
+from backend.services.stt_service import load_audio
+
+AUDIO_EXTENSIONS = (".webm", ".ogg", ".wav", ".mp3", ".m4a", ".flac")
+
+def find_recordings(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(AUDIO_EXTENSIONS)
+            )
+        elif os.path.isfile(path):
+            files.append(path)
+    return files
+
+def peak_memory_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_engine(engine_name, model_size, threads, clips, results):
+    """Runs in its own process so the peak memory belongs to this engine only."""
+    baseline = peak_memory_mb()
+    engine = get_engine(engine_name, model_size, threads)
+    start = time.perf_counter()
+    engine.load()
+    load_seconds = time.perf_counter() - start
+
+    # Warm-up (first-call allocations shouldn't count against the first clip)
+    engine.transcribe_clips([clips[0][1][:SAMPLE_RATE]])
+
+    decode_seconds = 0.0
+    texts = {}
+    for name, audio in clips:
+        start = time.perf_counter()
+        result = engine.transcribe_clips([audio])[0][0]
+        decode_seconds += time.perf_counter() - start
+        texts[name] = f"ERROR: {result}" if isinstance(result, Exception) else result.strip()
+
+    results.put({
+        "engine": engine_name,
+        "load_seconds": load_seconds,
+        "decode_seconds": decode_seconds,
+        "peak_mb": peak_memory_mb(),
+        "model_mb": peak_memory_mb() - baseline,
+        "texts": texts,
+    })
+
+def benchmark_stt(paths, engines, model_size, threads=None, show_text=False):
+    """
+    Compares STT engines on our own recordings: real-time factor (decode time / audio
+    duration, lower is better), model load time and peak memory of the process.
+    """
+    files = find_recordings(paths)
+    if not files:
+        print(f"ERROR: no recordings found in {paths}")
+        return
+
+    clips = [(os.path.basename(path), load_audio(path)) for path in files]
+    audio_seconds = sum(len(audio) for _, audio in clips) / SAMPLE_RATE
+    print(f"{len(clips)} recordings, {audio_seconds:.1f} s of audio, model '{model_size}'\n")
+
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    for engine_name in engines:
+        if resolve_engine_name(engine_name) != engine_name:
+            print(f"Skipping {engine_name} (not installed)")
+            continue
+        results = context.Queue()
+        process = context.Process(target=run_engine, args=(engine_name, model_size, threads, clips, results))
+        process.start()
+        rows.append(results.get())
+        process.join()
+
+    print(f"{'engine':<16}{'load s':>8}{'decode s':>10}{'RTF':>8}{'peak MB':>10}{'model MB':>10}")
+    for row in rows:
+        rtf = row["decode_seconds"] / audio_seconds
+        print(f"{row['engine']:<16}{row['load_seconds']:>8.2f}{row['decode_seconds']:>10.2f}"
+              f"{rtf:>8.3f}{row['peak_mb']:>10.0f}{row['model_mb']:>10.0f}")
+
+    if show_text:
+        for name, _ in clips:
+            print(f"\n{name}")
+            for row in rows:
+                print(f"  {row['engine']:<16}{row['texts'][name]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark STT engines on local recordings")
+    parser.add_argument("paths", nargs="+", help="Audio files or directories with recordings")
+    parser.add_argument("--engines", nargs="+", default=sorted(ENGINES), choices=sorted(ENGINES))
+    parser.add_argument("--model", default="base", help="Model size (tiny, base, small...)")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads per engine (default: all)")
+    parser.add_argument("--show-text", action="store_true", help="Print every transcript to compare accuracy")
+    args = parser.parse_args()
+    benchmark_stt(args.paths, args.engines, args.model, args.threads, args.show_text)
@@ -0,0 +1,50 @@
+import os
+import sys
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from dotenv import load_dotenv
+
+# Make the backend package importable when run as `python scripts/build_bm25_index.py`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.services import index_version
+from backend.services.bm25_index import get_bm25_index
+
+load_dotenv()
+
+INDEX_NAME = os.getenv("RAG_INDEX_NAME", "youtube-rag-index")
+TRANSCRIPTS_DIR = os.path.join("data", "transcripts")
+
+def build_bm25_index():
+    """
+    Builds the BM25 index from the saved transcripts, for an index that was
+    ingested before hybrid search existed. New ingestions update it automatically.
+    Uses the same splitter settings as ingest_data.py so chunks line up with the vector index.
+    """
+    if not os.path.isdir(TRANSCRIPTS_DIR):
+        print(f"ERROR: {TRANSCRIPTS_DIR} not found")
+        return
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    splits = []
+    for file_name in sorted(os.listdir(TRANSCRIPTS_DIR)):
+        if not file_name.endswith(".txt"):
+            continue
+        video_id = file_name[:-4]
+        with open(os.path.join(TRANSCRIPTS_DIR, file_name), "r", encoding="utf-8") as f:
+            text = f.read()
+        if not text.strip():
+            continue
+        doc = Document(
+            page_content=text,
+            metadata={"source": f"https://www.youtube.com/watch?v={video_id}", "title": f"Video {video_id}"}
+        )
+        splits.extend(text_splitter.split_documents([doc]))
+
+    print(f"Indexing {len(splits)} chunks into the BM25 index '{INDEX_NAME}'...")
+    index = get_bm25_index(INDEX_NAME)
+    index.add_documents(splits)
+    index_version.bump("bm25 rebuild")
+    print(f"Done. {len(index)} chunks indexed.")
+
+if __name__ == "__main__":
+    build_bm25_index()
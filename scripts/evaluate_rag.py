@@ -1,20 +1,24 @@
 import os
+import sys
 import openai
 from dotenv import load_dotenv
 from langchain import hub
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
 from langsmith import traceable
 from langsmith.wrappers import wrap_openai
 from langsmith.evaluation import evaluate
 
+# Make the backend package importable when run as `python scripts/evaluate_rag.py`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.services.vector_store import get_backend, get_vector_store
+
 # Load environment variables
 load_dotenv()
 
 # Ensure API keys are present
 if not os.getenv("OPENAI_API_KEY"):
     raise ValueError("OPENAI_API_KEY not found in environment variables.")
-if not os.getenv("PINECONE_API_KEY"):
+if get_backend() == "pinecone" and not os.getenv("PINECONE_API_KEY"):
     raise ValueError("PINECONE_API_KEY not found in environment variables.")
 if not os.getenv("LANGCHAIN_API_KEY"):
     print("Warning: LANGCHAIN_API_KEY not found. LangSmith tracing may not work.")
@@ -22,7 +26,7 @@ if not os.getenv("LANGCHAIN_API_KEY"):
 # --- 1. SETUP RETRIEVER ---
 INDEX_NAME = "youtube-rag-index"
 embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-vector_store = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
+vector_store = get_vector_store(embeddings, INDEX_NAME)
 # Filter out PDFs to match the main pipeline's logic if needed, or keep all. 
 # The user's prompt didn't specify filtering, but the main pipeline does. 
 # I'll include the filter for consistency with the "Antigravity" system.
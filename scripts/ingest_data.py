@@ -1,17 +1,21 @@
 import os
+import sys
 import time
 from typing import List
 from dotenv import load_dotenv
 from langchain_community.document_loaders import YoutubeLoader, PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone, ServerlessSpec
 from langsmith import traceable
 import yt_dlp
 import whisper
 import shutil
 
+# Make the backend package importable when run as `python scripts/<name>.py`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.services.embeddings import get_embeddings
+from backend.services.ingest_manifest import IngestManifest, content_hash
+from backend.services.vector_store import get_backend, get_vector_store
+
 # Load environment variables
 load_dotenv()
 
@@ -20,25 +24,28 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY") or os.getenv("PINECONE APY KEY"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 INDEX_NAME = "youtube-rag-index"
 
-if not PINECONE_API_KEY:
-    raise ValueError("PINECONE_API_KEY not found in environment variables.")
-
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
-
-# Check if index exists, create if not
-existing_indexes = [index.name for index in pc.list_indexes()]
-if INDEX_NAME not in existing_indexes:
-    print(f"Creating Pinecone index: {INDEX_NAME}")
-    pc.create_index(
-        name=INDEX_NAME,
-        dimension=1536, # OpenAI text-embedding-3-small dimension
-        metric="cosine",
-        spec=ServerlessSpec(
-            cloud="aws",
-            region="us-east-1"
+if get_backend() == "pinecone":
+    from pinecone import Pinecone, ServerlessSpec
+
+    if not PINECONE_API_KEY:
+        raise ValueError("PINECONE_API_KEY not found in environment variables.")
+
+    # Initialize Pinecone
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+
+    # Check if index exists, create if not
+    existing_indexes = [index.name for index in pc.list_indexes()]
+    if INDEX_NAME not in existing_indexes:
+        print(f"Creating Pinecone index: {INDEX_NAME}")
+        pc.create_index(
+            name=INDEX_NAME,
+            dimension=1536, # OpenAI text-embedding-3-small dimension
+            metric="cosine",
+            spec=ServerlessSpec(
+                cloud="aws",
+                region="us-east-1"
+            )
         )
-    )
 
 # --- Data Paths ---
 DATA_DIR = "data"
@@ -46,6 +53,10 @@ AUDIO_DIR = os.path.join(DATA_DIR, "audio")
 TRANSCRIPTS_DIR = os.path.join(DATA_DIR, "transcripts")
 PDFS_DIR = os.path.join(DATA_DIR, "pdfs")
 
+# Splitter settings (part of every source's content hash in the ingest manifest)
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+
 # Ensure directories exist
 os.makedirs(AUDIO_DIR, exist_ok=True)
 os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
@@ -109,9 +120,18 @@ def download_audio_and_transcribe(url: str, video_id: str) -> str:
         print(f"Error in Whisper transcription: {e}")
         return ""
 
+def print_sync_result(source: str, result: dict):
+    if result["skipped"]:
+        print(f"Unchanged, skipped: {source}")
+    else:
+        print(f"{source}: {result['added']} chunks upserted, {result['deleted']} stale deleted, {result['kept']} unchanged.")
+
 @traceable(name="process_video")
-def process_video(url: str, vector_store):
-    """Processes a single video: Transcribe -> Chunk -> Embed -> Store."""
+def process_video(url: str, vector_store, manifest: IngestManifest = None, rebuild: bool = False):
+    """
+    Processes a single video: Transcribe -> Chunk -> Embed -> Store (only new or changed chunks).
+    `rebuild` re-adds the video after deleting all its vectors (see --rebuild).
+    """
     print(f"Processing Video: {url}")
     
     # Extract Video ID for filenames
@@ -149,18 +169,25 @@ def process_video(url: str, vector_store):
         print(f"Could not process video {url}")
         return
 
+    manifest = manifest or IngestManifest(INDEX_NAME)
+    digest = content_hash("\n".join(d.page_content for d in docs), CHUNK_SIZE, CHUNK_OVERLAP)
+    if not rebuild and manifest.is_unchanged(url, digest):
+        print(f"Unchanged, skipped: {url}")
+        return
+
     # 3. Split Text
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
     splits = text_splitter.split_documents(docs)
     
-    # 4. Embed and Store
-    print(f"Upserting {len(splits)} chunks to Pinecone...")
-    vector_store.add_documents(documents=splits)
-    print("Done.")
+    # 4. Embed and Store (deterministic ids: only chunks the index doesn't have are embedded)
+    print_sync_result(url, manifest.sync_source(vector_store, url, splits, digest, rebuild=rebuild))
 
 @traceable(name="process_pdfs")
-def process_pdfs(vector_store):
-    """Processes all PDFs in the data/pdfs directory using OCR if needed."""
+def process_pdfs(vector_store, manifest: IngestManifest = None, rebuild: bool = False):
+    """
+    Processes the new or changed PDFs in the data/pdfs directory using OCR if needed.
+    `rebuild` re-adds every PDF after deleting all its vectors (see --rebuild).
+    """
     print("Processing PDFs...")
     
     pdf_files = [f for f in os.listdir(PDFS_DIR) if f.lower().endswith('.pdf')]
@@ -169,6 +196,21 @@ def process_pdfs(vector_store):
         print("No PDFs found.")
         return
 
+    # Skip the PDFs whose bytes didn't change since they were ingested (before loading any OCR model)
+    manifest = manifest or IngestManifest(INDEX_NAME)
+    digests = {}
+    for pdf_file in pdf_files:
+        with open(os.path.join(PDFS_DIR, pdf_file), "rb") as f:
+            digest = content_hash(f.read(), CHUNK_SIZE, CHUNK_OVERLAP)
+        if not rebuild and manifest.is_unchanged(pdf_file, digest):
+            print(f"Unchanged, skipped: {pdf_file}")
+        else:
+            digests[pdf_file] = digest
+    pdf_files = [f for f in pdf_files if f in digests]
+    if not pdf_files:
+        print("All PDFs are up to date.")
+        return
+
     # Initialize OCR
     HAS_OCR = False
     USE_HUNYUAN = True # Enabled per user request
@@ -278,34 +320,37 @@ def process_pdfs(vector_store):
                 doc.metadata["type"] = "pdf"
 
             # Split Text
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+            text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
             splits = text_splitter.split_documents(docs)
             
-            # Embed and Store
+            # Embed and Store (a changed PDF is diffed: new chunks upserted, stale ones deleted)
             if splits:
-                print(f"Upserting {len(splits)} chunks from {pdf_file} to Pinecone...")
-                vector_store.add_documents(documents=splits)
-                print("Done.")
+                print_sync_result(pdf_file, manifest.sync_source(vector_store, pdf_file, splits, digests[pdf_file], rebuild=rebuild))
             else:
                 print(f"No text to upsert for {pdf_file}")
             
         except Exception as e:
             print(f"Error processing {pdf_file}: {e}")
 
-def ingest_all_data():
+def ingest_all_data(rebuild: bool = False):
     # Initialize Vector Store
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vector_store = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
+    embeddings = get_embeddings("text-embedding-3-small")
+    vector_store = get_vector_store(embeddings, INDEX_NAME)
+    # Re-running is safe: unchanged sources are skipped and nothing is stored twice
+    manifest = IngestManifest(INDEX_NAME)
     
     # 1. Process PDFs (Prioritize this!)
     print("\n--- Processing PDFs ---")
-    process_pdfs(vector_store)
+    process_pdfs(vector_store, manifest, rebuild=rebuild)
 
     # 2. Process Videos
     print("\n--- Processing Videos ---")
     links = read_video_links("videos_link.txt")
     for link in links:
-        process_video(link, vector_store)
+        process_video(link, vector_store, manifest, rebuild=rebuild)
 
 if __name__ == "__main__":
-    ingest_all_data()
+    # --rebuild: one-time migration of vectors stored under random ids before the ingest
+    # manifest existed. Each source's vectors are deleted by source and re-added with
+    # deterministic ids (re-embeds everything, so only needed once)
+    ingest_all_data(rebuild="--rebuild" in sys.argv[1:])
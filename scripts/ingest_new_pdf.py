@@ -1,29 +1,41 @@
 import os
+import sys
 import fitz  # PyMuPDF
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from pinecone import Pinecone
 from dotenv import load_dotenv
 
+# Make the backend package importable when run as `python scripts/ingest_new_pdf.py`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.services.embeddings import get_embeddings
+from backend.services.ingest_manifest import IngestManifest, content_hash
+from backend.services.vector_store import get_vector_store
+
 load_dotenv()
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = "youtube-rag-index"
 PDF_PATH = os.path.join("data", "pdfs", "NVIDIA_Thesis_INVESTMENT.pdf")
+PDF_SOURCE = "NVIDIA_Thesis_INVESTMENT.pdf"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
 
-def ingest_specific_pdf():
+def ingest_specific_pdf(rebuild: bool = False):
     print(f"--- Ingesting {PDF_PATH} ---")
     
     if not os.path.exists(PDF_PATH):
         print(f"ERROR: File not found at {PDF_PATH}")
         return
 
-    # Initialize Pinecone
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vector_store = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
+    manifest = IngestManifest(INDEX_NAME)
+    with open(PDF_PATH, "rb") as f:
+        digest = content_hash(f.read(), CHUNK_SIZE, CHUNK_OVERLAP)
+    if not rebuild and manifest.is_unchanged(PDF_SOURCE, digest):
+        print("PDF unchanged since the last ingestion, nothing to do.")
+        return
+
+    embeddings = get_embeddings("text-embedding-3-small")
+    vector_store = get_vector_store(embeddings, INDEX_NAME)
 
     # Process PDF with direct text extraction (No OCR)
     docs = []
@@ -37,7 +49,7 @@ def ingest_specific_pdf():
                 docs.append(Document(
                     page_content=text, 
                     metadata={
-                        "source": "NVIDIA_Thesis_INVESTMENT.pdf", 
+                        "source": PDF_SOURCE, 
                         "page": i, 
                         "type": "pdf"
                     }
@@ -57,16 +69,18 @@ def ingest_specific_pdf():
     # Chunking
     print(f"\nSplitting {len(docs)} pages into chunks...")
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=100
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
     )
     splits = text_splitter.split_documents(docs)
     print(f"Created {len(splits)} chunks.")
 
-    # Upsert to Pinecone
-    print(f"Upserting to Pinecone index '{INDEX_NAME}'...")
-    vector_store.add_documents(splits)
+    # Upsert to the vector store (only new chunks; chunks of the previous version are deleted)
+    print(f"Upserting to index '{INDEX_NAME}'...")
+    result = manifest.sync_source(vector_store, PDF_SOURCE, splits, digest, rebuild=rebuild)
+    print(f"{result['added']} chunks upserted, {result['deleted']} stale deleted, {result['kept']} unchanged.")
     print("--- Ingestion Complete ---")
 
 if __name__ == "__main__":
-    ingest_specific_pdf()
+    # --rebuild: delete the PDF's vectors by source (including random-id copies from older runs) and re-add them
+    ingest_specific_pdf(rebuild="--rebuild" in sys.argv[1:])
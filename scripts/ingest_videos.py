@@ -1,16 +1,20 @@
 import os
+import sys
 import time
 from typing import List
 from dotenv import load_dotenv
 from langchain_community.document_loaders import YoutubeLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone, ServerlessSpec
 from langsmith import traceable
 import yt_dlp
 import whisper
 
+# Make the backend package importable when run as `python scripts/<name>.py`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.services.embeddings import get_embeddings
+from backend.services.ingest_manifest import IngestManifest, content_hash, sync_content
+from backend.services.vector_store import get_backend, get_vector_store
+
 # Load environment variables
 load_dotenv()
 
@@ -18,26 +22,32 @@ load_dotenv()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY") or os.getenv("PINECONE APY KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 INDEX_NAME = "youtube-rag-index"
+# Splitter settings (part of every video's content hash in the ingest manifest)
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+
+if get_backend() == "pinecone":
+    from pinecone import Pinecone, ServerlessSpec
 
-if not PINECONE_API_KEY:
-    raise ValueError("PINECONE_API_KEY not found in environment variables.")
+    if not PINECONE_API_KEY:
+        raise ValueError("PINECONE_API_KEY not found in environment variables.")
 
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
+    # Initialize Pinecone
+    pc = Pinecone(api_key=PINECONE_API_KEY)
 
-# Check if index exists, create if not
-existing_indexes = [index.name for index in pc.list_indexes()]
-if INDEX_NAME not in existing_indexes:
-    print(f"Creating Pinecone index: {INDEX_NAME}")
-    pc.create_index(
-        name=INDEX_NAME,
-        dimension=1536, # OpenAI text-embedding-3-small dimension
-        metric="cosine",
-        spec=ServerlessSpec(
-            cloud="aws",
-            region="us-east-1"
+    # Check if index exists, create if not
+    existing_indexes = [index.name for index in pc.list_indexes()]
+    if INDEX_NAME not in existing_indexes:
+        print(f"Creating Pinecone index: {INDEX_NAME}")
+        pc.create_index(
+            name=INDEX_NAME,
+            dimension=1536, # OpenAI text-embedding-3-small dimension
+            metric="cosine",
+            spec=ServerlessSpec(
+                cloud="aws",
+                region="us-east-1"
+            )
         )
-    )
 
 def read_video_links(file_path: str) -> List[str]:
     """Reads YouTube links from a text file."""
@@ -79,8 +89,12 @@ def download_audio_and_transcribe(url: str) -> str:
         return ""
 
 @traceable(name="process_video")
-def process_video(url: str, vector_store):
-    """Processes a single video: Transcribe -> Chunk -> Embed -> Store."""
+def process_video(url: str, vector_store, manifest: IngestManifest = None, rebuild: bool = False):
+    """
+    Processes a single video: Transcribe -> Chunk -> Embed -> Store (only new or changed chunks).
+    Without a manifest (the agent's YouTube tool, inside the API) the manifest is updated
+    under the API's ingestion lock. `rebuild` re-adds the video after deleting all its vectors.
+    """
     print(f"Processing: {url}")
     
     # 1. Try getting transcript via YoutubeLoader
@@ -112,32 +126,46 @@ def process_video(url: str, vector_store):
         # For simplicity in fallback, we'll use the URL as source.
         docs = [Document(page_content=text, metadata={"source": url, "title": "Whisper Transcription"})]
 
-    # 2. Chunking
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    splits = text_splitter.split_documents(docs)
-    
-    # 3. Embedding & Storage
-    if splits:
-        vector_store.add_documents(documents=splits)
-        print(f"Successfully added {len(splits)} chunks to Pinecone.")
+    digest = content_hash("\n".join(d.page_content for d in docs), CHUNK_SIZE, CHUNK_OVERLAP)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    # 2. Chunking, 3. Embedding & Storage (deterministic ids: only chunks the index doesn't have are embedded)
+    if manifest is None and not rebuild:
+        result = sync_content(INDEX_NAME, vector_store, url, digest, lambda: text_splitter.split_documents(docs))
+    else:
+        manifest = manifest or IngestManifest(INDEX_NAME)
+        if not rebuild and manifest.is_unchanged(url, digest):
+            print(f"Unchanged, skipped: {url}")
+            return
+        splits = text_splitter.split_documents(docs)
+        if not splits:
+            print("No content to add.")
+            return
+        result = manifest.sync_source(vector_store, url, splits, digest, rebuild=rebuild)
+
+    if result["skipped"]:
+        print(f"Unchanged, skipped: {url}")
     else:
-        print("No content to add.")
+        print(f"{url}: {result['added']} chunks upserted, {result['deleted']} stale deleted, {result['kept']} unchanged.")
 
-def ingest_all_videos():
-    """Main ingestion function."""
+def ingest_all_videos(rebuild: bool = False):
+    """Main ingestion function. `rebuild` re-ingests every video (see --rebuild)."""
     links = read_video_links("videos_link.txt")
     print(f"Found {len(links)} videos to process.")
     
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vector_store = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
+    embeddings = get_embeddings("text-embedding-3-small")
+    vector_store = get_vector_store(embeddings, INDEX_NAME)
+    # Videos whose transcript didn't change since the last run are skipped
+    manifest = IngestManifest(INDEX_NAME)
     
     for link in links:
         try:
-            # Optional: Check if already processed (naive check, can be improved)
-            # For now, we just process. 
-            process_video(link, vector_store)
+            process_video(link, vector_store, manifest, rebuild=rebuild)
         except Exception as e:
             print(f"Failed to process {link}: {e}")
 
 if __name__ == "__main__":
-    ingest_all_videos()
+    # --rebuild: one-time migration of vectors stored under random ids before the ingest
+    # manifest existed. Each video's vectors are deleted by source and re-added with
+    # deterministic ids (re-embeds everything, so only needed once)
+    ingest_all_videos(rebuild="--rebuild" in sys.argv[1:])
@@ -0,0 +1,16 @@
+import os
+import tempfile
+
+# Caches, indexes and the index version live in a throwaway directory, never in data/.
+# Set before any backend module is imported (they read these at import time).
+_DATA_DIR = tempfile.mkdtemp(prefix="aura-tests-")
+for _name, _path in {
+    "STT_CACHE_PATH": "stt.sqlite",
+    "TTS_CACHE_PATH": "tts.sqlite",
+    "EMBEDDING_DISK_CACHE_PATH": "embeddings.sqlite",
+    "INDEX_VERSION_PATH": "index_version.json",
+    "INGEST_MANIFEST_DIR": "manifest",
+    "BM25_INDEX_DIR": "bm25",
+    "LOCAL_INDEX_DIR": "local",
+}.items():
+    os.environ.setdefault(_name, os.path.join(_DATA_DIR, _path))
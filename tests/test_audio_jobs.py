@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+# audio_jobs imports the TTS module, which builds its OpenAI clients at import time
+pytest.importorskip("openai")
+
+from backend.services import audio_jobs
+from backend.services.audio_jobs import AudioJob
+
+
+def test_stream_yields_segments_as_they_arrive():
+    async def main():
+        job = AudioJob()
+        received = []
+
+        async def read():
+            async for segment in job.stream():
+                received.append(segment)
+
+        reader = asyncio.ensure_future(read())
+        job.append(b"a")
+        await asyncio.sleep(0)
+        job.append(b"b")
+        job.finish()
+        await reader
+        return received, await job.wait()
+
+    assert asyncio.run(main()) == ([b"a", b"b"], b"ab")
+
+
+def test_failed_job_has_no_audio():
+    async def main():
+        job = AudioJob()
+        job.append(b"partial")
+        job.finish(failed=True)
+        return await job.wait()
+
+    assert asyncio.run(main()) is None
+
+
+def test_oldest_jobs_are_evicted(monkeypatch):
+    monkeypatch.setattr(audio_jobs, "AUDIO_JOBS_MAX", 2)
+    monkeypatch.setattr(audio_jobs, "_jobs", type(audio_jobs._jobs)())
+    first = audio_jobs.put(b"1")
+    second = audio_jobs.put(b"2")
+    third = audio_jobs.put(b"3")
+
+    assert audio_jobs.get_job(first) is None
+    assert audio_jobs.get_job(second) is not None
+    assert asyncio.run(audio_jobs.get_audio(third)) == b"3"
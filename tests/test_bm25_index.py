@@ -0,0 +1,65 @@
+import pytest
+from langchain_core.documents import Document
+
+from backend.services.bm25_index import BM25Index, document_key, tokenize
+
+
+def test_tokenize_strips_accents_and_splits_compound_terms():
+    assert tokenize("¿Qué es el EV/FCF?") == ["que", "es", "el", "ev/fcf", "ev", "fcf"]
+    assert tokenize("free-cash-flow") == ["free-cash-flow", "free", "cash", "flow"]
+
+
+def test_document_key_ignores_whitespace():
+    assert document_key("a  b\nc") == document_key("a b c")
+    assert document_key("a b") != document_key("a c")
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25"))
+    index.add_documents([
+        Document(page_content="El ROIC mide la rentabilidad del capital invertido", metadata={"source": "v1"}),
+        Document(page_content="El múltiplo EV/FCF compara el valor de empresa con el flujo de caja libre",
+                 metadata={"source": "v2"}),
+        Document(page_content="Una ventaja competitiva duradera protege el ROIC", metadata={"source": "v3"}),
+    ])
+    return index
+
+
+def test_search_ranks_matching_documents(index):
+    results = index.search("roic", k=5)
+
+    assert {doc.metadata["source"] for doc, _ in results} == {"v1", "v3"}
+    assert all(score > 0 for _, score in results)
+
+
+def test_compound_term_matches_its_parts(index):
+    assert [doc.metadata["source"] for doc, _ in index.search("FCF")] == ["v2"]
+    assert [doc.metadata["source"] for doc, _ in index.search("múltiplo ev/fcf")] == ["v2"]
+
+
+def test_rows_without_query_terms_are_not_returned(index):
+    assert index.search("dividendos") == []
+    assert index.search("") == []
+
+
+def test_filter(index):
+    assert [doc.metadata["source"] for doc, _ in index.search("roic", filter={"source": "v3"})] == ["v3"]
+
+
+def test_readding_a_document_is_a_noop(index):
+    index.add_documents([Document(page_content="El ROIC mide la rentabilidad del capital invertido",
+                                  metadata={"source": "v1"})])
+
+    assert len(index) == 3
+
+
+def test_delete(index, tmp_path):
+    ids = index.add_documents([Document(page_content="dividendos crecientes", metadata={"source": "v4"})])
+    assert index.search("dividendos")
+
+    assert index.delete(ids)
+    assert index.search("dividendos") == []
+    assert not index.delete(ids)
+    # Another process opening the same directory sees the latest generation
+    assert len(BM25Index(str(tmp_path / "bm25"))) == 3
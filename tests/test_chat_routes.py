@@ -0,0 +1,27 @@
+import pytest
+
+# The router imports the whole chat pipeline (FastAPI, LangChain, OpenAI)
+chat_routes = pytest.importorskip("backend.routers.chat_routes")
+parse_range = chat_routes.parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-", (0, 999)),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=900-2000", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    (" bytes=10-20 ", (10, 20)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [None, "", "bytes=-", "items=0-10", "bytes=0-10,20-30"])
+def test_missing_or_unsupported_ranges_send_the_whole_clip(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=20-10"])
+def test_unsatisfiable_ranges(header):
+    assert parse_range(header, 1000) == "unsatisfiable"
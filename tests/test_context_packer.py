@@ -0,0 +1,69 @@
+import sys
+import types
+
+import pytest
+from langchain_core.documents import Document
+
+from backend.services import context_packer
+from backend.services.context_packer import CharEstimateEncoding, count_tokens, pack_documents, trim_overlaps
+
+
+@pytest.fixture(autouse=True)
+def char_tokens(monkeypatch):
+    # Token counts of 4 characters each, whether or not tiktoken is installed
+    monkeypatch.setattr(context_packer, "_encodings", {"gpt-4o": CharEstimateEncoding()})
+
+
+def doc(text, source="s"):
+    return Document(page_content=text, metadata={"source": source})
+
+
+def test_documents_are_packed_in_rank_order_until_the_budget_is_full(monkeypatch):
+    monkeypatch.setattr(context_packer, "MIN_PARTIAL_TOKENS", 5)
+    docs = [doc("a" * 40, "x"), doc("b" * 40, "y"), doc("c" * 400, "z"), doc("d" * 8, "w")]
+
+    packed = pack_documents(docs, max_tokens=30)
+
+    assert [d.page_content[0] for d in packed] == ["a", "b", "c"]
+    # 10 + 1 + 10 tokens used, the third document is cut to what is left
+    assert count_tokens(packed[2].page_content) == 30 - 21 - 1
+    assert docs[2].page_content == "c" * 400
+
+
+def test_a_small_remainder_is_dropped(monkeypatch):
+    monkeypatch.setattr(context_packer, "MIN_PARTIAL_TOKENS", 80)
+
+    packed = pack_documents([doc("a" * 40, "x"), doc("b" * 400, "y")], max_tokens=30)
+
+    assert [d.page_content for d in packed] == ["a" * 40]
+
+
+def test_overlapping_chunk_borders_are_trimmed():
+    first = "Intro sentence. " + "shared border text that overlaps"
+    second = "shared border text that overlaps" + " and the rest of the chunk."
+
+    assert trim_overlaps(second, [first]) == "and the rest of the chunk."
+    packed = pack_documents([doc(first), doc(second)], max_tokens=1000)
+    assert packed[1].page_content == "and the rest of the chunk."
+    # Chunks of different sources are left alone
+    assert pack_documents([doc(first, "a"), doc(second, "b")], max_tokens=1000)[1].page_content == second
+
+
+def test_tokenizer_falls_back_when_tiktoken_is_missing(monkeypatch):
+    monkeypatch.setattr(context_packer, "_encodings", {})
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+
+    assert isinstance(context_packer._get_encoding("gpt-4o"), CharEstimateEncoding)
+    assert count_tokens("x" * 10) == 3
+
+
+def test_tokenizer_falls_back_when_the_encoding_cannot_be_downloaded(monkeypatch):
+    def offline(*args):
+        raise OSError("no network")
+
+    monkeypatch.setattr(context_packer, "_encodings", {})
+    monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(encoding_for_model=offline, get_encoding=offline))
+
+    context_packer.warm_up()
+    assert isinstance(context_packer._encodings["gpt-4o"], CharEstimateEncoding)
+    assert pack_documents([doc("a" * 800)], max_tokens=100)[0].page_content == "a" * 400
@@ -0,0 +1,114 @@
+import pytest
+from langchain_core.documents import Document
+
+from backend.services import index_version, ingest_manifest
+from backend.services.ingest_manifest import IngestManifest, chunk_id, content_hash, sync_file
+
+
+class RecordingStore:
+    """Minimal vector store: a dict of id -> document."""
+
+    def __init__(self):
+        self.docs = {}
+        self.added = []
+
+    def add_documents(self, documents, ids):
+        self.added.extend(ids)
+        self.docs.update(zip(ids, documents))
+
+    def delete(self, ids):
+        for doc_id in ids:
+            self.docs.pop(doc_id, None)
+
+
+def chunks(*texts, source="video"):
+    return [Document(page_content=text, metadata={"source": source}) for text in texts]
+
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_manifest, "get_bm25_index", lambda name: RecordingStore())
+    monkeypatch.setattr(index_version, "bump", lambda reason="": 0)
+    return IngestManifest("test-index", str(tmp_path / "manifest"))
+
+
+def test_chunk_ids_depend_on_source_and_text():
+    assert chunk_id(chunks("a")[0]) == chunk_id(chunks("a")[0])
+    assert chunk_id(chunks("a")[0]) != chunk_id(chunks("a", source="other")[0])
+
+
+def test_content_hash_includes_splitter_settings():
+    assert content_hash("text", 1000, 100) == content_hash(b"text", 1000, 100)
+    assert content_hash("text", 1000, 100) != content_hash("text", 800, 100)
+
+
+def test_first_sync_adds_every_chunk_once(manifest):
+    store = RecordingStore()
+
+    result = manifest.sync_source(store, "video", chunks("a", "b", "a"), "h1")
+
+    assert result == {"skipped": False, "added": 2, "deleted": 0, "kept": 0}
+    assert sorted(d.page_content for d in store.docs.values()) == ["a", "b"]
+
+
+def test_unchanged_source_is_skipped(manifest):
+    store = RecordingStore()
+    manifest.sync_source(store, "video", chunks("a", "b"), "h1")
+    store.added.clear()
+
+    assert manifest.sync_source(store, "video", chunks("a", "b"), "h1")["skipped"]
+    assert store.added == []
+
+
+def test_changed_source_only_upserts_new_chunks_and_deletes_stale_ones(manifest, tmp_path):
+    store = RecordingStore()
+    manifest.sync_source(store, "video", chunks("a", "b"), "h1")
+    store.added.clear()
+
+    result = manifest.sync_source(store, "video", chunks("b", "c"), "h2")
+
+    assert result == {"skipped": False, "added": 1, "deleted": 1, "kept": 1}
+    assert store.added == [chunk_id(chunks("c")[0])]
+    assert sorted(d.page_content for d in store.docs.values()) == ["b", "c"]
+    # The manifest is persisted for the next run
+    assert IngestManifest("test-index", str(tmp_path / "manifest")).is_unchanged("video", "h2")
+
+
+def test_rebuild_deletes_vectors_stored_under_other_ids(manifest, monkeypatch):
+    store = RecordingStore()
+    store.docs["random-uuid"] = chunks("a", source="video-id")[0]
+    deleted_sources = []
+
+    def delete_by_source(vector_store, source):
+        deleted_sources.append(source)
+        for doc_id, doc in list(vector_store.docs.items()):
+            if doc.metadata["source"] == source:
+                del vector_store.docs[doc_id]
+
+    vector_store_module = pytest.importorskip("backend.services.vector_store")
+    monkeypatch.setattr(vector_store_module, "delete_by_source", delete_by_source)
+    manifest.sync_source(store, "url", chunks("a", source="video-id"), "h1")
+
+    result = manifest.sync_source(store, "url", chunks("a", source="video-id"), "h1", rebuild=True)
+
+    assert deleted_sources == ["url", "video-id"]
+    assert result["added"] == 1
+    assert list(store.docs) == [chunk_id(chunks("a", source="video-id")[0])]
+
+
+def test_sync_file_skips_building_splits_for_an_unchanged_file(manifest, tmp_path):
+    store = RecordingStore()
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b"%PDF-1.4 content")
+    builds = []
+
+    def build_splits():
+        builds.append(1)
+        return chunks("page one", source="company_summary/report.pdf")
+
+    first = sync_file("test-index", store, "company_summary/report.pdf", str(path), build_splits, 1000, 200)
+    second = sync_file("test-index", store, "company_summary/report.pdf", str(path), build_splits, 1000, 200)
+
+    assert first["added"] == 1
+    assert second["skipped"]
+    assert builds == [1]
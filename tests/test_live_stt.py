@@ -0,0 +1,69 @@
+import numpy as np
+
+from backend.services.live_stt import (
+    FRAME_SAMPLES, SAMPLE_RATE, VAD_PREROLL_MS, EnergyVad, SpeechSegmenter, pcm16_to_float32
+)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def feed(segmenter, *parts, chunk=1000):
+    """Feeds the audio in odd-sized chunks, like WebSocket messages that don't align with frames."""
+    audio = np.concatenate(parts)
+    events = []
+    for start in range(0, len(audio), chunk):
+        events.extend(segmenter.feed(audio[start:start + chunk]))
+    return events
+
+
+def test_pcm16_to_float32():
+    samples = pcm16_to_float32(np.array([0, 16384, -32768], dtype=np.int16).tobytes())
+
+    assert samples.dtype == np.float32
+    assert samples.tolist() == [0.0, 0.5, -1.0]
+
+
+def test_energy_vad_separates_speech_from_silence():
+    vad = EnergyVad()
+
+    assert vad.is_speech(tone(0.03))
+    assert not vad.is_speech(silence(0.03))
+
+
+def test_a_pause_closes_the_segment_and_silence_ends_the_question():
+    segmenter = SpeechSegmenter()
+
+    events = feed(segmenter, silence(0.5), tone(1.0), silence(0.6))
+    assert [event for event, _ in events] == ["segment"]
+    audio = events[0][1]
+    # The segment keeps the pre-roll before the onset and the pause that closed it
+    preroll = VAD_PREROLL_MS // 30 * FRAME_SAMPLES
+    assert len(tone(1.0)) + preroll <= len(audio) <= len(tone(1.0)) + preroll + len(silence(0.6))
+
+    events = feed(segmenter, silence(1.0))
+    assert events == [("end", None)]
+    assert segmenter.ended
+    assert feed(segmenter, silence(2.0)) == []
+
+
+def test_clicks_are_not_segments():
+    segmenter = SpeechSegmenter()
+
+    assert feed(segmenter, tone(0.06), silence(2.0)) == []
+    assert not segmenter.heard_speech
+
+
+def test_flush_returns_the_open_segment():
+    segmenter = SpeechSegmenter()
+    feed(segmenter, tone(0.5))
+
+    assert segmenter.current() is not None
+    assert len(segmenter.flush()) >= len(tone(0.5)) - FRAME_SAMPLES
+    assert segmenter.current() is None
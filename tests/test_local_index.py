@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from backend.services.local_index import LocalVectorStore, metadata_filter_mask
+
+ROWS = [
+    {"source": "a.pdf", "type": "pdf", "page": 1},
+    {"source": "a.pdf", "type": "pdf", "page": 5},
+    {"source": "video1", "type": "video"},
+    {"source": "b.pdf", "type": "pdf", "page": 3},
+]
+
+
+def mask(filter):
+    def column(field):
+        values = np.empty(len(ROWS), dtype=object)
+        values[:] = [row.get(field) for row in ROWS]
+        return values
+    return metadata_filter_mask(filter, column, len(ROWS)).tolist()
+
+
+def test_equality_filters():
+    assert mask({"source": "a.pdf"}) == [True, True, False, False]
+    assert mask({"type": {"$eq": "video"}}) == [False, False, True, False]
+    assert mask({"type": {"$ne": "video"}}) == [True, True, False, True]
+
+
+def test_set_filters():
+    assert mask({"source": {"$in": ["a.pdf", "b.pdf"]}}) == [True, True, False, True]
+    assert mask({"source": {"$nin": ["a.pdf"]}}) == [False, False, True, True]
+
+
+def test_range_filters_skip_missing_values():
+    assert mask({"page": {"$gte": 3}}) == [False, True, False, True]
+    assert mask({"page": {"$gt": 1, "$lt": 5}}) == [False, False, False, True]
+    assert mask({"page": {"$lte": 1}}) == [True, False, False, False]
+
+
+def test_and_or_filters():
+    assert mask({"$and": [{"type": "pdf"}, {"page": {"$gt": 2}}]}) == [False, True, False, True]
+    assert mask({"$or": [{"source": "video1"}, {"page": 1}]}) == [True, False, True, False]
+
+
+def test_unsupported_operator():
+    with pytest.raises(ValueError):
+        mask({"page": {"$exists": True}})
+
+
+class KeywordEmbeddings(Embeddings):
+    """One dimension per keyword, so similarities are predictable."""
+
+    keywords = ["roic", "fcf", "moat"]
+
+    def _embed(self, text):
+        return [float(text.lower().count(word)) + 1e-3 for word in self.keywords]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "index"), KeywordEmbeddings())
+    store.add_texts(
+        ["roic roic", "fcf", "moat", "roic and fcf"],
+        metadatas=[{"source": "a"}, {"source": "a"}, {"source": "b"}, {"source": "b"}],
+        ids=["1", "2", "3", "4"],
+    )
+    return store
+
+
+def test_search_with_filter(store):
+    assert [d.page_content for d in store.similarity_search("roic", k=2)] == ["roic roic", "roic and fcf"]
+    assert [d.page_content for d in store.similarity_search("roic", k=2, filter={"source": "b"})] == [
+        "roic and fcf", "moat"
+    ]
+    assert store.similarity_search("roic", filter={"source": "missing"}) == []
+
+
+def test_upsert_replaces_rows_by_id(store):
+    store.add_texts(["moat moat"], metadatas=[{"source": "a"}], ids=["1"])
+
+    assert len(store) == 4
+    assert store.similarity_search("moat", k=1, filter={"source": "a"})[0].page_content == "moat moat"
+
+
+def test_delete_by_id_and_by_filter(store):
+    assert store.delete(ids=["2"])
+    assert len(store) == 3
+    assert store.delete(filter={"source": "b"})
+    assert [d.page_content for d in store.similarity_search("roic", k=4)] == ["roic roic"]
+    assert not store.delete(filter={"source": "b"})
+
+
+def test_search_with_vectors_returns_stored_unit_vectors(store):
+    results = store.search_with_vectors(KeywordEmbeddings().embed_query("fcf"), k=1)
+
+    document, vector = results[0]
+    assert document.page_content == "fcf"
+    assert np.isclose(np.linalg.norm(vector), 1.0)
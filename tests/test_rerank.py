@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+# rerank imports the vector store module, which needs the OpenAI embeddings client
+pytest.importorskip("langchain_openai")
+
+from backend.services.local_index import LocalVectorStore
+from backend.services.rerank import DiversifiedRetriever, mmr_select
+
+
+def test_mmr_skips_near_duplicates():
+    query = [1.0, 0.0]
+    docs = [[1.0, 0.0], [0.99, 0.01], [0.7, 0.7]]
+
+    assert mmr_select(query, docs, k=2, lambda_mult=0.3) == [0, 2]
+    # Pure relevance keeps the duplicate
+    assert mmr_select(query, docs, k=2, lambda_mult=1.0) == [0, 1]
+
+
+def test_mmr_uses_given_relevance():
+    docs = [[1.0, 0.0], [0.0, 1.0]]
+
+    assert mmr_select([1.0, 0.0], docs, k=1, relevance=[0.1, 0.9]) == [1]
+
+
+def test_mmr_edge_cases():
+    assert mmr_select([1.0], [], k=3) == []
+    assert mmr_select([1.0, 0.0], [[1.0, 0.0]], k=0) == []
+    assert mmr_select([1.0, 0.0], [[1.0, 0.0], [0.0, 1.0]], k=5) == [0, 1]
+
+
+class CountingEmbeddings(Embeddings):
+    keywords = ["roic", "fcf", "moat"]
+
+    def __init__(self):
+        self.embedded_documents = 0
+
+    def _embed(self, text):
+        return [float(text.lower().count(word)) + 1e-3 for word in self.keywords]
+
+    def embed_documents(self, texts):
+        self.embedded_documents += len(texts)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def test_diversified_retriever_uses_stored_vectors(tmp_path):
+    embeddings = CountingEmbeddings()
+    store = LocalVectorStore(str(tmp_path / "index"), embeddings)
+    store.add_texts(["roic roic fcf", "roic roic fcf.", "roic and moat", "fcf"], ids=["1", "2", "3", "4"])
+    embeddings.embedded_documents = 0
+
+    retriever = DiversifiedRetriever(
+        retriever=store.as_retriever(search_kwargs={"k": 4}), embeddings=embeddings, k=2, lambda_mult=0.5
+    )
+    docs = retriever.invoke("roic")
+
+    assert [d.page_content for d in docs][0].startswith("roic roic fcf")
+    assert [d.page_content for d in docs][1] == "roic and moat"
+    assert embeddings.embedded_documents == 0
@@ -0,0 +1,70 @@
+import numpy as np
+
+from backend.services import semantic_cache
+from backend.services.semantic_cache import SemanticCache, normalize_question
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_normalize_question():
+    assert normalize_question("  ¿Qué es el FCF? ") == "que es el fcf"
+    assert normalize_question("EV/FCF ratio!") == "ev/fcf ratio"
+
+
+def test_exact_and_similar_questions_hit():
+    cache = SemanticCache(threshold=0.95)
+    cache.store("What is ROIC?", unit(1, 0, 0), "answer", sources=["doc"], compute_seconds=2.0)
+
+    assert cache.lookup_text("what is roic")["answer"] == "answer"
+    assert cache.lookup("Define ROIC", unit(1, 0.1, 0))["sources"] == ["doc"]
+    assert cache.lookup("Something else", unit(0, 1, 0)) is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["seconds_saved"] == 4.0
+
+
+def test_entries_hold_no_audio():
+    cache = SemanticCache()
+    cache.store("q", unit(1, 0), "answer")
+
+    entry = cache.lookup_text("q")
+    assert set(entry) == {"vector", "answer", "sources", "compute_seconds", "created_at"}
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: now[0])
+    cache = SemanticCache(ttl_seconds=60)
+    cache.store("q", unit(1, 0), "answer")
+
+    now[0] += 61
+    assert cache.lookup_text("q") is None
+    assert cache.lookup("q", unit(1, 0)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_index_version_change_drops_everything(monkeypatch):
+    version = [1]
+    monkeypatch.setattr(semantic_cache.index_version, "get_version", lambda: version[0])
+    cache = SemanticCache()
+    cache.store("q", unit(1, 0), "answer")
+    assert cache.lookup("q", unit(1, 0)) is not None
+
+    version[0] = 2
+    assert cache.lookup("q", unit(1, 0)) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["index_version"] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticCache(max_entries=2)
+    cache.store("a", unit(1, 0, 0), "A")
+    cache.store("b", unit(0, 1, 0), "B")
+    cache.lookup_text("a")
+    cache.store("c", unit(0, 0, 1), "C")
+
+    assert cache.lookup_text("a") is not None
+    assert cache.lookup_text("b") is None
@@ -0,0 +1,58 @@
+from backend.services import session_memory
+from backend.services.session_memory import AI, HUMAN, SessionMemoryStore
+
+
+def test_sessions_are_isolated():
+    store = SessionMemoryStore()
+    store.add_turn("a", "What is ROIC?", "Return on invested capital.")
+
+    assert store.get_messages("a") == [(HUMAN, "What is ROIC?"), (AI, "Return on invested capital.")]
+    assert store.get_messages("b") == []
+    assert store.get_history("a") == "Human: What is ROIC?\nAI: Return on invested capital."
+
+
+def test_no_session_id_keeps_nothing():
+    store = SessionMemoryStore()
+    store.add_turn(None, "q", "a")
+
+    assert store.get_messages(None) == []
+    assert store.stats()["sessions"] == 0
+
+
+def test_only_the_last_turns_are_kept():
+    store = SessionMemoryStore(max_turns=2)
+    for i in range(4):
+        store.add_turn("s", f"q{i}", f"a{i}")
+
+    assert [text for _, text in store.get_messages("s")] == ["q2", "a2", "q3", "a3"]
+
+
+def test_messages_are_truncated():
+    store = SessionMemoryStore(max_message_chars=5)
+    store.add_turn("s", "a long question", "a long answer")
+
+    assert store.get_messages("s") == [(HUMAN, "a lon"), (AI, "a lon")]
+
+
+def test_least_recently_used_session_is_evicted():
+    store = SessionMemoryStore(max_sessions=2)
+    store.add_turn("a", "q", "a")
+    store.add_turn("b", "q", "a")
+    store.get_messages("a")  # "b" is now the least recently used
+    store.add_turn("c", "q", "a")
+
+    assert store.get_messages("a")
+    assert store.get_messages("b") == []
+    assert store.stats()["evictions"] == 1
+
+
+def test_idle_sessions_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_memory.time, "time", lambda: now[0])
+    store = SessionMemoryStore(ttl_seconds=60)
+    store.add_turn("s", "q", "a")
+
+    now[0] += 59
+    assert store.get_messages("s")
+    now[0] += 61
+    assert store.get_messages("s") == []
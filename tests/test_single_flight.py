@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.services.single_flight import SingleFlight
+
+
+def test_concurrent_coroutines_share_one_execution():
+    flight = SingleFlight("test-run")
+    calls = []
+
+    async def compute(name):
+        calls.append(name)
+        await asyncio.sleep(0.01)
+        return f"summary of {name}"
+
+    async def main():
+        return await asyncio.gather(*(flight.run("nvidia", compute, "nvidia") for _ in range(5)))
+
+    assert asyncio.run(main()) == ["summary of nvidia"] * 5
+    assert calls == ["nvidia"]
+    assert flight.stats()["executions"] == 1
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_finished_calls_are_not_cached():
+    flight = SingleFlight("test-rerun")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        return await flight.run("k", compute), await flight.run("k", compute)
+
+    assert asyncio.run(main()) == (1, 2)
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test-cancel")
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.run("k", compute))
+        second = asyncio.ensure_future(flight.run("k", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_blocking_callers_share_the_result_and_the_error():
+    flight = SingleFlight("test-do")
+    started = threading.Event()
+    results = []
+
+    def compute():
+        started.set()
+        time.sleep(0.05)
+        return "data"
+
+    def wait_for_it():
+        started.wait()
+        results.append(flight.do("k", compute))
+
+    followers = [threading.Thread(target=wait_for_it) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    results.append(flight.do("k", compute))
+    for thread in followers:
+        thread.join()
+
+    assert results == ["data"] * 4
+    assert flight.stats()["executions"] == 1
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("k", fail)
+    assert flight.stats()["in_flight"] == 0
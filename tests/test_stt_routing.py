@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from backend.services import stt_service
+from backend.services.disk_cache import DiskCache
+from backend.services.stt_engines import transcribe_probed
+from backend.services.stt_service import RouterStats, SttService, language_hint, route_clip
+
+
+@pytest.fixture(autouse=True)
+def routing(monkeypatch):
+    monkeypatch.setattr(stt_service, "STT_ROUTING_ENABLED", True)
+    monkeypatch.setattr(stt_service, "STT_SHORT_CLIP_SECONDS", 8.0)
+    monkeypatch.setattr(stt_service, "STT_MODEL_SIZE", "base")
+    monkeypatch.setattr(stt_service, "STT_SHORT_MODEL_SIZE", "tiny")
+    monkeypatch.setattr(stt_service, "STT_LANGUAGES", ["es", "en"])
+
+
+def test_language_hint_keeps_supported_languages_only():
+    assert language_hint("es-ES") == "es"
+    assert language_hint(" EN ") == "en"
+    assert language_hint("pt-BR") is None
+    assert language_hint(None) is None
+
+
+def test_short_clips_use_the_small_model():
+    assert route_clip(3.0, "es-ES") == ("tiny", "es", None)
+    # Without a usable hint the small model probes among the supported languages
+    assert route_clip(3.0, None) == ("tiny", None, ("es", "en"))
+    assert route_clip(3.0, "fr") == ("tiny", None, ("es", "en"))
+
+
+def test_long_clips_use_the_main_model_without_a_probe():
+    assert route_clip(20.0, "en") == ("base", "en", None)
+    assert route_clip(20.0, None) == ("base", None, None)
+
+
+def test_routing_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(stt_service, "STT_ROUTING_ENABLED", False)
+
+    assert route_clip(3.0, None) == ("base", None, None)
+    assert stt_service.routed_model_sizes() == ["base"]
+
+
+class ProbeEngine:
+    def __init__(self, detected):
+        self.detected = detected
+        self.calls = []
+
+    def detect_languages(self, audios, languages):
+        return [self.detected[len(audio)] for audio in audios]
+
+    def transcribe_clips(self, audios, language=None, languages=None):
+        self.calls.append((language, len(audios)))
+        return [f"{language}:{len(audio)}" for audio in audios], len(audios)
+
+
+def test_probed_clips_are_transcribed_grouped_by_language():
+    engine = ProbeEngine({1: "es", 2: "en", 3: "es"})
+    audios = [np.zeros(n, np.float32) for n in (1, 2, 3)]
+
+    results, batched = transcribe_probed(engine, audios, ("es", "en"))
+
+    assert results == ["es:1", "en:2", "es:3"]
+    assert sorted(engine.calls) == [("en", 1), ("es", 2)]
+    assert batched == 3
+
+
+def test_a_failed_probe_falls_back_to_detection():
+    class Broken(ProbeEngine):
+        def detect_languages(self, audios, languages):
+            raise RuntimeError("no mel filters")
+
+    results, _ = transcribe_probed(Broken({}), [np.zeros(4, np.float32)], ("es", "en"))
+
+    assert results == ["None:4"]
+
+
+class EchoEngine:
+    model = object()
+
+    def load(self):
+        return self.model
+
+    def transcribe_clips(self, audios, language=None, languages=None):
+        return ["hola" for _ in audios], len(audios)
+
+
+def test_transcript_cache_hits_are_not_counted_as_latency(monkeypatch, tmp_path):
+    monkeypatch.setattr(stt_service, "transcript_cache", DiskCache(str(tmp_path / "stt.sqlite"), 1 << 20))
+    monkeypatch.setattr(stt_service, "get_engine", lambda *args: EchoEngine())
+    service = SttService("tiny", workers=0, engine="whisper")
+    monkeypatch.setattr(stt_service, "get_stt_service", lambda model_size: service)
+    monkeypatch.setattr(stt_service, "router_stats", RouterStats())
+    audio = np.random.default_rng(0).standard_normal(2 * stt_service.SAMPLE_RATE).astype(np.float32)
+
+    assert stt_service.transcribe_routed(audio, "es") == "hola"
+    assert stt_service.transcribe_routed(audio, "es") == "hola"
+
+    stats = stt_service.router_stats.stats()
+    assert stats["routes"]["tiny"]["clips"] == 1
+    assert stats["cache_hits"] == {"tiny": 1}
+    assert service.stats()["clips"] == 1
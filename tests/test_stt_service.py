@@ -0,0 +1,158 @@
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+from backend.services import stt_service
+from backend.services.stt_service import SttService
+
+
+class FakeEngine:
+    """Echoes each clip's length; fails the clips listed in `fail`, blocks while `gate` is closed."""
+
+    def __init__(self, fail=(), gate=None):
+        self.model = object()
+        self.fail = set(fail)
+        self.gate = gate
+        self.batches = []
+        self.entered = threading.Event()
+
+    def load(self):
+        return self.model
+
+    def transcribe_clips(self, audios, language=None, languages=None):
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait()
+        self.batches.append(len(audios))
+        if any(len(audio) in self.fail for audio in audios):
+            raise RuntimeError("decoder crashed")
+        return [f" {len(audio)} samples " for audio in audios], len(audios)
+
+
+def clip(samples):
+    return np.zeros(samples, dtype=np.float32)
+
+
+@pytest.fixture(autouse=True)
+def no_transcript_cache(monkeypatch):
+    monkeypatch.setattr(stt_service, "transcript_cache", None)
+
+
+def in_process_service(monkeypatch, engine):
+    monkeypatch.setattr(stt_service, "get_engine", lambda *args: engine)
+    return SttService("base", workers=0, engine="whisper")
+
+
+def test_transcribes_through_the_queue(monkeypatch):
+    service = in_process_service(monkeypatch, FakeEngine())
+
+    assert service.transcribe(clip(16000)) == "16000 samples"
+    assert service.stats()["clips"] == 1
+
+
+def test_dispatcher_survives_a_failing_batch(monkeypatch):
+    service = in_process_service(monkeypatch, FakeEngine(fail={100}))
+
+    with pytest.raises(RuntimeError):
+        service.transcribe(clip(100))
+    assert service.transcribe(clip(200)) == "200 samples"
+    assert service.stats()["errors"] == 1
+    assert service.stats()["busy_workers"] == 0
+
+
+def test_a_cancelled_request_does_not_stop_the_dispatcher(monkeypatch):
+    gate = threading.Event()
+    service = in_process_service(monkeypatch, FakeEngine(gate=gate))
+
+    abandoned = service.submit(clip(100))
+    abandoned.cancel()
+    gate.set()
+
+    assert service.transcribe(clip(200)) == "200 samples"
+
+
+def test_waiting_clips_are_decoded_as_one_batch(monkeypatch):
+    gate = threading.Event()
+    engine = FakeEngine(gate=gate)
+    service = in_process_service(monkeypatch, engine)
+
+    first = service.submit(clip(100))
+    # The worker is busy with the first clip while the others queue up
+    engine.entered.wait()
+    waiting = [service.submit(clip(200 + i)) for i in range(3)]
+    gate.set()
+
+    assert first.result() == "100 samples"
+    assert [future.result() for future in waiting] == ["200 samples", "201 samples", "202 samples"]
+    assert engine.batches == [1, 3]
+
+
+class FakePool:
+    """Stands in for the ProcessPoolExecutor: runs the worker functions inline."""
+
+    created = []
+
+    def __init__(self, max_workers, mp_context, initializer, initargs):
+        self.initargs = initargs
+        self.broken = False
+        FakePool.created.append(self)
+
+    def submit(self, fn, *args):
+        future = Future()
+        if fn is stt_service._worker_ready:
+            future.set_result(0)
+        elif self.broken:
+            future.set_exception(BrokenProcessPool("worker died"))
+        else:
+            future.set_result(([f"{len(audio)} samples" for audio in args[0]], len(args[0])))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    FakePool.created = []
+    monkeypatch.setattr(stt_service, "ProcessPoolExecutor", FakePool)
+    return FakePool
+
+
+def test_worker_threads_are_split_across_every_routed_model(monkeypatch, fake_pool):
+    monkeypatch.setattr(stt_service.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(stt_service, "STT_ROUTING_ENABLED", True)
+    monkeypatch.setattr(stt_service, "STT_MODEL_SIZE", "base")
+    monkeypatch.setattr(stt_service, "STT_SHORT_MODEL_SIZE", "tiny")
+
+    SttService("base", workers=1, engine="whisper").start()
+    SttService("tiny", workers=2, engine="whisper").start()
+
+    # base and tiny pools share the 8 cores: 8 / (workers x 2 models)
+    assert [pool.initargs for pool in fake_pool.created] == [("whisper", "base", 4), ("whisper", "tiny", 2)]
+
+
+def test_concurrent_starts_create_one_pool(fake_pool):
+    service = SttService("base", workers=1, engine="whisper")
+    threads = [threading.Thread(target=service.start) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    futures = [service.submit(clip(100)) for _ in range(4)]
+
+    assert [future.result() for future in futures] == ["100 samples"] * 4
+    assert len(fake_pool.created) == 1
+
+
+def test_a_broken_pool_is_restarted(fake_pool):
+    service = SttService("base", workers=1, engine="whisper")
+    service.start()
+    fake_pool.created[0].broken = True
+
+    with pytest.raises(BrokenProcessPool):
+        service.transcribe(clip(100))
+    assert service.transcribe(clip(100)) == "100 samples"
+    assert len(fake_pool.created) == 2
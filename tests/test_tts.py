@@ -0,0 +1,38 @@
+import pytest
+
+# tts builds its OpenAI clients at import time
+pytest.importorskip("openai")
+
+from backend.services.tts import split_sentences, tts_cache_key
+
+
+def test_first_sentence_is_a_chunk_of_its_own():
+    text = "El ROIC es clave. Mide la rentabilidad. También importa el FCF."
+
+    assert split_sentences(text, max_chars=600) == [
+        "El ROIC es clave.",
+        "Mide la rentabilidad. También importa el FCF.",
+    ]
+
+
+def test_following_sentences_are_grouped_up_to_max_chars():
+    chunks = split_sentences("One. Two two. Three three. Four four.", max_chars=15)
+
+    assert chunks == ["One.", "Two two.", "Three three.", "Four four."]
+    assert all(len(chunk) <= 15 for chunk in chunks)
+
+
+def test_long_sentences_are_split_on_words():
+    chunks = split_sentences("word " * 10, max_chars=12)
+
+    assert all(len(chunk) <= 12 for chunk in chunks)
+    assert " ".join(chunks).split() == ["word"] * 10
+
+
+def test_newlines_break_sentences():
+    assert split_sentences("Title\nBody text", max_chars=600) == ["Title", "Body text"]
+
+
+def test_cache_key_ignores_whitespace_and_quotes():
+    assert tts_cache_key('"Hola  mundo"') == tts_cache_key("Hola mundo")
+    assert tts_cache_key("Hola mundo") != tts_cache_key("Hola mundo.")